@@ -1,46 +1,36 @@
 """LangChain agent implementation using LLM (OpenAI/Claude) and MCP tools."""
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import List, Dict, Any
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+import time
+from contextlib import asynccontextmanager
+import httpx
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+from langchain.agents import create_tool_calling_agent
+from langchain_core.agents import AgentAction
+from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+from langchain.agents.output_parsers.tools import ToolsAgentOutputParser
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from app import cassette, loop_guard, tiering, tracelog, uds
 from app.config import settings
 from app.auth import TokenContext
-from app.mcp_client import MCPClient
-from app.tools import MCPToolFactory
+from app.mcp_client import MCPClient, revalidation_cache
+from app.prefetch import Prefetcher
+from app.tools import TOOL_PROGRESS_EVENT, MCPToolFactory, ToolResultCache
+from app.metrics import metrics
+from app.usage import UsageTracker, usage_ledger
 
 logger = logging.getLogger(__name__)
 
-
-class HRAgent:
-    """HR Agent using LangChain, Claude, and MCP tools."""
-
-    def __init__(self, token_context: TokenContext):
-        """
-        Initialize HR Agent.
-
-        Args:
-            token_context: Token context with user scopes and auth headers
-        """
-        self.token_context = token_context
-        self.mcp_client = MCPClient()
-
-    def _create_system_prompt(self) -> str:
-        """
-        Create system prompt including user's available scopes.
-
-        Returns:
-            System prompt string
-        """
-        scopes_text = ", ".join(self.token_context.scopes_list) if self.token_context.scopes_list else "none"
-
-        return f"""You are an HR Assistant with access to employee data and HR systems.
-
-**Authorization Context:**
-- User: {self.token_context.user_sub or 'Unknown'}
-- Granted Scopes: {scopes_text}
-- Authorization is enforced by Kong Gateway at each API boundary
+# Static system prompt prefix. It is identical for every user and request so
+# the provider can cache it (together with the tool definitions sent before
+# it); keep per-user or per-request values out of it.
+SYSTEM_PROMPT_PREFIX = """You are an HR Assistant with access to employee data and HR systems.
 
 **Your Capabilities:**
 You have access to HR tools that allow you to:
@@ -50,6 +40,7 @@ You have access to HR tools that allow you to:
 - View salary information
 - Update salary information
 - View organizational chart
+- Compute headcount and salary statistics
 
 **IMPORTANT - Tool Selection for Efficiency:**
 To avoid exceeding iteration limits, ALWAYS prefer these efficient tools:
@@ -65,6 +56,14 @@ To avoid exceeding iteration limits, ALWAYS prefer these efficient tools:
 3. **For simple employee lists** (names, IDs only):
    - ✅ USE: `list_employees` (lightweight, fast)
 
+4. **For statistics** (headcount per location, average salary by department, top departments by pay):
+   - ✅ USE: `aggregate` (computes counts, sums, averages, min/max per group on the server)
+   - ❌ AVOID: Listing all employees or salaries and doing the arithmetic yourself
+
+5. **For changes affecting several employees** (department-wide raises, relocating a team):
+   - ✅ USE: `update_salaries` or `update_employees` (applies ALL rows atomically in ONE call)
+   - ❌ AVOID: Calling `update_salary` or `update_employee` once per employee
+
 **Guidelines:**
 1. Always be helpful and professional
 2. Choose the MOST EFFICIENT tool for each query
@@ -75,81 +74,451 @@ To avoid exceeding iteration limits, ALWAYS prefer these efficient tools:
 Note: Access control is handled by Kong Gateway. If you encounter authorization errors when calling tools, inform the user that they lack the necessary permissions.
 """
 
-    async def create_agent_executor(self) -> AgentExecutor:
+# Small per-user suffix, sent as a second system message after the prefix
+SYSTEM_PROMPT_USER_CONTEXT = """**Authorization Context:**
+- User: {user_sub}
+- Granted Scopes: {scopes}
+- Authorization is enforced by Kong Gateway at each API boundary
+"""
+
+
+class HRAgent:
+    """HR Agent using LangChain, Claude, and MCP tools."""
+
+    def __init__(self, token_context: TokenContext):
         """
-        Create LangChain agent executor with LLM and MCP tools.
+        Initialize HR Agent.
 
-        Returns:
-            Configured AgentExecutor
-        """
-        # Initialize LLM - Kong AI Proxy handles API key and provider routing
-        # We send model="gpt-4" to match Kong's configuration (not to override it)
-        # Note: Kong's AI Proxy configuration controls max_tokens, not set here to avoid conflicts
-        llm = ChatOpenAI(
-            model="gpt-4",  # Must match Kong AI Proxy configuration
-            api_key="placeholder",  # Required by library, Kong overrides with real API key
-            base_url=settings.llm_api_url,
-            default_headers=self.token_context.get_headers(),  # Send auth for Kong validation
+        Args:
+            token_context: Token context with user scopes and auth headers
+        """
+        self.token_context = token_context
+        # Not with a cassette: known versions in requests would depend on
+        # earlier chats, so recorded requests would no longer match
+        mcp_transport = cassette.transport_for("mcp")
+        self.mcp_client = MCPClient(
+            transport=mcp_transport,
+            revalidation_cache=revalidation_cache if mcp_transport is None else None,
         )
 
-        # Get available tools based on user scopes
-        tool_factory = MCPToolFactory(self.mcp_client, self.token_context)
-        tools = await tool_factory.get_available_tools()
+        # Shared across every chat() call made on this agent, so a batch of
+        # messages under one TokenContext reuses the LLM client, the tool
+        # catalog and read-only tool results.
+        self.tool_cache = ToolResultCache()
+        self.prefetcher = Prefetcher(self.tool_cache, token_context) if settings.prefetch_enabled else None
+        self._llms: Dict[str, Union[ChatOpenAI, ChatAnthropic]] = {}
+        self._tools: Optional[List[Any]] = None
+        self._tools_lock = asyncio.Lock()
 
-        logger.info(f"Agent initialized with {len(tools)} tools: {[t.name for t in tools]}")
+    def _create_prompt(self) -> ChatPromptTemplate:
+        """
+        Create the agent prompt: the static, cacheable system prompt prefix
+        followed by the per-user authorization context.
 
-        # Create prompt template
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", self._create_system_prompt()),
+        Returns:
+            Prompt template expecting user_sub, scopes, input and chat history
+        """
+        if settings.llm_prompt_cache and settings.llm_provider == "anthropic":
+            # Explicit cache breakpoint: tools plus the static prefix are cached
+            prefix = SystemMessage(content=[{
+                "type": "text",
+                "text": SYSTEM_PROMPT_PREFIX,
+                "cache_control": {"type": "ephemeral"},
+            }])
+        else:
+            prefix = SystemMessage(content=SYSTEM_PROMPT_PREFIX)
+
+        return ChatPromptTemplate.from_messages([
+            prefix,
+            ("system", SYSTEM_PROMPT_USER_CONTEXT),
             MessagesPlaceholder(variable_name="chat_history", optional=True),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad"),
         ])
 
+    def _prompt_variables(self) -> Dict[str, str]:
+        """Per-user values filled into the prompt's authorization context."""
+        scopes = self.token_context.scopes_list
+        return {
+            "user_sub": self.token_context.user_sub or "Unknown",
+            "scopes": ", ".join(scopes) if scopes else "none",
+        }
+
+    def _prompt_cache_key(self) -> str:
+        """
+        Routing key for OpenAI prompt caching. Requests with the same prefix
+        and the same tool set (which follows from the scopes) share a key, so
+        they land on servers that already hold the cached prefix.
+        """
+        digest = hashlib.sha256(SYSTEM_PROMPT_PREFIX.encode())
+        digest.update(" ".join(sorted(self.token_context.scopes_list)).encode())
+        return f"hr-agent-{digest.hexdigest()[:16]}"
+
+    def _get_llm(self, tier: str = tiering.STRONG) -> Union[ChatOpenAI, ChatAnthropic]:
+        """Return the agent's LLM client for a model tier, creating it on first use."""
+        if tier not in self._llms:
+            # Each tier has its own Kong AI Proxy route and model
+            if tier == tiering.FAST:
+                api_url, model = settings.llm_fast_api_url, settings.llm_fast_model
+            else:
+                api_url, model = settings.llm_api_url, settings.llm_model
+
+            # Initialize LLM - Kong AI Proxy handles API key and provider routing
+            # We send the model name to match Kong's configuration (not to override it)
+            # Note: Kong's AI Proxy configuration controls max_tokens, not set here to avoid conflicts
+            llm_transport = cassette.transport_for("llm")
+            api_url, socket_path = uds.split_url(api_url)
+            if socket_path and llm_transport is None:
+                llm_transport = uds.async_transport(socket_path)
+            if settings.llm_provider == "anthropic":
+                if socket_path:
+                    raise ValueError("Unix socket LLM URLs need LLM_PROVIDER=openai (ChatAnthropic takes no HTTP client)")
+                if llm_transport is not None:
+                    logger.warning("[CASSETTE] ChatAnthropic takes no HTTP client; only MCP traffic is recorded/replayed")
+                # Native Anthropic format, for a Kong route with llm_format: anthropic
+                self._llms[tier] = ChatAnthropic(
+                    model=model,  # Must match Kong AI Proxy configuration
+                    api_key="placeholder",  # Required by library, Kong overrides with real API key
+                    base_url=api_url,
+                    default_headers=self.token_context.get_headers(),  # Send auth for Kong validation
+                )
+            else:
+                # OpenAI caches long prompt prefixes automatically; the cache key
+                # routes requests sharing a prefix to the same cache
+                extra_body = {"prompt_cache_key": self._prompt_cache_key()} if settings.llm_prompt_cache else None
+                self._llms[tier] = ChatOpenAI(
+                    model=model,  # Must match Kong AI Proxy configuration
+                    api_key="placeholder",  # Required by library, Kong overrides with real API key
+                    base_url=api_url,
+                    default_headers=self.token_context.get_headers(),  # Send auth for Kong validation
+                    extra_body=extra_body,
+                    stream_usage=True,  # The agent streams; ask for usage (incl. cached tokens)
+                    http_async_client=httpx.AsyncClient(transport=llm_transport) if llm_transport else None,
+                )
+        return self._llms[tier]
+
+    async def _get_tools(self) -> List[Any]:
+        """Return the agent's LangChain tools, fetching the MCP catalog on first use."""
+        async with self._tools_lock:
+            if self._tools is None:
+                tool_factory = MCPToolFactory(
+                    self.mcp_client, self.token_context, cache=self.tool_cache, prefetcher=self.prefetcher
+                )
+                self._tools = await tool_factory.get_available_tools()
+                logger.info(f"Agent initialized with {len(self._tools)} tools: {[t.name for t in self._tools]}")
+        return self._tools
+
+    async def create_agent_executor(
+        self,
+        max_iterations: int = 20,
+        tier_mode: str = tiering.TIERED,
+        deadline: Optional[float] = None,
+    ) -> loop_guard.GuardedAgentExecutor:
+        """
+        Create LangChain agent executor with LLM and MCP tools.
+
+        The executor is for a single run: it tracks the run's tool calls to
+        detect loops (see app/loop_guard.py).
+
+        Args:
+            max_iterations: Cap on LLM/tool round trips
+            tier_mode: Model tier routing for the run when LLM_TIERING is on
+            deadline: time.monotonic() value the run should finish by
+
+        Returns:
+            Configured GuardedAgentExecutor
+        """
+        # Get available tools based on user scopes
+        tools = await self._get_tools()
+
+        # Create prompt template
+        prompt = self._create_prompt()
+
         # Create agent
-        agent = create_tool_calling_agent(llm, tools, prompt)
+        if settings.llm_tiering:
+            # create_tool_calling_agent with the model step replaced by the tier router
+            router = tiering.TieredModel(
+                self._get_llm(tiering.FAST).bind_tools(tools),
+                self._get_llm(tiering.STRONG).bind_tools(tools),
+                {tool.name for tool in tools},
+                tier_mode,
+            )
+            agent = (
+                RunnablePassthrough.assign(
+                    agent_scratchpad=lambda x: format_to_tool_messages(x["intermediate_steps"])
+                )
+                | prompt
+                | RunnableLambda(router.ainvoke, name="TieredModel")
+                | ToolsAgentOutputParser()
+            )
+        else:
+            agent = create_tool_calling_agent(self._get_llm(), tools, prompt)
+        # Forced final answers use the run's model: degraded runs stay on the fast one
+        final_tier = tiering.FAST if settings.llm_tiering and tier_mode == tiering.FAST_ONLY else tiering.STRONG
 
         # Create agent executor
-        agent_executor = AgentExecutor(
+        agent_executor = loop_guard.GuardedAgentExecutor(
             agent=agent,
             tools=tools,
             verbose=True,
             handle_parsing_errors=True,
-            max_iterations=20,  # Increased from 10 to handle queries requiring multiple tool calls
+            max_iterations=max_iterations,
+            loop_guard=loop_guard.LoopGuard(max_iterations, deadline),
+            final_answer=functools.partial(self._final_answer, tier=final_tier),
         )
 
         return agent_executor
 
-    async def chat(self, message: str, chat_history: List[Dict[str, str]] = None) -> str:
+    async def _final_answer(
+        self,
+        inputs: Dict[str, Any],
+        steps: List[Tuple[AgentAction, str]],
+        reason: str,
+        callbacks: Any,
+        tier: str = tiering.STRONG,
+    ) -> str:
+        """
+        Answer from the tool results so far, without offering tools; used when
+        the loop guard ends a run early.
+
+        Args:
+            inputs: The run's prompt variables
+            steps: The run's tool calls and results
+            reason: Why the run was ended
+            callbacks: Callbacks of the run, so the answer is streamed and its usage counted
+            tier: Model tier of the run
+
+        Returns:
+            Answer text
+        """
+        messages = self._create_prompt().format_messages(**inputs, agent_scratchpad=[])
+        messages.append(HumanMessage(content=loop_guard.final_answer_request(steps, reason)))
+        response = await self._get_llm(tier).ainvoke(messages, config={"callbacks": callbacks})
+        if isinstance(response.content, str):
+            return response.content
+        # Anthropic content blocks
+        return "".join(block.get("text", "") for block in response.content if isinstance(block, dict))
+
+    async def chat(
+        self,
+        message: str,
+        chat_history: List[Dict[str, str]] = None,
+        usage: Optional[UsageTracker] = None,
+    ) -> str:
         """
         Process a chat message.
 
         Args:
             message: User message
             chat_history: Optional chat history
+            usage: Optional tracker that receives the run's LLM token usage
 
         Returns:
             Agent response
         """
         try:
-            agent_executor = await self.create_agent_executor()
+            return await self.run(message, chat_history, usage)
+
+        except Exception as e:
+            error_msg = f"Error processing chat: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            return f"I encountered an error: {str(e)}"
 
-            # Prepare input
-            agent_input = {
-                "input": message,
+    @asynccontextmanager
+    async def _run_scope(
+        self,
+        message: str,
+        chat_history: List[Dict[str, str]] = None,
+        usage: Optional[UsageTracker] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Set up one agent run and its bookkeeping (budget, prefetch, usage).
+
+        Yields:
+            Dict with the "executor", its "input" and run "config"
+        """
+        max_iterations = loop_guard.iteration_budget(message)
+        tier_mode = tiering.STRONG_ONLY if tiering.is_hard_query(message) else tiering.TIERED
+        user_sub = self.token_context.user_sub
+        if settings.usage_budget_action == "degrade" and usage_ledger.over_budget(user_sub):
+            # Over budget: answer from the message alone with fewer round trips
+            logger.warning(f"[USAGE] User {user_sub} is over the token budget, running degraded")
+            metrics.inc("hr_agent_usage_over_budget_total", action="degrade")
+            chat_history = []
+            max_iterations = min(max_iterations, settings.usage_degraded_max_iterations)
+            tier_mode = tiering.FAST_ONLY
+        deadline = time.monotonic() + settings.agent_deadline_seconds if settings.agent_deadline_seconds > 0 else None
+        trace = tracelog.start(user_sub)
+        setup_started = time.perf_counter()
+        try:
+            agent_executor = await self.create_agent_executor(max_iterations, tier_mode, deadline)
+        except Exception as e:
+            if trace is not None:
+                tracelog.finish(trace, "error", type(e).__name__)
+            raise
+        if trace is not None:
+            trace.add_hop("setup", time.perf_counter() - setup_started)
+
+        # Prepare input
+        agent_input = {
+            "input": message,
+            "chat_history": chat_history or [],
+            **self._prompt_variables(),
+        }
+
+        logger.info(f"Processing message: {message}")
+        usage = usage or UsageTracker()
+        if self.prefetcher is not None:
+            self.prefetcher.begin_run()
+        callbacks = [usage] if trace is None else [usage, trace]
+        status, error = "ok", None
+        try:
+            yield {"executor": agent_executor, "input": agent_input, "config": {"callbacks": callbacks}}
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"
+            raise
+        except Exception as e:
+            status, error = "error", type(e).__name__
+            raise
+        finally:
+            usage.finish(user_sub)
+            if self.prefetcher is not None:
+                self.prefetcher.end_run()
+            if trace is not None:
+                guard = agent_executor.loop_guard
+                tracelog.finish(trace, status, error, usage.summary(), guard.iterations, guard.aborted)
+
+    def _record_chat(self, message: str, chat_history: Optional[List[Dict[str, str]]], response: str, started: float) -> None:
+        """Append a finished chat to the cassette when recording."""
+        recorder = cassette.active()
+        if recorder is not None:
+            recorder.note_chat({
+                "message": message,
                 "chat_history": chat_history or [],
-            }
+                "user_sub": self.token_context.user_sub,
+                "user_scopes": self.token_context.user_scopes,
+                "response": response,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            })
+
+    async def run(
+        self,
+        message: str,
+        chat_history: List[Dict[str, str]] = None,
+        usage: Optional[UsageTracker] = None,
+    ) -> str:
+        """
+        Run the agent for one message. Unlike chat(), errors propagate.
+
+        Args:
+            message: User message
+            chat_history: Optional chat history
+            usage: Optional tracker that receives the run's LLM token usage
+
+        Returns:
+            Agent response
+        """
+        started = time.perf_counter()
+        async with self._run_scope(message, chat_history, usage) as run:
+            result = await run["executor"].ainvoke(run["input"], config=run["config"])
+
+        response = result.get("output", "I apologize, but I couldn't generate a response.")
+        logger.info(f"Agent response generated successfully")
+        self._record_chat(message, chat_history, response, started)
+        return response
+
+    async def stream_chat(
+        self,
+        message: str,
+        chat_history: List[Dict[str, str]] = None,
+        usage: Optional[UsageTracker] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the agent for one message, yielding progress events as they happen.
+
+        Args:
+            message: User message
+            chat_history: Optional chat history
+            usage: Optional tracker that receives the run's LLM token usage
 
-            # Execute agent
-            logger.info(f"Processing message: {message}")
-            result = await agent_executor.ainvoke(agent_input)
+        Yields:
+            Event dicts: "tool_start" (tool, input), "tool_progress" (tool,
+            progress, total, message; with MCP_EVENT_STREAM), "tool_end"
+            (tool), "token" (text streamed by the LLM) and finally "final"
+            (response)
+        """
+        started = time.perf_counter()
+        response = None
+        async with self._run_scope(message, chat_history, usage) as run:
+            async for event in run["executor"].astream_events(run["input"], config=run["config"], version="v2"):
+                kind = event["event"]
+                if kind == "on_tool_start":
+                    yield {"event": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    yield {"event": "tool_end", "tool": event["name"]}
+                elif kind == "on_custom_event" and event["name"] == TOOL_PROGRESS_EVENT:
+                    yield {"event": "tool_progress", **event["data"]}
+                elif kind == "on_chat_model_stream" and tiering.DRAFT_TAG not in event.get("tags", []):
+                    text = event["data"]["chunk"].content
+                    if isinstance(text, str) and text:
+                        yield {"event": "token", "text": text}
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # End of the top-level AgentExecutor run
+                    response = (event["data"].get("output") or {}).get("output")
+
+        if response is None:
+            response = "I apologize, but I couldn't generate a response."
+        logger.info(f"Agent response streamed successfully")
+        self._record_chat(message, chat_history, response, started)
+        yield {"event": "final", "response": response}
+
+    async def chat_many(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a batch of chat messages with bounded concurrency.
 
-            response = result.get("output", "I apologize, but I couldn't generate a response.")
-            logger.info(f"Agent response generated successfully")
+        All items share this agent's LLM client, tool catalog and tool result
+        cache. Results are yielded in completion order, not submission order.
 
-            return response
+        Args:
+            items: Dicts with "message" and optional "id" and "chat_history"
+            max_concurrency: Maximum number of messages processed at once
 
-        except Exception as e:
-            error_msg = f"Error processing chat: {str(e)}"
-            logger.error(error_msg, exc_info=True)
-            return f"I encountered an error: {str(e)}"
+        Yields:
+            One result dict per item with its index, status, token usage and timing
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        # Fetch the tool catalog once up front instead of racing for it
+        await self._get_tools()
+
+        async def run_item(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                usage = UsageTracker()
+                try:
+                    response = await self.run(item["message"], item.get("chat_history"), usage)
+                    status, error = "ok", None
+                except Exception as e:
+                    logger.error(f"Batch item {index} failed: {e}", exc_info=True)
+                    response, status, error = None, "error", str(e)
+                return {
+                    "index": index,
+                    "id": item.get("id"),
+                    "status": status,
+                    "response": response,
+                    "error": error,
+                    "usage": usage.summary(),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                }
+
+        tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
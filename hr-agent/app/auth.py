@@ -2,12 +2,24 @@
 from typing import Optional
 from fastapi import Header, HTTPException, status
 import base64
-import json
 import logging
 
+from app import codec
+
 logger = logging.getLogger(__name__)
 
 
+def _jwt_exp(token: str) -> Optional[float]:
+    """The exp claim of a JWT (not verified), or None."""
+    try:
+        payload_b64 = token.split(".")[1]
+        payload = codec.loads(base64.urlsafe_b64decode(payload_b64 + "=" * (-len(payload_b64) % 4)))
+        exp = payload.get("exp")
+        return float(exp) if isinstance(exp, (int, float)) else None
+    except Exception:
+        return None
+
+
 class TokenContext:
     """Context object holding authentication information from headers."""
 
@@ -43,7 +55,7 @@ class TokenContext:
         try:
             # Base64 decode the header value
             decoded_bytes = base64.b64decode(self.x_introspection_token)
-            decoded_json = json.loads(decoded_bytes)
+            decoded_json = codec.loads(decoded_bytes)
 
             # Extract the access_token from the RFC 8693 response
             access_token = decoded_json.get("access_token")
@@ -57,6 +69,15 @@ class TokenContext:
             logger.error(f"[TOKEN] Failed to extract exchanged token from x-introspection-token: {e}")
             return None
 
+    @property
+    def expires_at(self) -> Optional[float]:
+        """Earliest expiry (epoch seconds) of the tokens sent downstream, or None if unknown."""
+        tokens = [self.exchanged_token or ""]
+        if self.authorization.startswith("Bearer "):
+            tokens.append(self.authorization[len("Bearer "):])
+        expiries = [exp for exp in map(_jwt_exp, tokens) if exp is not None]
+        return min(expiries) if expiries else None
+
     def has_scope(self, scope: str) -> bool:
         """Check if a specific scope is available."""
         return scope in self.scopes_list
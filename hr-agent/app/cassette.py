@@ -0,0 +1,237 @@
+"""Record/replay of LLM and MCP traffic ("cassettes").
+
+In record mode every LLM request/response and MCP JSON-RPC exchange made by
+the agent passes through a ``CassetteTransport`` that forwards it to the real
+service and appends it, with its latency, to a gzip-compressed NDJSON file.
+Each finished chat is appended too, with its input and final response.
+
+In replay mode the same transports serve recorded responses instead, after
+the original latency times a scale factor (0 replays as fast as possible).
+No Okta, Kong or LLM provider is needed, and the output is deterministic, so
+benchmarks/bench_replay.py can measure end-to-end latency and allocations and
+check that caching or concurrency changes still produce identical answers.
+
+Exchanges are matched by a hash of the request: channel, method and JSON
+body, minus the JSON-RPC id (MCP ids count up per client). URLs are left out
+so a cassette recorded through Kong replays anywhere. Identical requests are
+replayed in recorded order. Request headers (tokens) are never recorded.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import httpx
+
+from app import codec
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept in the cassette; the body is stored decoded, so
+# Content-Encoding and Content-Length are dropped
+RECORDED_HEADERS = ("content-type",)
+
+
+def request_key(channel: str, method: str, body: bytes) -> str:
+    """Hash identifying a request for replay matching."""
+    payload: Any = body.decode("utf-8", errors="replace")
+    if body:
+        try:
+            payload = codec.loads(body)
+        except ValueError:
+            pass
+    if isinstance(payload, dict):
+        payload = {key: value for key, value in payload.items() if key != "id"}
+    digest = hashlib.sha256(f"{channel} {method} ".encode())
+    digest.update(codec.dumps(payload, sort_keys=True))
+    return digest.hexdigest()[:32]
+
+
+def _describe(channel: str, body: bytes) -> str:
+    """Short human-readable label for a recorded request."""
+    try:
+        payload = codec.loads(body)
+    except ValueError:
+        return channel
+    if channel == "mcp" and isinstance(payload, dict):
+        params = payload.get("params") or {}
+        return params.get("name") or payload.get("method", "")
+    if isinstance(payload, dict):
+        return f"{payload.get('model', '')} ({len(payload.get('messages', []))} messages)"
+    return channel
+
+
+class Cassette:
+    """A cassette file opened for recording or replay."""
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 1.0):
+        """
+        Open a cassette.
+
+        Args:
+            path: Cassette file (gzip-compressed NDJSON)
+            mode: "record" (append to the file) or "replay" (serve from it)
+            latency_scale: Multiplier for recorded latencies in replay mode
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.chats: List[Dict[str, Any]] = []
+        self._exchanges: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        self._upstream: Optional[httpx.AsyncBaseTransport] = None
+        if mode == "record":
+            self._file = gzip.open(path, "at", encoding="utf-8")
+        else:
+            self._load()
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = codec.loads(line)
+                if entry.get("type") == "chat":
+                    self.chats.append(entry)
+                else:
+                    self._exchanges.setdefault(entry["key"], deque()).append(entry)
+        logger.info(
+            f"[CASSETTE] Loaded {sum(len(q) for q in self._exchanges.values())} exchanges "
+            f"and {len(self.chats)} chats from {self.path}"
+        )
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        """Append an entry, flushing so the file stays readable while recording."""
+        line = codec.dumps_str(entry) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def take(self, key: str) -> Optional[Dict[str, Any]]:
+        """Next recorded exchange for a request key, or None if none is left."""
+        with self._lock:
+            queue = self._exchanges.get(key)
+            return queue.popleft() if queue else None
+
+    def upstream(self) -> httpx.AsyncBaseTransport:
+        """The real transport recorded exchanges go through, shared by all transports."""
+        if self._upstream is None:
+            self._upstream = httpx.AsyncHTTPTransport()
+        return self._upstream
+
+    def transport(self, channel: str) -> "CassetteTransport":
+        """An httpx transport recording or replaying one channel ("llm" or "mcp")."""
+        return CassetteTransport(self, channel)
+
+    def note_chat(self, entry: Dict[str, Any]) -> None:
+        """Record a finished chat: its input, token context and response."""
+        if self.mode == "record":
+            self.write({"type": "chat", **entry})
+
+    async def aclose(self) -> None:
+        if self._upstream is not None:
+            await self._upstream.aclose()
+            self._upstream = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport that records to or replays from a Cassette."""
+
+    def __init__(self, cassette: Cassette, channel: str):
+        self.cassette = cassette
+        self.channel = channel
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        key = request_key(self.channel, request.method, body)
+        if self.cassette.mode == "replay":
+            return await self._replay(key, body)
+        return await self._record(request, key, body)
+
+    async def _record(self, request: httpx.Request, key: str, body: bytes) -> httpx.Response:
+        started = time.perf_counter()
+        response = await self.cassette.upstream().handle_async_request(request)
+        try:
+            # Response.aread() decodes any Content-Encoding
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        self.cassette.write({
+            "type": "exchange",
+            "channel": self.channel,
+            "key": key,
+            "request": _describe(self.channel, body),
+            "status": response.status_code,
+            "headers": headers,
+            "body": content.decode("utf-8", errors="replace"),
+            "latency_ms": round(latency_ms, 1),
+        })
+        passthrough = [
+            (name, value) for name, value in response.headers.multi_items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        ]
+        return httpx.Response(response.status_code, headers=passthrough, content=content, request=request)
+
+    async def _replay(self, key: str, body: bytes) -> httpx.Response:
+        entry = self.cassette.take(key)
+        if entry is None:
+            raise httpx.TransportError(
+                f"No recorded {self.channel} response for {_describe(self.channel, body)} (key {key})"
+            )
+        if self.cassette.latency_scale > 0:
+            await asyncio.sleep(entry["latency_ms"] / 1000 * self.cassette.latency_scale)
+
+        content = entry["body"].encode("utf-8")
+        if self.channel == "mcp":
+            # Answer with this request's JSON-RPC id, not the recorded one
+            try:
+                request_id = codec.loads(body).get("id")
+                response = codec.loads(content)
+                if isinstance(response, dict) and "id" in response:
+                    response["id"] = request_id
+                    content = codec.dumps(response)
+            except (ValueError, AttributeError):
+                pass
+        return httpx.Response(entry["status"], headers=entry["headers"], content=content)
+
+    async def aclose(self) -> None:
+        # Clients are opened and closed per call; the cassette owns the upstream
+        pass
+
+
+_active: Optional[Cassette] = None
+
+
+def active() -> Optional[Cassette]:
+    """The process-wide cassette configured by CASSETTE_MODE, if any."""
+    global _active
+    if _active is None and settings.cassette_mode:
+        _active = Cassette(settings.cassette_path, settings.cassette_mode, settings.cassette_latency_scale)
+        logger.info(f"[CASSETTE] {settings.cassette_mode.capitalize()} mode, cassette {settings.cassette_path}")
+    return _active
+
+
+def use(cassette: Optional[Cassette]) -> None:
+    """Make a cassette the active one (used by the replay benchmark)."""
+    global _active
+    _active = cassette
+
+
+def transport_for(channel: str) -> Optional[CassetteTransport]:
+    """Transport for a channel when a cassette is active, otherwise None."""
+    cassette = active()
+    return cassette.transport(channel) if cassette is not None else None
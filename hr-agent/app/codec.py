@@ -0,0 +1,70 @@
+"""JSON codec shared by every serialization hop in the agent.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both produce compact UTF-8 output, so callers see the same bytes
+either way (apart from float formatting).
+"""
+import json
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse as _StarletteJSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Name of the active implementation, for logs and diagnostics
+name = "orjson" if orjson is not None else "json"
+
+
+def _default(value: Any) -> Any:
+    """Serialize values neither codec handles natively."""
+    return str(value)
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    Encode an object as compact JSON.
+
+    Args:
+        obj: Object to encode; unknown types are converted with str()
+        sort_keys: Emit object keys in sorted order (for stable cache keys)
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(
+        obj, default=_default, sort_keys=sort_keys, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dumps_str(obj: Any, sort_keys: bool = False) -> str:
+    """Encode an object as compact JSON text."""
+    return dumps(obj, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """
+    Decode JSON from bytes or text.
+
+    Raises:
+        ValueError: If the input is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+class JSONResponse(_StarletteJSONResponse):
+    """FastAPI response class that renders through the shared codec."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -8,13 +8,101 @@ class Settings(BaseSettings):
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8001
+    uds: str = ""  # Listen on this Unix socket instead of host/port
 
     # LLM API settings (via Kong Gateway AI Proxy)
     # Kong handles provider, model, and API key via AI Proxy plugin
-    llm_api_url: str = "http://kong-gateway:8000/api/llm"
+    llm_api_url: str = "http://kong-gateway:8000/api/llm"  # Or unix://<socket path>:<HTTP path> (app/uds.py)
+    llm_provider: str = "openai"  # "openai" (OpenAI format) or "anthropic" (native format)
+    llm_model: str = "gpt-4"  # Must match the model configured on the Kong route
+    llm_prompt_cache: bool = True  # Send prompt caching hints (cache key / cache_control)
+
+    # Model tiering (app/tiering.py): fast model for tool-selection turns,
+    # the model above for answers, hard queries and escalations
+    llm_tiering: bool = False
+    llm_fast_api_url: str = "http://kong-gateway:8000/api/llm-fast"  # Kong route of the fast tier (or unix://)
+    llm_fast_model: str = "gpt-4o-mini"  # Must match the model configured on that route
+    llm_tier_hard_min_chars: int = 400  # Longer messages use the strong model throughout
+    llm_tier_hard_keywords: str = "compare,analyze,analyse,explain,why,recommend,trend"
+    llm_tier_fast_answers: bool = False  # Keep the fast model's answers instead of rewriting them with the model above
+
+    # Agent iteration budget and loop detection (app/loop_guard.py)
+    agent_max_iterations: int = 20  # Iteration cap for hard queries
+    agent_simple_max_iterations: int = 10  # Iteration cap for other queries
+    agent_deadline_seconds: float = 60.0  # Wrap up runs expected to take longer; 0 disables
+    agent_max_repeated_calls: int = 3  # Requests of one identical tool call before the run is ended
+    agent_max_auth_errors: int = 2  # Authorization errors before the run is ended
+    agent_max_tool_errors: int = 4  # Tool errors of any kind before the run is ended
+
+    # Per-user LLM token budget (app/usage.py)
+    usage_budget_tokens: int = 0  # Tokens per user per window; 0 disables
+    usage_budget_window_seconds: int = 3600
+    usage_budget_action: str = "reject"  # "reject" (HTTP 429) or "degrade"
+    usage_degraded_max_iterations: int = 4  # Agent iteration cap for degraded runs
+
+    # Exchanged tokens in chat responses: "fingerprint" (fetch full tokens from
+    # /chat/tokens/{fingerprint}) or "full" (embed tokens and claims)
+    token_display_mode: str = "fingerprint"
+    token_store_max_entries: int = 1000
 
     # MCP Server settings (always via Kong Gateway for token exchange)
-    mcp_server_url: str = "http://kong-gateway:8000/mcp"
+    mcp_server_url: str = "http://kong-gateway:8000/mcp"  # Or unix://<socket path>:<HTTP path>
+
+    # Streaming parse of tool results (MCPClient.call_tool_stream)
+    mcp_stream_results: bool = False  # Use streaming parse for read tools
+    mcp_stream_max_bytes: int = 256 * 1024 * 1024  # Abort larger responses; 0 disables
+    mcp_stream_max_records: int = 0  # Truncate results handed to the LLM; 0 disables
+
+    # MCP streamable HTTP transport (MCPClient.call_tool_events): read tools
+    # stream array results in chunks, with progress events for /chat/ws
+    mcp_event_stream: bool = False
+
+    # Version-based revalidation of MCP tool results (MCPClient.call_tool)
+    mcp_revalidate_max_entries: int = 512  # Results kept across requests; 0 disables
+    mcp_revalidate_max_bytes: int = 1024 * 1024  # Larger results are not kept
+
+    # Speculative prefetch of likely follow-up read tool calls (app/prefetch.py)
+    prefetch_enabled: bool = False
+    prefetch_max_calls: int = 4  # Prefetch budget per agent run
+    prefetch_learn: bool = True  # Also prefetch transitions learned from earlier runs
+    prefetch_min_samples: int = 20  # Observations of a tool before learned transitions apply
+    prefetch_min_probability: float = 0.5  # Minimum learned follow-up probability
+
+    # Record/replay of LLM and MCP traffic (app/cassette.py)
+    cassette_mode: str = ""  # "record", "replay", or empty to disable
+    cassette_path: str = "/tmp/hr-agent-cassette.ndjson.gz"
+    cassette_latency_scale: float = 1.0  # Replay latency multiplier; 0 replays instantly
+
+    # On-demand profiling (app/profiling.py); admin-only, off by default
+    profiling_enabled: bool = False
+    profiling_admin_scope: str = "hr:admin"  # Scope required for profiling endpoints and headers
+    profiling_max_seconds: int = 60  # Longest allowed sampling period
+    profiling_max_profiles: int = 20  # Request profiles kept for download
+
+    # Per-request trace log (app/tracelog.py); analyze with python -m app.trace_report
+    trace_log_path: str = ""  # NDJSON file of per-request records; empty disables
+    trace_log_max_bytes: int = 50 * 1024 * 1024  # Rotate the file at this size
+    trace_log_backups: int = 5  # Rotated files kept
+    trace_log_user_salt: str = ""  # Salt of hashed user ids; use the UI's value to join their logs
+
+    # Response compression (brotli when installed, otherwise gzip)
+    response_compression: bool = True
+    compression_min_bytes: int = 1024  # Smaller single-body responses are sent as is
+
+    # Batch chat settings (/chat/batch)
+    batch_max_items: int = 500
+    batch_max_concurrency: int = 8
+
+    # WebSocket chat settings (/chat/ws)
+    ws_max_history_messages: int = 50  # Conversation kept per connection
+    ws_max_pending: int = 8  # Queued chat messages per connection
+
+    # Asynchronous job settings (/chat/jobs)
+    job_db_path: str = "/tmp/hr-agent-jobs.db"
+    job_workers: int = 4
+    job_max_queue: int = 1000
+    job_ttl_seconds: int = 3600
+    job_callback_allowed_hosts: str = ""  # Comma-separated; empty disables callbacks
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,356 @@
+"""Asynchronous chat jobs backed by an in-process worker pool and SQLite."""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from app import codec, tracelog
+from app.agent import HRAgent
+from app.auth import TokenContext
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+metrics.describe("hr_agent_job_queue_depth", "Chat jobs waiting for a worker")
+metrics.describe("hr_agent_jobs_running", "Chat jobs currently executing")
+metrics.describe("hr_agent_jobs_finished_total", "Chat jobs finished, by final status")
+
+
+class JobStore:
+    """Persistent job records in a SQLite database.
+
+    Only job metadata and results are persisted. Token contexts stay in memory,
+    so jobs that were queued or running when the process stopped cannot resume
+    and are marked failed on the next start.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    user_sub TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    callback_url TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+
+    def create(self, job_id: str, user_sub: str, message: str, callback_url: Optional[str]) -> Dict[str, Any]:
+        """Insert a new queued job and return its record."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, user_sub, status, message, callback_url, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, user_sub, QUEUED, message, callback_url, time.time()),
+            )
+        return self.get(job_id)
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """
+        Record a job's final status, unless it has already finished.
+
+        Returns:
+            Whether the job was updated; False if another outcome was
+            recorded first (e.g. a cancel racing the job's completion)
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status NOT IN (?, ?, ?)",
+                (
+                    status,
+                    codec.dumps_str(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    *FINISHED_STATUSES,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def mark_running(self, job_id: str) -> None:
+        """Mark a job as running unless it has left the queued state (was cancelled)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record as a dict, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = codec.loads(job["result"]) if job["result"] else None
+        return job
+
+    def delete_finished_before(self, cutoff: float) -> int:
+        """Delete finished jobs older than cutoff. Returns the number deleted."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (cutoff,),
+            )
+        return cursor.rowcount
+
+    def fail_unfinished(self, reason: str) -> int:
+        """Mark every queued or running job as failed. Returns the number updated."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status IN (?, ?)",
+                (FAILED, reason, time.time(), QUEUED, RUNNING),
+            )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class _PendingJob:
+    """In-memory state needed to run a job."""
+    token_context: TokenContext
+    message: str
+    chat_history: List[Dict[str, str]]
+    callback_url: Optional[str]
+
+
+class JobManager:
+    """Queue of chat jobs processed by a fixed pool of asyncio workers."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int,
+        max_queue: int,
+        ttl_seconds: int,
+        cleanup_interval_seconds: int = 60,
+        callback_allowed_hosts: Optional[List[str]] = None,
+    ):
+        self.store = store
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval_seconds = cleanup_interval_seconds
+        self.callback_allowed_hosts = set(callback_allowed_hosts or [])
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._pending: Dict[str, _PendingJob] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._tasks: List[asyncio.Task] = []
+
+        metrics.gauge_callback("hr_agent_job_queue_depth", lambda: self.queue_depth)
+        metrics.gauge_callback("hr_agent_jobs_running", lambda: len(self._running))
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        """Start worker and cleanup tasks."""
+        interrupted = await asyncio.to_thread(
+            self.store.fail_unfinished, "Job interrupted by service restart"
+        )
+        if interrupted:
+            logger.warning(f"[JOBS] Marked {interrupted} unfinished jobs from a previous run as failed")
+
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+        logger.info(f"[JOBS] Started {self.workers} job workers")
+
+    async def stop(self) -> None:
+        """Cancel workers and running jobs, then close the store."""
+        for task in [*self._tasks, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(self.store.fail_unfinished, "Job interrupted by service shutdown")
+        self.store.close()
+
+    def validate_callback_url(self, callback_url: str) -> None:
+        """Raise ValueError unless callback_url targets an allowed host."""
+        parsed = urlparse(callback_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError("callback_url must be an absolute http(s) URL")
+        if parsed.hostname not in self.callback_allowed_hosts:
+            raise ValueError(f"callback host '{parsed.hostname}' is not allowed")
+
+    async def submit(
+        self,
+        token_context: TokenContext,
+        message: str,
+        chat_history: List[Dict[str, str]],
+        callback_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a chat job.
+
+        Raises:
+            ValueError: If the callback URL is not allowed
+            asyncio.QueueFull: If the job queue is full
+        """
+        if callback_url:
+            self.validate_callback_url(callback_url)
+        if self._queue.full():
+            raise asyncio.QueueFull()
+
+        job_id = uuid.uuid4().hex
+        job = await asyncio.to_thread(
+            self.store.create, job_id, token_context.user_sub, message, callback_url
+        )
+        self._pending[job_id] = _PendingJob(token_context, message, chat_history, callback_url)
+        self._queue.put_nowait(job_id)
+        return job
+
+    async def get(self, job_id: str, user_sub: str) -> Optional[Dict[str, Any]]:
+        """Return a job if it exists and belongs to user_sub."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["user_sub"] != user_sub:
+            return None
+        return job
+
+    async def cancel(self, job_id: str, user_sub: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job. Finished jobs are returned unchanged.
+
+        A running job is cancelled asynchronously, so the returned record may
+        still show it as running.
+        """
+        job = await self.get(job_id, user_sub)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+
+        pending = self._pending.pop(job_id, None)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            await self._finish(job_id, pending, CANCELLED, error="Cancelled by user")
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                pending = self._pending.pop(job_id, None)
+                if pending is None:
+                    # Cancelled while queued
+                    continue
+                await self._run_job(job_id, pending)
+            except Exception as e:
+                logger.error(f"[JOBS] Worker {worker_id} failed on job {job_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str, pending: _PendingJob) -> None:
+        # Registered before the first await and kept until the outcome is
+        # stored, so a cancel arriving meanwhile always finds this task
+        # (cancelling a finished task does nothing) rather than finishing
+        # the job itself
+        tracelog.bind("/chat/jobs", job_id)
+        task = asyncio.create_task(self._execute(job_id, pending))
+        self._running[job_id] = task
+        try:
+            try:
+                response = await task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # The worker itself is shutting down
+                    raise
+                await self._finish(job_id, pending, CANCELLED, error="Cancelled by user")
+                return
+            except Exception as e:
+                logger.error(f"[JOBS] Job {job_id} failed: {e}", exc_info=True)
+                await self._finish(job_id, pending, FAILED, error=str(e))
+                return
+
+            await self._finish(job_id, pending, SUCCEEDED, result={
+                "response": response,
+                "user_scopes": pending.token_context.scopes_list,
+                "user_sub": pending.token_context.user_sub,
+            })
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _execute(self, job_id: str, pending: _PendingJob) -> str:
+        await asyncio.to_thread(self.store.mark_running, job_id)
+        return await HRAgent(pending.token_context).run(pending.message, pending.chat_history)
+
+    async def _finish(
+        self,
+        job_id: str,
+        pending: Optional[_PendingJob],
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        if not await asyncio.to_thread(self.store.finish, job_id, status, result, error):
+            # Already finished with another status; that outcome stands
+            logger.info(f"[JOBS] Job {job_id} already finished, not marking it {status}")
+            return
+        metrics.inc("hr_agent_jobs_finished_total", status=status)
+        logger.info(f"[JOBS] Job {job_id} finished with status {status}")
+
+        if pending and pending.callback_url:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            await self._send_callback(pending.callback_url, job)
+
+    async def _send_callback(self, callback_url: str, job: Dict[str, Any]) -> None:
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    callback_url,
+                    content=codec.dumps(job),
+                    headers={"Content-Type": "application/json"},
+                    timeout=10.0,
+                )
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"[JOBS] Callback for job {job['id']} to {callback_url} failed: {e}")
+
+    async def _cleanup_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.cleanup_interval_seconds)
+            try:
+                deleted = await asyncio.to_thread(
+                    self.store.delete_finished_before, time.time() - self.ttl_seconds
+                )
+                if deleted:
+                    logger.info(f"[JOBS] Deleted {deleted} expired jobs")
+            except Exception as e:
+                logger.error(f"[JOBS] Cleanup failed: {e}", exc_info=True)
@@ -0,0 +1,234 @@
+"""Loop detection and adaptive iteration budgets for agent runs.
+
+A confused model can call the same tool with the same arguments over and
+over, or keep retrying after authorization errors; every wasted iteration is
+a full LLM round trip. ``GuardedAgentExecutor`` watches each run:
+
+- A read call identical to an earlier one of the run (same tool, same
+  arguments) is not executed again. The model gets the earlier result back,
+  with a note to use it. Write tools always run, and a write makes earlier
+  read results stale, so none are reused after it.
+- The run stops early with a forced final answer, which the model writes from
+  the tool results so far without being offered tools, when:
+
+  - an identical call was requested AGENT_MAX_REPEATED_CALLS times
+    ("repeated_call")
+  - AGENT_MAX_AUTH_ERRORS tool calls failed authorization ("auth_errors")
+  - AGENT_MAX_TOOL_ERRORS tool calls failed in total ("tool_errors")
+  - another iteration, at the run's average iteration time, would end after
+    the run's deadline ("deadline")
+  - only one iteration of the budget is left ("budget")
+
+The iteration budget follows the query (``iteration_budget``): hard queries
+(see tiering.is_hard_query) get AGENT_MAX_ITERATIONS, others
+AGENT_SIMPLE_MAX_ITERATIONS.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from pydantic import PrivateAttr
+
+from app import codec, tiering
+from app.config import settings
+from app.metrics import metrics
+from app.tools import WRITE_TOOLS
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("hr_agent_loop_aborts_total", "Agent runs ended early with a forced final answer, by reason")
+metrics.describe("hr_agent_loop_repeated_calls_total", "Repeated identical tool calls answered from the earlier result")
+
+# Tool errors that retrying will not fix: Kong rejections and MCP scope errors
+_AUTH_ERROR = re.compile(
+    r"\b(401|403)\b|unauthori[sz]ed|forbidden|insufficient permissions|missing scope|permission denied",
+    re.IGNORECASE,
+)
+
+REPEAT_NOTE = (
+    "NOTE: This exact tool call was already made in this conversation turn; the result above is the "
+    "earlier one. Use it to answer instead of calling the tool again."
+)
+
+_ABORT_REASONS = {
+    "repeated_call": "The same tool call has been requested repeatedly.",
+    "auth_errors": "Tool calls keep failing authorization, and retrying will not change that.",
+    "tool_errors": "Tool calls keep failing.",
+    "deadline": "There is no time left for more tool calls.",
+    "budget": "The tool call budget for this request is used up.",
+}
+
+# Longest tool result quoted in a forced final answer request
+_MAX_RESULT_CHARS = 8000
+
+# Writes the answer for an aborted run: (inputs, steps, reason, callbacks)
+FinalAnswer = Callable[[Dict[str, Any], List[Tuple[AgentAction, str]], str, Any], Awaitable[str]]
+
+
+def iteration_budget(message: str) -> int:
+    """Iteration cap for a message: the full budget for hard queries only."""
+    if tiering.is_hard_query(message):
+        return settings.agent_max_iterations
+    return settings.agent_simple_max_iterations
+
+
+def is_auth_error(observation: Any) -> bool:
+    """Whether a tool result is an authorization failure."""
+    return isinstance(observation, str) and observation.startswith("ERROR:") and bool(_AUTH_ERROR.search(observation))
+
+
+def final_answer_request(steps: List[Tuple[AgentAction, str]], reason: str) -> str:
+    """Instruction for the forced final answer, quoting the run's tool results."""
+    lines = [
+        f"Stop calling tools. {_ABORT_REASONS.get(reason, '')}",
+        "Answer my request now using only the tool results below. If they are not enough, say what could "
+        "not be retrieved and why; for authorization errors, say that I lack the necessary permissions.",
+        "",
+        "Tool results so far:",
+    ]
+    if not steps:
+        lines.append("(none)")
+    for action, observation in steps:
+        text = observation if isinstance(observation, str) else str(observation)
+        if len(text) > _MAX_RESULT_CHARS:
+            text = text[:_MAX_RESULT_CHARS] + " [truncated]"
+        lines.append(f"- {action.tool}({codec.dumps_str(action.tool_input, sort_keys=True)}): {text}")
+    return "\n".join(lines)
+
+
+class LoopGuard:
+    """Per-run state and limits: identical calls, errors, iterations and time."""
+
+    def __init__(self, max_iterations: int, deadline: Optional[float] = None):
+        """
+        Initialize the guard for one run.
+
+        Args:
+            max_iterations: Iteration budget of the run
+            deadline: time.monotonic() value the run should finish by, or None
+        """
+        self.max_iterations = max(1, max_iterations)
+        self.deadline = deadline
+        self.iterations = 0
+        self.requests: Counter = Counter()
+        self.auth_errors = 0
+        self.tool_errors = 0
+        # Reason the run was ended early, if it was
+        self.aborted: Optional[str] = None
+        self._started: Optional[float] = None
+
+    @staticmethod
+    def call_key(action: AgentAction) -> str:
+        """Identity of a tool call: tool name and canonical arguments."""
+        return f"{action.tool} {codec.dumps_str(action.tool_input, sort_keys=True)}"
+
+    def note_call(self, key: str) -> int:
+        """Count a requested call, returning how often it has been requested."""
+        self.requests[key] += 1
+        return self.requests[key]
+
+    def note_result(self, observation: Any) -> None:
+        """Count a tool result towards the error limits."""
+        if isinstance(observation, str) and observation.startswith("ERROR:"):
+            self.tool_errors += 1
+            if is_auth_error(observation):
+                self.auth_errors += 1
+
+    def check(self) -> Optional[str]:
+        """
+        Decide whether the next iteration may run; counts it if so.
+
+        Returns:
+            None to continue, or the reason to stop with a forced final answer
+        """
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+
+        reason = None
+        if self.requests and max(self.requests.values()) >= settings.agent_max_repeated_calls:
+            reason = "repeated_call"
+        elif self.auth_errors >= settings.agent_max_auth_errors:
+            reason = "auth_errors"
+        elif self.tool_errors >= settings.agent_max_tool_errors:
+            reason = "tool_errors"
+        elif self.iterations and self.iterations >= self.max_iterations - 1:
+            reason = "budget"
+        elif self.iterations and self.deadline is not None:
+            average = (now - self._started) / self.iterations
+            if now + average > self.deadline:
+                reason = "deadline"
+
+        if reason is None:
+            self.iterations += 1
+        else:
+            self.aborted = reason
+        return reason
+
+
+class GuardedAgentExecutor(AgentExecutor):
+    """AgentExecutor that short-circuits repeated calls and ends runs stuck in loops."""
+
+    loop_guard: LoopGuard
+    final_answer: FinalAnswer
+    # Read tool calls of this run since its last write, by call key, finished or in flight
+    _calls: Dict[str, "asyncio.Future[AgentStep]"] = PrivateAttr(default_factory=dict)
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, Any],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: Optional[Any] = None,
+    ):
+        reason = self.loop_guard.check()
+        if reason is not None:
+            logger.warning(
+                f"[LOOP] Ending run after {self.loop_guard.iterations} iterations ({reason}), forcing final answer"
+            )
+            metrics.inc("hr_agent_loop_aborts_total", reason=reason)
+            callbacks = run_manager.get_child() if run_manager else None
+            output = await self.final_answer(inputs, intermediate_steps, reason, callbacks)
+            yield AgentFinish({"output": output}, log=f"Forced final answer ({reason})")
+            return
+
+        async for step in super()._aiter_next_step(
+            name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+        ):
+            yield step
+
+    async def _aperform_agent_action(
+        self,
+        name_to_tool_map: Dict[str, Any],
+        color_mapping: Dict[str, str],
+        agent_action: AgentAction,
+        run_manager: Optional[Any] = None,
+    ) -> AgentStep:
+        key = self.loop_guard.call_key(agent_action)
+        count = self.loop_guard.note_call(key)
+        if agent_action.tool in WRITE_TOOLS:
+            step = await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+            self.loop_guard.note_result(step.observation)
+            self._calls.clear()
+            return step
+
+        earlier = self._calls.get(key)
+        if earlier is None:
+            earlier = self._calls[key] = asyncio.ensure_future(
+                super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+            )
+            step = await earlier
+            self.loop_guard.note_result(step.observation)
+            return step
+
+        # Same call as before (or in flight in this batch): reuse its result
+        logger.info(f"[LOOP] Repeated call to {agent_action.tool} (#{count}), answering from the earlier result")
+        metrics.inc("hr_agent_loop_repeated_calls_total", tool=agent_action.tool)
+        step = await asyncio.shield(earlier)
+        return AgentStep(action=agent_action, observation=f"{step.observation}\n\n{REPEAT_NOTE}")
@@ -1,17 +1,25 @@
 """FastAPI application for HR Agent."""
+import asyncio
 import logging
 import base64
-import json
+import time
 from typing import List, Optional, Dict, Any
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 
+from app import cassette, codec, profiling, tracelog
 from app.config import settings
 from app.auth import TokenContext, get_token_context
+from app.compression import CompressionMiddleware
 from app.agent import HRAgent
+from app.jobs import JobManager, JobStore
+from app.token_store import TokenStore
+from app.metrics import metrics
+from app.usage import UsageTracker, usage_ledger
 
 # Configure logging
 logging.basicConfig(
@@ -34,8 +42,7 @@ def decode_jwt_payload(token: str) -> Optional[Dict[str, Any]]:
         if padding != 4:
             payload_b64 += '=' * padding
 
-        payload_json = base64.urlsafe_b64decode(payload_b64).decode('utf-8')
-        return json.loads(payload_json)
+        return codec.loads(base64.urlsafe_b64decode(payload_b64))
     except Exception as e:
         logger.error(f"Error decoding JWT: {e}")
         return None
@@ -54,12 +61,47 @@ class ChatRequest(BaseModel):
     chat_history: Optional[List[ChatMessage]] = None
 
 
+class BatchChatItem(BaseModel):
+    """Single message within a batch chat request."""
+    id: Optional[str] = None  # Caller-supplied correlation id, echoed back
+    message: str
+    chat_history: Optional[List[ChatMessage]] = None
+
+
+class BatchChatRequest(BaseModel):
+    """Batch chat request model."""
+    items: List[BatchChatItem] = Field(min_length=1)
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
+
+class JobRequest(BaseModel):
+    """Asynchronous chat job request model."""
+    message: str
+    chat_history: Optional[List[ChatMessage]] = None
+    callback_url: Optional[str] = None  # Receives the finished job as a POST
+
+
+class JobResponse(BaseModel):
+    """Asynchronous chat job status model."""
+    id: str
+    status: str
+    message: str
+    callback_url: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
 class TokenInfo(BaseModel):
     """Token information model."""
-    token: str
-    claims: Optional[Dict[str, Any]] = None
+    fingerprint: str  # Key for GET /chat/tokens/{fingerprint}
+    token: Optional[str] = None  # Only with TOKEN_DISPLAY_MODE=full
+    claims: Optional[Dict[str, Any]] = None  # Only with TOKEN_DISPLAY_MODE=full
     hop: int  # Which hop in the exchange chain (1 = first exchange to HR Agent)
     description: str
+    audience: Optional[str] = None
 
 
 class ExchangedTokensInfo(BaseModel):
@@ -67,12 +109,26 @@ class ExchangedTokensInfo(BaseModel):
     tokens: List[TokenInfo]
 
 
+class UsageInfo(BaseModel):
+    """LLM token usage of one chat request."""
+    llm_calls: int
+    total_tokens: int
+    input_tokens: int
+    cached_input_tokens: int
+    cache_write_tokens: int
+    uncached_input_tokens: int
+    output_tokens: int
+    tool_calls: int
+    tool_path: str
+
+
 class ChatResponse(BaseModel):
     """Chat response model."""
     response: str
     user_scopes: List[str]
     user_sub: str
     exchanged_token: Optional[ExchangedTokensInfo] = None
+    usage: Optional[UsageInfo] = None
 
 
 class HealthResponse(BaseModel):
@@ -88,16 +144,37 @@ async def lifespan(app: FastAPI):
     logger.info("Starting HR Agent service...")
     logger.info(f"LLM API URL: {settings.llm_api_url} (Kong AI Proxy)")
     logger.info(f"MCP Server URL: {settings.mcp_server_url}")
+
+    app.state.job_manager = JobManager(
+        JobStore(settings.job_db_path),
+        workers=settings.job_workers,
+        max_queue=settings.job_max_queue,
+        ttl_seconds=settings.job_ttl_seconds,
+        callback_allowed_hosts=[
+            host.strip() for host in settings.job_callback_allowed_hosts.split(",") if host.strip()
+        ],
+    )
+    await app.state.job_manager.start()
     yield
     logger.info("Shutting down HR Agent service...")
+    await app.state.job_manager.stop()
+    if cassette.active() is not None:
+        await cassette.active().aclose()
 
 
+metrics.describe("hr_agent_ws_connections_total", "WebSocket chat connections opened")
+
+# Close code of WebSocket chats whose token expired; the client reconnects
+# through Kong to get a fresh one
+WS_TOKEN_EXPIRED = 4401
+
 # Create FastAPI app
 app = FastAPI(
     title="HR Agent",
     description="AI Agent for HR operations using Claude and MCP",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=codec.JSONResponse,
 )
 
 # Add CORS middleware
@@ -109,6 +186,145 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses for clients that accept it (the Flask UI, via Kong)
+if settings.response_compression:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
+
+token_store = TokenStore(settings.token_store_max_entries)
+
+
+def make_token_info(
+    token: str,
+    claims: Optional[Dict[str, Any]],
+    hop: int,
+    description: str,
+    user_sub: str,
+) -> TokenInfo:
+    """Store an exchanged token and describe it for a chat response."""
+    fp = token_store.put(token, claims, hop, description, user_sub)
+    audience = (claims or {}).get("aud")
+    if isinstance(audience, list):
+        audience = ", ".join(audience)
+    full = settings.token_display_mode == "full"
+    return TokenInfo(
+        fingerprint=fp,
+        token=token if full else None,
+        claims=claims if full else None,
+        hop=hop,
+        description=description,
+        audience=audience,
+    )
+
+
+def enforce_token_budget(token_context: TokenContext) -> None:
+    """
+    Reject requests from users over their LLM token budget.
+
+    Only applies when the budget action is "reject"; with "degrade" the agent
+    runs a cheaper version of the request instead.
+
+    Raises:
+        HTTPException: 429 with Retry-After if the user is over budget
+    """
+    if settings.usage_budget_action == "degrade" or not usage_ledger.over_budget(token_context.user_sub):
+        return
+    metrics.inc("hr_agent_usage_over_budget_total", action="reject")
+    logger.warning(f"[USAGE] User {token_context.user_sub} is over the token budget, rejecting")
+    raise HTTPException(
+        status_code=429,
+        detail="LLM token budget exceeded, try again later",
+        headers={"Retry-After": str(usage_ledger.seconds_until_reset())},
+    )
+
+
+async def require_profiling_admin(
+    token_context: TokenContext = Depends(get_token_context),
+) -> TokenContext:
+    """Allow profiling endpoints only when profiling is enabled and the caller is an admin."""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_context.has_scope(settings.profiling_admin_scope):
+        raise HTTPException(status_code=403, detail=f"Requires scope {settings.profiling_admin_scope}")
+    return token_context
+
+
+def collect_exchanged_tokens(token_context: TokenContext, agent: HRAgent) -> List[TokenInfo]:
+    """
+    Describe the tokens Kong exchanged for this request (hop 1) and for the
+    agent's MCP calls (hop 2, captured by the MCP client).
+
+    Args:
+        token_context: Token context of the request
+        agent: Agent that served the request
+
+    Returns:
+        Token descriptions for the response, in hop order
+    """
+    # Extract token from x-introspection-token header (Hop 1: HR Agent token)
+    # Kong sends the exchanged token in x-introspection-token header (base64-encoded RFC 8693 response)
+    exchanged_tokens = []
+
+    # Use the exchanged token from token_context (already extracted from x-introspection-token)
+    token = token_context.exchanged_token
+
+    # Fallback to Authorization header if no exchanged token found
+    if not token and token_context.authorization:
+        logger.warning("[TOKEN] No exchanged token found, falling back to Authorization header")
+        token = token_context.authorization
+        if token.startswith('Bearer '):
+            token = token[7:]
+        elif token.startswith('bearer '):
+            token = token[7:]
+
+    if token:
+        # Decode the token
+        token_claims = decode_jwt_payload(token)
+
+        # Log token details for debugging
+        logger.info(f"\n[TOKEN_DEBUG] Hop 1 - HR Agent received token from Kong:")
+        logger.info(f"  Token preview: {token[:20]}...{token[-20:]}")
+        logger.info(f"  Audience (aud): {token_claims.get('aud') if token_claims else 'Failed to decode'}")
+        logger.info(f"  Subject (sub): {token_claims.get('sub') if token_claims else 'Failed to decode'}")
+        logger.info(f"  Scopes: {token_claims.get('scope') if token_claims else 'Failed to decode'}")
+
+        exchanged_tokens.append(make_token_info(
+            token=token,
+            claims=token_claims,
+            hop=1,
+            description='Token exchanged by Kong OIDC for HR Agent (Hop 1: Flask UI → HR Agent)',
+            user_sub=token_context.user_sub,
+        ))
+
+    # Extract MCP token if available (Hop 2: MCP Server token)
+    if agent.mcp_client.last_mcp_token:
+        mcp_token = agent.mcp_client.last_mcp_token
+
+        # Remove 'Bearer ' prefix if present
+        if mcp_token.startswith('Bearer '):
+            mcp_token = mcp_token[7:]
+        elif mcp_token.startswith('bearer '):
+            mcp_token = mcp_token[7:]
+
+        # Decode the token
+        mcp_token_claims = decode_jwt_payload(mcp_token)
+
+        # Log token details for debugging
+        logger.info(f"\n[TOKEN_DEBUG] Hop 2 - MCP Server token captured:")
+        logger.info(f"  Audience (aud): {mcp_token_claims.get('aud') if mcp_token_claims else 'Failed to decode'}")
+        logger.info(f"  Subject (sub): {mcp_token_claims.get('sub') if mcp_token_claims else 'Failed to decode'}")
+        logger.info(f"  Scopes: {mcp_token_claims.get('scope') if mcp_token_claims else 'Failed to decode'}")
+
+        exchanged_tokens.append(make_token_info(
+            token=mcp_token,
+            claims=mcp_token_claims,
+            hop=2,
+            description='Token exchanged by Kong OIDC for MCP Server (Hop 2: HR Agent → MCP Server)',
+            user_sub=token_context.user_sub,
+        ))
+
+    return exchanged_tokens
+
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
@@ -123,6 +339,7 @@ async def health_check():
 @app.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    http_response: Response,
     token_context: TokenContext = Depends(get_token_context),
     raw_request: Request = None,
 ):
@@ -140,10 +357,12 @@ async def chat(
         request: Chat request with message and optional history
         token_context: Token context injected by FastAPI dependency
         raw_request: Raw FastAPI request to inspect headers
+        http_response: Response whose headers carry X-Profile-Id when profiled
 
     Returns:
         Chat response with agent's reply
     """
+    enforce_token_budget(token_context)
     try:
         # Log ALL headers to see where Kong might be sending the exchanged token
         logger.info("\n" + "="*80)
@@ -161,6 +380,7 @@ async def chat(
 
         # Create agent instance
         agent = HRAgent(token_context)
+        tracelog.bind("/chat", raw_request.headers.get(tracelog.REQUEST_ID_HEADER))
 
         # Convert chat history to dict format
         chat_history = []
@@ -171,73 +391,29 @@ async def chat(
             ]
 
         # Process message
-        response = await agent.chat(request.message, chat_history)
-
-        # Extract token from x-introspection-token header (Hop 1: HR Agent token)
-        # Kong sends the exchanged token in x-introspection-token header (base64-encoded RFC 8693 response)
-        exchanged_tokens = []
-
-        # Use the exchanged token from token_context (already extracted from x-introspection-token)
-        token = token_context.exchanged_token
-
-        # Fallback to Authorization header if no exchanged token found
-        if not token and token_context.authorization:
-            logger.warning("[TOKEN] No exchanged token found, falling back to Authorization header")
-            token = token_context.authorization
-            if token.startswith('Bearer '):
-                token = token[7:]
-            elif token.startswith('bearer '):
-                token = token[7:]
-
-        if token:
-            # Decode the token
-            token_claims = decode_jwt_payload(token)
-
-            # Log token details for debugging
-            logger.info(f"\n[TOKEN_DEBUG] Hop 1 - HR Agent received token from Kong:")
-            logger.info(f"  Token preview: {token[:20]}...{token[-20:]}")
-            logger.info(f"  Audience (aud): {token_claims.get('aud') if token_claims else 'Failed to decode'}")
-            logger.info(f"  Subject (sub): {token_claims.get('sub') if token_claims else 'Failed to decode'}")
-            logger.info(f"  Scopes: {token_claims.get('scope') if token_claims else 'Failed to decode'}")
-
-            exchanged_tokens.append(TokenInfo(
-                token=token,
-                claims=token_claims,
-                hop=1,
-                description='Token exchanged by Kong OIDC for HR Agent (Hop 1: Flask UI → HR Agent)'
-            ))
-
-        # Extract MCP token if available (Hop 2: MCP Server token)
-        if agent.mcp_client.last_mcp_token:
-            mcp_token = agent.mcp_client.last_mcp_token
-
-            # Remove 'Bearer ' prefix if present
-            if mcp_token.startswith('Bearer '):
-                mcp_token = mcp_token[7:]
-            elif mcp_token.startswith('bearer '):
-                mcp_token = mcp_token[7:]
-
-            # Decode the token
-            mcp_token_claims = decode_jwt_payload(mcp_token)
-
-            # Log token details for debugging
-            logger.info(f"\n[TOKEN_DEBUG] Hop 2 - MCP Server token captured:")
-            logger.info(f"  Audience (aud): {mcp_token_claims.get('aud') if mcp_token_claims else 'Failed to decode'}")
-            logger.info(f"  Subject (sub): {mcp_token_claims.get('sub') if mcp_token_claims else 'Failed to decode'}")
-            logger.info(f"  Scopes: {mcp_token_claims.get('scope') if mcp_token_claims else 'Failed to decode'}")
-
-            exchanged_tokens.append(TokenInfo(
-                token=mcp_token,
-                claims=mcp_token_claims,
-                hop=2,
-                description='Token exchanged by Kong OIDC for MCP Server (Hop 2: HR Agent → MCP Server)'
-            ))
+        usage = UsageTracker()
+        if (
+            settings.profiling_enabled
+            and raw_request.headers.get("X-Profile-Request")
+            and token_context.has_scope(settings.profiling_admin_scope)
+        ):
+            # Admin asked for a deterministic profile of this call
+            with profiling.capture(f"/chat {token_context.user_sub}") as capture:
+                response = await agent.chat(request.message, chat_history, usage)
+            if capture.profile_id:
+                http_response.headers["X-Profile-Id"] = capture.profile_id
+                logger.info(f"[PROFILE] Stored request profile {capture.profile_id}")
+        else:
+            response = await agent.chat(request.message, chat_history, usage)
+
+        exchanged_tokens = collect_exchanged_tokens(token_context, agent)
 
         return ChatResponse(
             response=response,
             user_scopes=token_context.scopes_list,
             user_sub=token_context.user_sub,
             exchanged_token=ExchangedTokensInfo(tokens=exchanged_tokens) if exchanged_tokens else None,
+            usage=UsageInfo(**usage.summary()),
         )
 
     except Exception as e:
@@ -248,6 +424,351 @@ async def chat(
         )
 
 
+@app.post("/chat/batch")
+async def chat_batch(
+    request: BatchChatRequest,
+    raw_request: Request,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """
+    Batch chat endpoint for processing many messages under one token context.
+
+    All items share one agent (LLM client, MCP tool catalog and read-only tool
+    result cache). Items run with bounded concurrency and results are streamed
+    back as NDJSON in completion order, one line per item, followed by a
+    summary line.
+
+    Args:
+        request: Batch of chat messages
+        raw_request: Raw FastAPI request, for its request id
+        token_context: Token context injected by FastAPI dependency
+
+    Returns:
+        NDJSON stream of per-item results
+    """
+    enforce_token_budget(token_context)
+    if len(request.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {settings.batch_max_items})",
+        )
+
+    max_concurrency = min(
+        request.max_concurrency or settings.batch_max_concurrency,
+        settings.batch_max_concurrency,
+    )
+    logger.info(
+        f"Batch chat request from user {token_context.user_sub}: "
+        f"{len(request.items)} items, concurrency {max_concurrency}"
+    )
+
+    agent = HRAgent(token_context)
+    items = [
+        {
+            "id": item.id,
+            "message": item.message,
+            "chat_history": [
+                {"role": msg.role, "content": msg.content}
+                for msg in item.chat_history
+            ] if item.chat_history else [],
+        }
+        for item in request.items
+    ]
+
+    request_id = raw_request.headers.get(tracelog.REQUEST_ID_HEADER)
+
+    async def generate():
+        tracelog.bind("/chat/batch", request_id)
+        started = time.perf_counter()
+        succeeded = failed = 0
+        async for result in agent.chat_many(items, max_concurrency):
+            if result["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+            yield codec.dumps({"type": "result", **result}) + b"\n"
+
+        yield codec.dumps({
+            "type": "summary",
+            "total": len(items),
+            "succeeded": succeeded,
+            "failed": failed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "tool_cache": {"hits": agent.tool_cache.hits, "misses": agent.tool_cache.misses},
+            "user_sub": token_context.user_sub,
+        }) + b"\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.websocket("/chat/ws")
+async def chat_websocket(
+    websocket: WebSocket,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """
+    Persistent chat channel: authenticated once (on the upgrade request that
+    Kong validates), with conversation history kept here for the life of the
+    connection.
+
+    Client messages (JSON):
+        {"type": "chat", "id": "...", "message": "..."}
+        {"type": "reset", "history": [...]}  - replace the conversation (e.g.
+            with the client's copy after a reconnect); no history forgets it
+        {"type": "ping"}
+
+    Server messages (JSON):
+        {"type": "ready", "user_sub": ..., "user_scopes": [...]}
+        {"type": "event", "id": ..., "event": "tool_start" | "tool_progress" | "tool_end" | "token", ...}
+        {"type": "response", "id": ..., "response": ..., "usage": ..., "exchanged_token": ...}
+        {"type": "error", "id": ..., "status": ..., "error": ...}
+        {"type": "pong"}
+
+    Chat messages are answered one at a time, in order; events and replies
+    carry the id of the message they belong to.
+
+    The token is fixed when the connection opens. When it expires, the
+    connection is closed with code 4401 (WS_TOKEN_EXPIRED) so the client
+    reconnects with a fresh one.
+    """
+    await websocket.accept()
+    logger.info(
+        f"WebSocket chat opened for user {token_context.user_sub} "
+        f"with scopes: {token_context.scopes_list}"
+    )
+    metrics.inc("hr_agent_ws_connections_total")
+
+    # One agent per connection: the LLM client and tool catalog are reused by
+    # every message. The tool result cache is not: it is never revalidated,
+    # so each message starts with an empty one.
+    agent = HRAgent(token_context)
+    history: List[Dict[str, str]] = []
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ws_max_pending)
+    send_lock = asyncio.Lock()
+
+    async def send(message: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_text(codec.dumps_str(message))
+
+    request_id = websocket.headers.get(tracelog.REQUEST_ID_HEADER)
+
+    async def close_on_expiry(expires_at: float) -> None:
+        await asyncio.sleep(max(0.0, expires_at - time.time()))
+        logger.info(f"WebSocket chat token expired for user {token_context.user_sub}, closing")
+        await websocket.close(code=WS_TOKEN_EXPIRED, reason="Token expired")
+
+    async def answer(message_id: Any, text: str) -> None:
+        tracelog.bind("/chat/ws", request_id, msg=message_id)
+        if usage_ledger.over_budget(token_context.user_sub) and settings.usage_budget_action != "degrade":
+            metrics.inc("hr_agent_usage_over_budget_total", action="reject")
+            await send({"type": "error", "id": message_id, "status": 429,
+                        "error": "LLM token budget exceeded, try again later"})
+            return
+        agent.tool_cache.invalidate()
+        usage = UsageTracker()
+        response = None
+        try:
+            async for event in agent.stream_chat(text, list(history), usage):
+                if event["event"] == "final":
+                    response = event["response"]
+                else:
+                    await send({"type": "event", "id": message_id, **event})
+        except Exception as e:
+            logger.error(f"WebSocket chat error: {e}", exc_info=True)
+            await send({"type": "error", "id": message_id, "status": 500, "error": str(e)})
+            return
+
+        history.extend([{"role": "user", "content": text}, {"role": "assistant", "content": response}])
+        del history[:-settings.ws_max_history_messages]
+        exchanged_tokens = collect_exchanged_tokens(token_context, agent)
+        await send({
+            "type": "response",
+            "id": message_id,
+            "response": response,
+            "usage": usage.summary(),
+            "exchanged_token": ExchangedTokensInfo(tokens=exchanged_tokens).model_dump() if exchanged_tokens else None,
+        })
+
+    async def worker() -> None:
+        try:
+            while True:
+                message_id, text = await queue.get()
+                await answer(message_id, text)
+        except Exception as e:
+            # Most likely the connection is gone; make sure the receive loop ends too
+            logger.error(f"WebSocket chat worker failed: {e}", exc_info=True)
+            try:
+                await websocket.close(code=1011, reason="Internal error")
+            except Exception:
+                pass
+
+    worker_task = asyncio.create_task(worker())
+    expires_at = token_context.expires_at
+    expiry_task = asyncio.create_task(close_on_expiry(expires_at)) if expires_at is not None else None
+    try:
+        await send({"type": "ready", "user_sub": token_context.user_sub, "user_scopes": token_context.scopes_list})
+        while True:
+            try:
+                message = codec.loads(await websocket.receive_text())
+            except ValueError:
+                await send({"type": "error", "id": None, "status": 400, "error": "Invalid JSON"})
+                continue
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "ping":
+                await send({"type": "pong"})
+            elif kind == "reset":
+                history[:] = [
+                    {"role": msg["role"], "content": msg["content"]}
+                    for msg in message.get("history") or []
+                    if isinstance(msg, dict) and isinstance(msg.get("content"), str)
+                    and msg.get("role") in ("user", "assistant")
+                ][-settings.ws_max_history_messages:]
+            elif kind == "chat" and isinstance(message.get("message"), str) and message["message"]:
+                try:
+                    queue.put_nowait((message.get("id"), message["message"]))
+                except asyncio.QueueFull:
+                    await send({"type": "error", "id": message.get("id"), "status": 503,
+                                "error": "Too many pending messages"})
+            else:
+                await send({"type": "error", "id": message.get("id") if isinstance(message, dict) else None,
+                            "status": 400, "error": "Expected a chat, reset or ping message"})
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket chat closed for user {token_context.user_sub}")
+    finally:
+        worker_task.cancel()
+        if expiry_task is not None:
+            expiry_task.cancel()
+
+
+@app.post("/chat/jobs", response_model=JobResponse, status_code=202)
+async def create_chat_job(
+    request: JobRequest,
+    raw_request: Request,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """
+    Enqueue a chat message as an asynchronous job.
+
+    Returns immediately with the job id. Poll GET /chat/jobs/{id} for the
+    result, or pass callback_url to have the finished job POSTed back.
+    """
+    enforce_token_budget(token_context)
+    chat_history = [
+        {"role": msg.role, "content": msg.content}
+        for msg in request.chat_history
+    ] if request.chat_history else []
+
+    try:
+        job = await raw_request.app.state.job_manager.submit(
+            token_context, request.message, chat_history, request.callback_url
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Job queue is full, try again later")
+
+    logger.info(f"Queued chat job {job['id']} for user {token_context.user_sub}")
+    return job
+
+
+@app.get("/chat/jobs/{job_id}", response_model=JobResponse)
+async def get_chat_job(
+    job_id: str,
+    raw_request: Request,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """Get the status and, once finished, the result of a chat job."""
+    job = await raw_request.app.state.job_manager.get(job_id, token_context.user_sub)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.delete("/chat/jobs/{job_id}", response_model=JobResponse, status_code=202)
+async def cancel_chat_job(
+    job_id: str,
+    raw_request: Request,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """Cancel a queued or running chat job."""
+    job = await raw_request.app.state.job_manager.cancel(job_id, token_context.user_sub)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/chat/tokens/{fingerprint}")
+async def get_exchanged_token(
+    fingerprint: str,
+    token_context: TokenContext = Depends(get_token_context),
+):
+    """Full exchanged token and claims for a fingerprint from one of the caller's chats."""
+    entry = token_store.get(fingerprint, token_context.user_sub)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Token not found")
+    entry.pop("user_sub")
+    return entry
+
+
+@app.get("/chat/usage")
+async def get_chat_usage(token_context: TokenContext = Depends(get_token_context)):
+    """The caller's LLM token usage and budget for the current window."""
+    return {"user_sub": token_context.user_sub, **usage_ledger.status(token_context.user_sub)}
+
+
+@app.get("/chat/admin/profile", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    token_context: TokenContext = Depends(require_profiling_admin),
+):
+    """
+    Sample every thread's stack for a while and return collapsed stacks.
+
+    The response is a flamegraph.pl / speedscope compatible .folded file.
+    """
+    seconds = min(seconds, settings.profiling_max_seconds)
+    logger.info(f"[PROFILE] Sampling stacks for {seconds}s (requested by {token_context.user_sub})")
+    folded = await asyncio.to_thread(profiling.sample_stacks, seconds, interval_ms / 1000)
+    return PlainTextResponse(
+        folded, headers={"Content-Disposition": 'attachment; filename="hr-agent.folded"'}
+    )
+
+
+@app.get("/chat/admin/profiles")
+async def list_profiles(token_context: TokenContext = Depends(require_profiling_admin)):
+    """List stored request profiles (captured with the X-Profile-Request header)."""
+    return {"profiles": profiling.profile_store.list()}
+
+
+@app.get("/chat/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    token_context: TokenContext = Depends(require_profiling_admin),
+):
+    """Download a request profile as a pstats file, or as a text report with format=text."""
+    if format == "text":
+        report = profiling.profile_store.report(profile_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return PlainTextResponse(report)
+    data = profiling.profile_store.get(profile_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus metrics endpoint."""
+    return metrics.render()
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -257,6 +778,11 @@ async def root():
         "endpoints": {
             "health": "/health",
             "chat": "/chat",
+            "chat_batch": "/chat/batch",
+            "chat_jobs": "/chat/jobs",
+            "chat_usage": "/chat/usage",
+            "chat_ws": "/chat/ws",
+            "metrics": "/metrics",
         },
     }
 
@@ -264,10 +790,12 @@ async def root():
 if __name__ == "__main__":
     import uvicorn
 
+    # UDS=/path/to.sock listens on a Unix socket (same as uvicorn --uds)
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
+        uds=settings.uds or None,
         reload=True,
         log_level="info",
     )
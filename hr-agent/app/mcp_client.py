@@ -1,21 +1,114 @@
 """MCP (Model Context Protocol) client for calling HR MCP Server tools."""
+import hashlib
 import httpx
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app import codec
+from app.compression import ACCEPT_ENCODING
+from app import tracelog, uds
 from app.config import settings
+from app.mcp_stream import EnvelopeScanner, EventStreamDecoder, RecordDecoder
+from app.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+metrics.describe(
+    "hr_agent_mcp_revalidation_total",
+    "Versioned MCP tool calls, by outcome (miss, unchanged, changed)",
+)
+
+
+class RevalidationCache:
+    """LRU of versioned MCP tool results, shared by all clients.
+
+    The MCP server tags read results with the version of the data they were
+    built from. A cached result is never served blindly: the call is still
+    made, with the cached version as known_version, and the server answers
+    "unchanged" without a payload if it is still current. Results stay
+    fresh without TTLs, and an unchanged result costs a round trip but no
+    transfer, serialization or parsing of the data.
+
+    Entries are keyed by user, scopes, tool and arguments, so results are
+    only ever reused for the same user.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Results kept; 0 disables the cache
+            max_bytes: Larger results are not kept
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any], headers: Dict[str, str]) -> str:
+        """Key of a tool call for one user and scope set."""
+        digest = hashlib.sha256()
+        for part in (headers.get("X-User-Sub") or "", headers.get("X-User-Scopes") or "", tool_name):
+            digest.update(part.encode("utf-8") + b"\0")
+        digest.update(codec.dumps(arguments, sort_keys=True))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[int, str]]:
+        """The cached (version, result text) of a call, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, version: int, text: str) -> None:
+        """Remember a call's result and the version it was built from."""
+        if not self.max_entries or len(text) > self.max_bytes:
+            return
+        with self._lock:
+            self._entries[key] = (version, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+revalidation_cache = RevalidationCache(settings.mcp_revalidate_max_entries, settings.mcp_revalidate_max_bytes)
+
 
 class MCPClient:
     """Client for interacting with the HR MCP Server."""
 
-    def __init__(self, base_url: Optional[str] = None):
-        """Initialize MCP client."""
-        self.base_url = base_url or settings.mcp_server_url
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        revalidation_cache: Optional[RevalidationCache] = None,
+    ):
+        """
+        Initialize MCP client.
+
+        Args:
+            base_url: MCP endpoint URL (defaults to settings.mcp_server_url);
+                unix://<socket>:<path> URLs connect over a Unix socket
+            transport: Optional httpx transport, e.g. for benchmarks and replay
+            revalidation_cache: Optional cache of versioned results for call_tool
+        """
+        self.base_url, self.socket_path = uds.split_url(base_url or settings.mcp_server_url)
+        self.transport = transport
+        self.revalidation_cache = revalidation_cache
         self.request_id = 0
         self.last_mcp_token = None  # Store the last captured MCP token
 
+    def _client(self) -> httpx.AsyncClient:
+        """HTTP client for one request, over the Unix socket if configured."""
+        transport = self.transport
+        if transport is None and self.socket_path:
+            transport = uds.async_transport(self.socket_path)
+        return httpx.AsyncClient(transport=transport)
+
     def _next_id(self) -> int:
         """Generate next request ID."""
         self.request_id += 1
@@ -32,24 +125,28 @@ class MCPClient:
             Server capabilities and info
         """
         # Ensure Accept header is set for Kong AI MCP Proxy compatibility
-        request_headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        request_headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
         if headers:
             request_headers.update(headers)
 
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.post(
                 self.base_url,
-                json={
+                content=codec.dumps({
                     "jsonrpc": "2.0",
                     "id": self._next_id(),
                     "method": "initialize",
                     "params": {"capabilities": {}},
-                },
+                }),
                 headers=request_headers,
                 timeout=10.0,
             )
             response.raise_for_status()
-            result = response.json()
+            result = codec.loads(response.content)
 
             if "error" in result:
                 raise Exception(f"MCP initialize error: {result['error']}")
@@ -67,24 +164,28 @@ class MCPClient:
             List of available tools
         """
         # Ensure Accept header is set for Kong AI MCP Proxy compatibility
-        request_headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        request_headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
         if headers:
             request_headers.update(headers)
 
-        async with httpx.AsyncClient() as client:
+        async with self._client() as client:
             response = await client.post(
                 self.base_url,
-                json={
+                content=codec.dumps({
                     "jsonrpc": "2.0",
                     "id": self._next_id(),
                     "method": "tools/list",
                     "params": {},
-                },
+                }),
                 headers=request_headers,
                 timeout=10.0,
             )
             response.raise_for_status()
-            result = response.json()
+            result = codec.loads(response.content)
 
             if "error" in result:
                 raise Exception(f"MCP tools/list error: {result['error']}")
@@ -114,27 +215,39 @@ class MCPClient:
         logger.info(f"Calling MCP tool: {tool_name} with args: {arguments}")
 
         # Ensure Accept header is set for Kong AI MCP Proxy compatibility
-        request_headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        request_headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
         if headers:
             request_headers.update(headers)
 
-        async with httpx.AsyncClient() as client:
+        params: Dict[str, Any] = {
+            "name": tool_name,
+            "arguments": arguments,
+        }
+        cache_key = cached = None
+        if self.revalidation_cache is not None:
+            cache_key = self.revalidation_cache.make_key(tool_name, arguments, request_headers)
+            cached = self.revalidation_cache.get(cache_key)
+            if cached is not None:
+                params["_meta"] = {"known_version": cached[0]}
+
+        async with self._client() as client:
             response = await client.post(
                 self.base_url,
-                json={
+                content=codec.dumps({
                     "jsonrpc": "2.0",
                     "id": self._next_id(),
                     "method": "tools/call",
-                    "params": {
-                        "name": tool_name,
-                        "arguments": arguments,
-                    },
-                },
+                    "params": params,
+                }),
                 headers=request_headers,
                 timeout=30.0,
             )
             response.raise_for_status()
-            result = response.json()
+            result = codec.loads(response.content)
 
             # Capture MCP token from response header
             mcp_token_header = response.headers.get("X-MCP-Token")
@@ -150,9 +263,251 @@ class MCPClient:
                 logger.error(f"MCP tool call error: {error_msg}, data: {error_data}")
                 raise Exception(f"Tool '{tool_name}' failed: {error_msg}")
 
+            tool_result = result.get("result", {})
+            meta = tool_result.get("_meta") or {}
+            if cached is not None and meta.get("unchanged"):
+                metrics.inc("hr_agent_mcp_revalidation_total", outcome="unchanged")
+                tracelog.count("mcp_unchanged")
+                logger.info(f"Tool {tool_name} result unchanged (version {cached[0]})")
+                return cached[1]
+
             # Extract text content from MCP response
-            content = result.get("result", {}).get("content", [])
+            content = tool_result.get("content", [])
             if content and len(content) > 0:
-                return content[0].get("text", "")
+                text = content[0].get("text", "")
+                if cache_key is not None and "version" in meta:
+                    metrics.inc("hr_agent_mcp_revalidation_total", outcome="changed" if cached else "miss")
+                    tracelog.count("mcp_changed" if cached else "mcp_miss")
+                    self.revalidation_cache.put(cache_key, meta["version"], text)
+                return text
 
-            return result.get("result", {})
+            return tool_result
+
+    async def call_tool_stream(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        """
+        Call an MCP tool and yield its result incrementally as records.
+
+        The response body is parsed as it arrives, so memory stays flat no
+        matter how large the result is. Array results yield one record per
+        item; object results yield (key, value) pairs; anything else yields a
+        single value. Closing the iterator early closes the connection.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Tool arguments
+            headers: Optional headers including X-User-Scopes for authorization
+            max_bytes: Abort once the response body exceeds this many bytes
+                (defaults to settings.mcp_stream_max_bytes; 0 disables)
+
+        Yields:
+            Result records
+
+        Raises:
+            Exception: If tool call fails, scope is insufficient, or the
+                response exceeds max_bytes
+        """
+        logger.info(f"Streaming MCP tool: {tool_name} with args: {arguments}")
+        if max_bytes is None:
+            max_bytes = settings.mcp_stream_max_bytes
+
+        # Ensure Accept header is set for Kong AI MCP Proxy compatibility
+        request_headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
+        if headers:
+            request_headers.update(headers)
+
+        scanner = EnvelopeScanner()
+        records = RecordDecoder()
+        received = 0
+
+        async with self._client() as client:
+            async with client.stream(
+                "POST",
+                self.base_url,
+                content=codec.dumps({
+                    "jsonrpc": "2.0",
+                    "id": self._next_id(),
+                    "method": "tools/call",
+                    "params": {
+                        "name": tool_name,
+                        "arguments": arguments,
+                    },
+                }),
+                headers=request_headers,
+                timeout=30.0,
+            ) as response:
+                response.raise_for_status()
+
+                # Capture MCP token from response header
+                mcp_token_header = response.headers.get("X-MCP-Token")
+                if mcp_token_header:
+                    self.last_mcp_token = mcp_token_header
+                    logger.info(f"Captured MCP token from response header")
+
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    if max_bytes and received > max_bytes:
+                        raise Exception(
+                            f"Tool '{tool_name}' response exceeds {max_bytes} bytes"
+                        )
+                    for fragment in scanner.feed(chunk):
+                        for record in records.feed(fragment):
+                            yield record
+
+        envelope = scanner.close()
+        if "error" in envelope:
+            error = envelope["error"]
+            error_msg = error.get("message", "Unknown error")
+            error_data = error.get("data", {})
+
+            logger.error(f"MCP tool call error: {error_msg}, data: {error_data}")
+            raise Exception(f"Tool '{tool_name}' failed: {error_msg}")
+
+        if scanner.has_text:
+            for record in records.feed("", final=True):
+                yield record
+        elif not envelope.get("result", {}).get("content"):
+            yield envelope.get("result", {})
+
+    async def call_tool_events(
+        self,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Call an MCP tool over the streamable HTTP transport, yielding events
+        as the server sends them.
+
+        The server streams array results in chunks of items, with progress
+        notifications, so consumers see the first records (and how many are
+        left) long before the whole result has arrived. Closing the iterator
+        early closes the connection. Servers may answer with a plain JSON
+        response instead, which yields just the result.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Tool arguments
+            headers: Optional headers including X-User-Scopes for authorization
+
+        Yields:
+            Event dicts: "progress" (progress, total, message), "chunk" (items
+            of the result) and finally "result" (result, what call_tool returns)
+
+        Raises:
+            Exception: If tool call fails or scope is insufficient
+        """
+        logger.info(f"Calling MCP tool (event stream): {tool_name} with args: {arguments}")
+
+        request_headers = {
+            "Accept": "application/json, text/event-stream",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Content-Type": "application/json",
+        }
+        if headers:
+            request_headers.update(headers)
+
+        request_id = self._next_id()
+        params: Dict[str, Any] = {
+            "name": tool_name,
+            "arguments": arguments,
+            "_meta": {"progressToken": f"{tool_name}-{request_id}"},
+        }
+        cache_key = cached = None
+        if self.revalidation_cache is not None:
+            cache_key = self.revalidation_cache.make_key(tool_name, arguments, request_headers)
+            cached = self.revalidation_cache.get(cache_key)
+            if cached is not None:
+                params["_meta"]["known_version"] = cached[0]
+
+        items: List[Any] = []
+        result: Optional[Dict[str, Any]] = None
+
+        async with self._client() as client:
+            async with client.stream(
+                "POST",
+                self.base_url,
+                content=codec.dumps({
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "method": "tools/call",
+                    "params": params,
+                }),
+                headers=request_headers,
+                timeout=30.0,
+            ) as response:
+                response.raise_for_status()
+
+                # Capture MCP token from response header
+                mcp_token_header = response.headers.get("X-MCP-Token")
+                if mcp_token_header:
+                    self.last_mcp_token = mcp_token_header
+                    logger.info(f"Captured MCP token from response header")
+
+                if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                    result = codec.loads(await response.aread())
+                else:
+                    decoder = EventStreamDecoder()
+                    async for chunk in response.aiter_bytes():
+                        for data in decoder.feed(chunk):
+                            message = codec.loads(data)
+                            method = message.get("method")
+                            if method == "notifications/progress":
+                                progress = message.get("params") or {}
+                                yield {
+                                    "type": "progress",
+                                    "progress": progress.get("progress", 0),
+                                    "total": progress.get("total"),
+                                    "message": progress.get("message"),
+                                }
+                            elif method == "notifications/tools/chunk":
+                                chunk_items = (message.get("params") or {}).get("items") or []
+                                items.extend(chunk_items)
+                                yield {"type": "chunk", "items": chunk_items}
+                            elif message.get("id") == request_id:
+                                result = message
+
+        if result is None:
+            raise Exception(f"Tool '{tool_name}' failed: stream ended without a response")
+
+        if "error" in result:
+            error = result["error"]
+            error_msg = error.get("message", "Unknown error")
+            error_data = error.get("data", {})
+
+            logger.error(f"MCP tool call error: {error_msg}, data: {error_data}")
+            raise Exception(f"Tool '{tool_name}' failed: {error_msg}")
+
+        tool_result = result.get("result", {})
+        meta = tool_result.get("_meta") or {}
+        if cached is not None and meta.get("unchanged"):
+            metrics.inc("hr_agent_mcp_revalidation_total", outcome="unchanged")
+            tracelog.count("mcp_unchanged")
+            logger.info(f"Tool {tool_name} result unchanged (version {cached[0]})")
+            yield {"type": "result", "result": cached[1]}
+            return
+
+        # Chunked results are the concatenation of the chunks' items
+        content = tool_result.get("content", [])
+        if meta.get("chunked"):
+            text: Any = codec.dumps_str(items)
+        elif content:
+            text = content[0].get("text", "")
+        else:
+            yield {"type": "result", "result": tool_result}
+            return
+
+        if cache_key is not None and "version" in meta:
+            metrics.inc("hr_agent_mcp_revalidation_total", outcome="changed" if cached else "miss")
+            tracelog.count("mcp_changed" if cached else "mcp_miss")
+            self.revalidation_cache.put(cache_key, meta["version"], text)
+        yield {"type": "result", "result": text}
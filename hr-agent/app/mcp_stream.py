@@ -0,0 +1,396 @@
+"""Incremental parsing of MCP tools/call responses.
+
+A tools/call response is a JSON-RPC envelope whose result text,
+``result.content[0].text``, is itself a JSON document embedded as a string.
+Buffering the body, decoding the envelope and then decoding the text holds
+several copies of a large result in memory at once. The parsers here work on
+the body as it arrives instead:
+
+- ``EnvelopeScanner`` walks the envelope and streams the unescaped result text
+  out in fragments, keeping only the (small) rest of the envelope.
+- ``RecordDecoder`` turns those fragments into records: the items of a JSON
+  array, or ``(key, value)`` pairs of a JSON object.
+
+Memory per call is bounded by the largest single record, not the result size.
+
+``EventStreamDecoder`` parses the other response format, MCP's streamable
+HTTP transport: server-sent events, each carrying one JSON-RPC message.
+"""
+import codecs
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Dict, List, Optional, Tuple
+
+# A run of complete string characters: anything but quote and backslash, or a
+# full escape sequence. A partial escape at the end of a chunk is not matched.
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\]*)*')
+
+# A UTF-16 high surrogate escape; held back until its low surrogate arrives
+_HIGH_SURROGATE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+
+_WHITESPACE = " \t\n\r"
+# Characters that can follow a complete number or literal inside a container
+_DELIMITERS = _WHITESPACE + ",]}:"
+_SKIP_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Location of the tool result text within the envelope
+TEXT_PATH = ("result", "content", 0, "text")
+
+
+def _unescape(fragment: str) -> str:
+    """Decode the escaped body of a JSON string fragment."""
+    if "\\" not in fragment:
+        return fragment
+    return json.loads(f'"{fragment}"')
+
+
+class EnvelopeScanner:
+    """Incrementally scans a tools/call envelope, streaming out its result text.
+
+    Everything except the result text is copied into a skeleton document that
+    ``close`` decodes, so errors and non-text results are still available.
+    """
+
+    def __init__(self):
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        # One frame per open container: [kind, key or index, expecting key]
+        self._stack: List[list] = []
+        self._string: Optional[str] = None  # "key", "text" or "raw" while in a string
+        self._key_parts: List[str] = []
+        self._skeleton: List[str] = []
+        self.has_text = False
+
+    def _path(self) -> Tuple[Any, ...]:
+        return tuple(frame[1] for frame in self._stack)
+
+    def feed(self, data: bytes, final: bool = False) -> List[str]:
+        """
+        Consume a chunk of the response body.
+
+        Args:
+            data: Next chunk of raw body bytes
+            final: True for the last chunk
+
+        Returns:
+            Fragments of the unescaped result text found in this chunk
+        """
+        buf = self._buf + self._utf8.decode(data, final)
+        fragments: List[str] = []
+        pos, end = 0, len(buf)
+
+        while pos < end:
+            if self._string == "text":
+                stop, closed = self._scan_text(buf, pos, fragments)
+                if not closed and stop == pos:
+                    break
+                pos = stop
+                if closed:
+                    self._close_string()
+                continue
+
+            if self._string is not None:
+                stop = _STRING_BODY.match(buf, pos).end()
+                closed = stop < end and buf[stop] == '"'
+                if not closed and end - stop >= 6:
+                    raise ValueError(f"Invalid escape in MCP response at {buf[stop:stop + 6]!r}")
+
+                segment = buf[pos:stop]
+                if self._string == "key":
+                    self._key_parts.append(segment)
+                else:
+                    self._skeleton.append(segment)
+
+                if not closed:
+                    pos = stop
+                    break
+                pos = stop + 1
+                self._close_string()
+                continue
+
+            char = buf[pos]
+            pos += 1
+            if char in _WHITESPACE:
+                continue
+
+            frame = self._stack[-1] if self._stack else None
+            if char == '"':
+                if frame is not None and frame[0] == "object" and frame[2]:
+                    self._string = "key"
+                    self._key_parts = []
+                elif self._path() == TEXT_PATH:
+                    self._string = "text"
+                    self.has_text = True
+                else:
+                    self._string = "raw"
+                self._skeleton.append(char)
+                continue
+
+            self._skeleton.append(char)
+            if char == "{":
+                self._stack.append(["object", None, True])
+            elif char == "[":
+                self._stack.append(["array", 0, False])
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+            elif char == "," and frame is not None:
+                if frame[0] == "object":
+                    frame[2] = True
+                else:
+                    frame[1] += 1
+
+        self._buf = buf[pos:]
+        return fragments
+
+    @staticmethod
+    def _scan_text(buf: str, pos: int, fragments: List[str]) -> Tuple[int, bool]:
+        """
+        Decode result text from buf[pos:], appending it to fragments.
+
+        Returns:
+            The position scanning stopped at, and whether the string closed
+        """
+        # A backslash near the end may start an escape sequence that continues
+        # in the next chunk, so decode only up to its run of backslashes.
+        # Escapes wholly before that run cannot straddle the cut.
+        cut = len(buf)
+        tail = buf.rfind("\\", max(pos, cut - 12))
+        if tail >= 0:
+            cut = tail
+            while cut > pos and buf[cut - 1] == "\\":
+                cut -= 1
+        # Keep a UTF-16 surrogate pair together
+        held = _HIGH_SURROGATE.search(buf, max(pos, cut - 6), cut)
+        if held:
+            run = held.start()
+            while run > pos and buf[run - 1] == "\\":
+                run -= 1
+            if (held.start() - run) % 2 == 0:
+                cut = held.start()
+
+        if cut == pos:
+            # Only a short tail is left: it either closes the string here or
+            # needs the next chunk
+            try:
+                text, stop = scanstring(buf, pos)
+            except json.JSONDecodeError:
+                return pos, False
+            fragments.append(text)
+            return stop, True
+
+        # The appended quote closes the segment unless the real closing quote
+        # comes first
+        try:
+            text, stop = scanstring(buf[pos:cut] + '"', 0)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed result text in MCP response: {e}") from e
+        fragments.append(text)
+        if stop <= cut - pos:
+            return pos + stop, True
+        return cut, False
+
+    def _close_string(self) -> None:
+        """Finish the string that just ended, recording object keys."""
+        kind, self._string = self._string, None
+        if kind == "key":
+            raw = "".join(self._key_parts)
+            self._key_parts = []
+            frame = self._stack[-1]
+            frame[1] = _unescape(raw)
+            frame[2] = False
+            self._skeleton.append(raw)
+        self._skeleton.append('"')
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish scanning and decode the rest of the envelope.
+
+        Returns:
+            The envelope with the streamed result text replaced by ""
+
+        Raises:
+            ValueError: If the body was truncated or is not valid JSON
+        """
+        self.feed(b"", final=True)
+        if self._string is not None or self._stack or self._buf.strip():
+            raise ValueError("Truncated MCP response")
+        try:
+            return json.loads("".join(self._skeleton))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed MCP response: {e}") from e
+
+
+class RecordDecoder:
+    """Incrementally decodes a JSON document into top-level records.
+
+    Arrays yield their items and objects yield ``(key, value)`` pairs, each as
+    soon as it is complete. Any other document yields its single value.
+    """
+
+    # Retry an incomplete record only once this much more text has arrived
+    # (relative to what was buffered), keeping re-parsing linear overall
+    _GROWTH = 2
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._kind: Optional[str] = None  # "array", "object", "value"
+        self._state = "item"  # "item", "separator", "colon", "done"
+        self._key: Optional[str] = None
+        self._retry_at = 0
+
+    @property
+    def kind(self) -> Optional[str]:
+        """Shape of the document once known: "array", "object" or "value"."""
+        return self._kind
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        """
+        Consume a fragment of the document.
+
+        Args:
+            text: Next fragment of document text
+            final: True once no more text will follow
+
+        Returns:
+            Records completed by this fragment
+        """
+        self._buf += text
+        if not final and len(self._buf) < self._retry_at:
+            return []
+
+        records: List[Any] = []
+        retry_at = 0
+        pos = _SKIP_WHITESPACE.match(self._buf).end()
+
+        if self._kind is None:
+            if pos >= len(self._buf):
+                self._buf = ""
+                return records
+            opener = self._buf[pos]
+            self._kind = {"[": "array", "{": "object"}.get(opener, "value")
+            if self._kind != "value":
+                pos += 1
+
+        if self._kind == "value":
+            if final:
+                # Tools may return plain text rather than JSON
+                try:
+                    records.append(json.loads(self._buf))
+                except json.JSONDecodeError:
+                    records.append(self._buf)
+                self._buf = ""
+                self._state = "done"
+            return records
+
+        # Hot loop: attributes are kept in locals and written back at the end
+        buf, size = self._buf, len(self._buf)
+        state, key = self._state, self._key
+        is_object = self._kind == "object"
+        closer = "}" if is_object else "]"
+        raw_decode = self._decoder.raw_decode
+
+        while state != "done":
+            if pos < size and buf[pos] in _WHITESPACE:
+                pos = _SKIP_WHITESPACE.match(buf, pos).end()
+            if pos >= size:
+                break
+            char = buf[pos]
+
+            if state == "separator":
+                if char == ",":
+                    state = "item"
+                elif char == closer:
+                    state = "done"
+                else:
+                    raise ValueError(f"Expected ',' or '{closer}' in tool result, got {char!r}")
+                pos += 1
+                continue
+            if state == "colon":
+                if char != ":":
+                    raise ValueError(f"Expected ':' in tool result, got {char!r}")
+                state = "item"
+                pos += 1
+                continue
+            if char == closer and key is None:
+                state = "done"
+                pos += 1
+                continue
+
+            try:
+                value, stop = raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError("Truncated or malformed tool result")
+                retry_at = (size - pos) * self._GROWTH
+                break
+            # A number or literal is only complete once a delimiter follows it:
+            # "57754." is decoded as 57754 but may continue as "57754.83"
+            if not final and buf[pos] not in '"[{' and (stop >= size or buf[stop] not in _DELIMITERS):
+                break
+
+            pos = stop
+            if is_object and key is None:
+                key = value
+                state = "colon"
+            elif is_object:
+                records.append((key, value))
+                key = None
+                state = "separator"
+            else:
+                records.append(value)
+                state = "separator"
+
+        self._buf = buf[pos:]
+        self._state, self._key = state, key
+        self._retry_at = retry_at
+        if final and (state != "done" or self._buf.strip()):
+            raise ValueError("Truncated or malformed tool result")
+        return records
+
+
+class EventStreamDecoder:
+    """Incrementally decodes a text/event-stream body into event data.
+
+    Only ``data`` fields matter for MCP (one JSON-RPC message per event);
+    event names, ids and comments are skipped. Lines end in LF or CRLF.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._data: List[str] = []
+
+    def feed(self, data: bytes, final: bool = False) -> List[str]:
+        """
+        Consume a chunk of the body.
+
+        Args:
+            data: Next chunk of the response body
+            final: True once no more data will follow
+
+        Returns:
+            Data of the events completed by this chunk
+        """
+        self._buf += self._decoder.decode(data, final)
+        lines = self._buf.split("\n")
+        # The last piece is an incomplete line (empty if the chunk ended one)
+        self._buf = "" if final else lines.pop()
+
+        events: List[str] = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line:
+                if self._data:
+                    events.append("\n".join(self._data))
+                    self._data = []
+                continue
+            field, _, value = line.partition(":")
+            if field == "data":
+                self._data.append(value[1:] if value.startswith(" ") else value)
+        if final and self._data:
+            events.append("\n".join(self._data))
+            self._data = []
+        return events
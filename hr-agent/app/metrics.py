@@ -0,0 +1,101 @@
+"""Lightweight in-process metrics exported in Prometheus text format."""
+import threading
+from typing import Callable, Dict, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        self._summaries: Dict[str, Dict[LabelSet, Tuple[int, float]]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Attach a HELP line to a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Increment a counter."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def gauge_callback(self, name: str, callback: Callable[[], float]) -> None:
+        """Register a gauge whose value is read from a callback at scrape time."""
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record an observation (exported as a summary with _count and _sum)."""
+        key = _labels(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            count, total = series.get(key, (0, 0.0))
+            series[key] = (count + 1, total + value)
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        """Return the current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            callbacks = dict(self._gauge_callbacks)
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            gauges = {n: dict(s) for n, s in self._gauges.items()}
+            summaries = {n: dict(s) for n, s in self._summaries.items()}
+
+        for name, callback in callbacks.items():
+            try:
+                gauges.setdefault(name, {})[()] = float(callback())
+            except Exception:
+                continue
+
+        for kind, families in (("counter", counters), ("gauge", gauges)):
+            for name in sorted(families):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(families[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        for name in sorted(summaries):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, (count, total) in sorted(summaries[name].items()):
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,235 @@
+"""Speculative prefetch of likely follow-up tool calls.
+
+Agent traces are predictable: ``get_employee(X)`` is usually followed by
+``get_salary(X)`` or ``get_org_chart``. Each follow-up costs an LLM turn plus
+an MCP round trip. When a tool is called, the prefetcher issues the likely
+follow-up read calls concurrently and parks their results (or the in-flight
+futures) in the agent's ToolResultCache, so by the time the LLM asks for them
+they are usually ready. MCP latency is hidden behind LLM think time.
+
+Follow-ups come from declared transitions and, optionally, from transitions
+learned from earlier runs in this process. A follow-up is only prefetched when
+the caller holds the tool's scope, and each run has a budget of prefetch calls.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app import tracelog
+from app.auth import TokenContext
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe(
+    "hr_agent_prefetch_total",
+    "Speculative tool prefetches, by outcome (issued, hit, wasted, failed, over_budget)",
+)
+
+# Scope each read tool requires (mirrors RequiredScope in the MCP server's tool
+# registry, which is not exposed over MCP). Only tools listed here are ever
+# prefetched, so write tools never are.
+TOOL_SCOPES: Dict[str, str] = {
+    "get_employee": "hr:employee:read",
+    "get_salary": "hr:salary:read",
+    "get_org_chart": "hr:org:read",
+    "list_departments": "hr:department:read",
+    "list_employees": "hr:employee:read",
+    "list_employees_with_salaries": "hr:salary:read",
+    "list_employees_by_department": "hr:employee:read",
+}
+
+# A follow-up call: the tool, and the argument names it takes over unchanged
+# from the call that preceded it
+Transition = Tuple[str, Tuple[str, ...]]
+
+DECLARED_TRANSITIONS: Dict[str, List[Transition]] = {
+    "get_employee": [("get_salary", ("employee_id",)), ("get_org_chart", ())],
+}
+
+ToolCall = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+
+class TransitionStats:
+    """Counts of observed tool-to-tool transitions, shared by all agents.
+
+    Only tool and argument names are recorded, never argument values, so the
+    counts can be shared between users.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._from: Dict[str, int] = {}
+        self._to: Dict[str, Dict[Transition, int]] = {}
+
+    def record(self, previous: str, previous_args: Dict[str, Any], tool_name: str, arguments: Dict[str, Any]) -> None:
+        """Record that tool_name was called right after previous."""
+        # Learnable only when every argument is taken over from the previous call
+        carried = all(previous_args.get(name) == value for name, value in arguments.items())
+        with self._lock:
+            self._from[previous] = self._from.get(previous, 0) + 1
+            if carried:
+                targets = self._to.setdefault(previous, {})
+                transition = (tool_name, tuple(sorted(arguments)))
+                targets[transition] = targets.get(transition, 0) + 1
+
+    def likely(self, tool_name: str, min_samples: int, min_probability: float) -> List[Transition]:
+        """Transitions out of tool_name seen often enough to be worth prefetching."""
+        with self._lock:
+            total = self._from.get(tool_name, 0)
+            if total < min_samples:
+                return []
+            targets = sorted(self._to.get(tool_name, {}).items(), key=lambda item: -item[1])
+        return [transition for transition, count in targets if count / total >= min_probability]
+
+
+transition_stats = TransitionStats()
+
+
+class _RunState:
+    """Prefetch bookkeeping for one agent run."""
+
+    def __init__(self):
+        self.last_call: Optional[Tuple[str, Dict[str, Any]]] = None
+        self.issued: Set[str] = set()
+        self.tasks: List[asyncio.Task] = []
+        self.failed = 0
+
+
+# Set per agent run. The state object is mutable, so tool calls running in
+# child tasks (parallel tool calls) update the run's state, not a copy.
+_run_state: contextvars.ContextVar[Optional[_RunState]] = contextvars.ContextVar(
+    "prefetch_run_state", default=None
+)
+
+
+class Prefetcher:
+    """Issues likely follow-up read calls into a ToolResultCache."""
+
+    def __init__(self, cache: Any, token_context: TokenContext):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            cache: The agent's ToolResultCache, which receives prefetched results
+            token_context: Caller's token context; follow-ups need its scopes
+        """
+        self.cache = cache
+        self.token_context = token_context
+        # Prefetched cache keys not yet asked for by the LLM
+        self._unclaimed: Set[str] = set()
+
+    def begin_run(self) -> None:
+        """Start tracking a new agent run in the current context."""
+        _run_state.set(_RunState())
+
+    def end_run(self) -> None:
+        """Finish the current run: cancel stragglers and count unused prefetches."""
+        state = _run_state.get()
+        if state is None:
+            return
+        _run_state.set(None)
+        for task in state.tasks:
+            task.cancel()
+        wasted = len(state.issued & self._unclaimed)
+        self._unclaimed -= state.issued
+        used = len(state.issued) - wasted - state.failed
+        if wasted:
+            metrics.inc("hr_agent_prefetch_total", wasted, outcome="wasted")
+        if state.issued:
+            logger.info(f"[PREFETCH] {len(state.issued)} issued, {used} used, {state.failed} failed, {wasted} wasted")
+
+    def observe(self, tool_name: str, arguments: Dict[str, Any], call: ToolCall) -> None:
+        """
+        Note a tool call made by the LLM and prefetch its likely follow-ups.
+
+        Args:
+            tool_name: Tool the LLM called
+            arguments: Its (JSON) arguments
+            call: Coroutine function performing an MCP tool call
+        """
+        key = self.cache.make_key(tool_name, arguments)
+        if key in self._unclaimed:
+            self._unclaimed.discard(key)
+            # Only a hit if a write has not invalidated it in the meantime
+            if self.cache.contains(tool_name, arguments):
+                metrics.inc("hr_agent_prefetch_total", outcome="hit")
+                tracelog.count("prefetch_hit")
+            else:
+                metrics.inc("hr_agent_prefetch_total", outcome="wasted")
+
+        state = _run_state.get()
+        if state is None:
+            return
+        if state.last_call is not None and settings.prefetch_learn:
+            previous, previous_args = state.last_call
+            transition_stats.record(previous, previous_args, tool_name, arguments)
+        state.last_call = (tool_name, arguments)
+
+        if tool_name not in TOOL_SCOPES:
+            return
+        for follow_up, follow_args in self._predict(tool_name, arguments):
+            if self.cache.contains(follow_up, follow_args):
+                continue
+            if len(state.issued) >= settings.prefetch_max_calls:
+                metrics.inc("hr_agent_prefetch_total", outcome="over_budget")
+                break
+            self._issue(state, follow_up, follow_args, call)
+
+    def _predict(self, tool_name: str, arguments: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Follow-up calls worth prefetching after a call, most likely first."""
+        transitions = list(DECLARED_TRANSITIONS.get(tool_name, []))
+        if settings.prefetch_learn:
+            for transition in transition_stats.likely(
+                tool_name, settings.prefetch_min_samples, settings.prefetch_min_probability
+            ):
+                if transition not in transitions:
+                    transitions.append(transition)
+
+        calls = []
+        for follow_up, carried in transitions:
+            scope = TOOL_SCOPES.get(follow_up)
+            if scope is None or not self.token_context.has_scope(scope):
+                continue
+            if any(name not in arguments for name in carried):
+                continue
+            calls.append((follow_up, {name: arguments[name] for name in carried}))
+        return calls
+
+    def _issue(self, state: _RunState, tool_name: str, arguments: Dict[str, Any], call: ToolCall) -> None:
+        """Start one prefetch, parking its future in the cache."""
+        key = self.cache.make_key(tool_name, arguments)
+        generation = self.cache.generation
+        task = asyncio.create_task(self._fetch(state, tool_name, arguments, call, generation))
+        self.cache.put_pending(tool_name, arguments, task)
+        state.issued.add(key)
+        state.tasks.append(task)
+        self._unclaimed.add(key)
+        metrics.inc("hr_agent_prefetch_total", outcome="issued")
+        logger.info(f"[PREFETCH] {tool_name} with args: {arguments}")
+
+    async def _fetch(
+        self,
+        state: _RunState,
+        tool_name: str,
+        arguments: Dict[str, Any],
+        call: ToolCall,
+        generation: int,
+    ) -> Optional[Any]:
+        """Run a prefetch. Failures resolve to None so the real call is made instead."""
+        try:
+            result = await call(tool_name, arguments)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"[PREFETCH] {tool_name} failed: {e}")
+            metrics.inc("hr_agent_prefetch_total", outcome="failed")
+            state.failed += 1
+            self._unclaimed.discard(self.cache.make_key(tool_name, arguments))
+            self.cache.drop_pending(tool_name, arguments)
+            return None
+        self.cache.put(tool_name, arguments, result, generation)
+        return result
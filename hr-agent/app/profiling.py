@@ -0,0 +1,167 @@
+"""On-demand CPU profiling for admins.
+
+Two tools, both off unless PROFILING_ENABLED is set, and admin-only
+(PROFILING_ADMIN_SCOPE):
+
+- ``sample_stacks`` samples every thread's stack with ``sys._current_frames``
+  for a number of seconds and returns collapsed stacks ("frame;frame;frame
+  count" lines), the input format of flamegraph.pl and speedscope.
+- ``capture`` wraps a single request in cProfile and keeps the result in a
+  small in-memory ``ProfileStore`` for download, as a pstats file (snakeviz,
+  ``python -m pstats``) or as a text report.
+
+cProfile sees everything that runs on the event loop while it is enabled, so
+a request profile also contains whatever other requests were doing at the
+same time. Only one request is profiled at a time.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import settings
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> str:
+    """
+    Sample all threads' stacks and aggregate them as collapsed stacks.
+
+    Blocks for the sampling period, so call it from a worker thread.
+
+    Args:
+        seconds: How long to sample
+        interval: Seconds between samples
+
+    Returns:
+        Collapsed stacks, one "thread;outermost;...;innermost count" per line
+    """
+    own_thread = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_thread:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class ProfileStore:
+    """Bounded store of captured request profiles, oldest evicted first."""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max(1, max_profiles)
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, label: str, duration_ms: float, stats: Dict[Any, Any]) -> str:
+        """Store a profile's raw pstats data, returning its id."""
+        profile_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._profiles[profile_id] = {
+                "id": profile_id,
+                "label": label,
+                "created_at": time.time(),
+                "duration_ms": round(duration_ms, 1),
+                "data": marshal.dumps(stats),
+            }
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored profiles, newest first."""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [
+            {key: value for key, value in profile.items() if key != "data"} | {"bytes": len(profile["data"])}
+            for profile in reversed(profiles)
+        ]
+
+    def get(self, profile_id: str) -> Optional[bytes]:
+        """A profile in pstats file format, or None if unknown or evicted."""
+        with self._lock:
+            profile = self._profiles.get(profile_id)
+        return profile["data"] if profile else None
+
+    def report(self, profile_id: str, limit: int = 50) -> Optional[str]:
+        """A profile as a pstats text report, sorted by cumulative time."""
+        data = self.get(profile_id)
+        if data is None:
+            return None
+        out = io.StringIO()
+        stats = pstats.Stats(_LoadedStats(marshal.loads(data)), stream=out)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class _LoadedStats:
+    """Adapter handing raw stats to pstats.Stats without a temporary file."""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+profile_store = ProfileStore(settings.profiling_max_profiles)
+
+# cProfile allows one active profiler per thread, and the event loop is one thread
+_capture_lock = threading.Lock()
+
+
+class Capture:
+    """Result of a capture() block: the stored profile's id, if one was taken."""
+
+    def __init__(self):
+        self.profile_id: Optional[str] = None
+
+
+@contextmanager
+def capture(label: str) -> Iterator[Capture]:
+    """
+    Profile the enclosed code with cProfile and store the result.
+
+    If another request is being profiled, the block runs unprofiled and
+    ``profile_id`` stays None.
+
+    Args:
+        label: Description stored with the profile (e.g. endpoint and user)
+    """
+    result = Capture()
+    if not _capture_lock.acquire(blocking=False):
+        yield result
+        return
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+        profiler.create_stats()
+        result.profile_id = profile_store.add(label, (time.perf_counter() - started) * 1000, profiler.stats)
+    finally:
+        _capture_lock.release()
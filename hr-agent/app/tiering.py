@@ -0,0 +1,124 @@
+"""Latency-aware model tiering.
+
+Most agent iterations only pick the next tool call, which a small, fast model
+does as well as a large one. With LLM_TIERING on, each iteration goes to the
+fast model (its own Kong AI Proxy route, LLM_FAST_API_URL) first, and the
+strong model (LLM_API_URL) is used:
+
+- for the final answer: when the fast model answers instead of calling a
+  tool, its answer is discarded and the strong model writes the real one
+  ("synthesis"), unless LLM_TIER_FAST_ANSWERS keeps the fast model's answer
+  and saves that second call
+- for every iteration of a hard query, judged from the message up front
+  ("hard_query")
+- for the iteration after a tool call failed ("tool_error")
+- when the fast model's tool calls are unusable: malformed arguments or a
+  tool the user does not have ("low_confidence")
+
+Degraded runs (over the token budget) use the fast model throughout.
+"""
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("hr_agent_llm_tier_calls_total", "LLM calls per model tier, by routing reason")
+metrics.describe("hr_agent_llm_tier_seconds", "LLM call latency per model tier")
+metrics.describe("hr_agent_llm_tier_tokens_total", "LLM tokens per model tier, by kind (input, output)")
+
+FAST = "fast"
+STRONG = "strong"
+
+# Tag on fast-model runs in tiered mode. Their text is tool-call chatter or an
+# answer the strong model rewrites, so it should not be streamed to users.
+DRAFT_TAG = "llm_tier:draft"
+
+# Routing modes for a whole run
+TIERED = "tiered"
+FAST_ONLY = "fast_only"
+STRONG_ONLY = "strong_only"
+
+
+def is_hard_query(message: str) -> bool:
+    """Whether a message goes straight to the strong model (long or analytical)."""
+    if len(message) >= settings.llm_tier_hard_min_chars:
+        return True
+    keywords = [re.escape(k.strip()) for k in settings.llm_tier_hard_keywords.split(",") if k.strip()]
+    if not keywords:
+        return False
+    # Whole words only: "why" must not match "anywhere"
+    return re.search(rf"\b(?:{'|'.join(keywords)})\b", message, re.IGNORECASE) is not None
+
+
+def _last_tool_failed(messages: List[BaseMessage]) -> bool:
+    """Whether any tool result since the last LLM turn is an error."""
+    for message in reversed(messages):
+        if not isinstance(message, ToolMessage):
+            return False
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if message.status == "error" or content.startswith("ERROR:"):
+            return True
+    return False
+
+
+class TieredModel:
+    """Chooses the model tier for each agent iteration and records per-tier metrics."""
+
+    def __init__(self, fast: Runnable, strong: Runnable, tool_names: Set[str], mode: str = TIERED):
+        """
+        Initialize the router.
+
+        Args:
+            fast: Fast model with the agent's tools bound
+            strong: Strong model with the agent's tools bound
+            tool_names: Tools available to the agent
+            mode: TIERED, FAST_ONLY or STRONG_ONLY
+        """
+        # Kept fast-model answers are final, so they stream like any other
+        draft = mode == TIERED and not settings.llm_tier_fast_answers
+        self.fast = fast.with_config(tags=[DRAFT_TAG]) if draft else fast
+        self.strong = strong
+        self.tool_names = tool_names
+        self.mode = mode
+
+    async def ainvoke(self, prompt: Any, config: Optional[RunnableConfig] = None) -> AIMessage:
+        """Run one agent iteration on the prompt (a ChatPromptValue)."""
+        if self.mode == FAST_ONLY:
+            return await self._call(FAST, "degraded", prompt, config)
+        if self.mode == STRONG_ONLY:
+            return await self._call(STRONG, "hard_query", prompt, config)
+        if _last_tool_failed(prompt.to_messages()):
+            return await self._call(STRONG, "tool_error", prompt, config)
+
+        response = await self._call(FAST, "routing", prompt, config)
+        if not response.tool_calls and not response.invalid_tool_calls:
+            if settings.llm_tier_fast_answers:
+                return response
+            return await self._call(STRONG, "synthesis", prompt, config)
+        if response.invalid_tool_calls or any(call["name"] not in self.tool_names for call in response.tool_calls):
+            logger.info("[TIER] Unusable tool calls from the fast model, escalating")
+            return await self._call(STRONG, "low_confidence", prompt, config)
+        return response
+
+    async def _call(self, tier: str, reason: str, prompt: Any, config: Optional[RunnableConfig]) -> AIMessage:
+        model = self.fast if tier == FAST else self.strong
+        started = time.perf_counter()
+        response = await model.ainvoke(prompt, config)
+        elapsed = time.perf_counter() - started
+
+        metrics.inc("hr_agent_llm_tier_calls_total", tier=tier, reason=reason)
+        metrics.observe("hr_agent_llm_tier_seconds", elapsed, tier=tier)
+        usage: Dict[str, Any] = response.usage_metadata or {}
+        if usage:
+            metrics.inc("hr_agent_llm_tier_tokens_total", usage.get("input_tokens", 0), tier=tier, kind="input")
+            metrics.inc("hr_agent_llm_tier_tokens_total", usage.get("output_tokens", 0), tier=tier, kind="output")
+        logger.info(f"[TIER] {tier} model ({reason}) answered in {elapsed * 1000:.0f} ms")
+        return response
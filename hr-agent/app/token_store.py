@@ -0,0 +1,64 @@
+"""Bounded server-side store of exchanged tokens, keyed by fingerprint.
+
+Chat responses identify the hop-1 and hop-2 tokens by fingerprint only (see
+TOKEN_DISPLAY_MODE). The UI fetches a token and its claims from here on
+demand, when the user opens the token viewer.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def fingerprint(token: str) -> str:
+    """Short, stable identifier of a token (truncated SHA-256)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+
+
+class TokenStore:
+    """LRU of exchanged tokens; each entry is only readable by its user."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(
+        self,
+        token: str,
+        claims: Optional[Dict[str, Any]],
+        hop: int,
+        description: str,
+        user_sub: str,
+    ) -> str:
+        """
+        Store a token (once; repeats only refresh its recency).
+
+        Returns:
+            The token's fingerprint
+        """
+        fp = fingerprint(token)
+        with self._lock:
+            if fp in self._entries:
+                self._entries.move_to_end(fp)
+                return fp
+            self._entries[fp] = {
+                "fingerprint": fp,
+                "token": token,
+                "claims": claims,
+                "hop": hop,
+                "description": description,
+                "user_sub": user_sub,
+            }
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fp
+
+    def get(self, fp: str, user_sub: str) -> Optional[Dict[str, Any]]:
+        """A stored token, or None if unknown, evicted or owned by another user."""
+        with self._lock:
+            entry = self._entries.get(fp)
+            if entry is None or entry["user_sub"] != user_sub:
+                return None
+            self._entries.move_to_end(fp)
+            return dict(entry)
@@ -1,13 +1,112 @@
 """LangChain tool wrappers for MCP tools."""
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Literal, Optional
 from langchain.tools import StructuredTool
+from langchain_core.callbacks import adispatch_custom_event
 from pydantic import BaseModel, Field
+from app import codec, tracelog
+from app.config import settings
 from app.mcp_client import MCPClient
 from app.auth import TokenContext
+from app.prefetch import Prefetcher
 
 logger = logging.getLogger(__name__)
 
+# Tools that modify HR data. Their results are never cached, and a successful
+# call invalidates any cached read results.
+WRITE_TOOLS = {"update_employee", "update_salary", "update_employees", "update_salaries"}
+
+# Custom LangChain event carrying MCP progress of a running tool call
+TOOL_PROGRESS_EVENT = "mcp_tool_progress"
+
+
+class ToolResultCache:
+    """Cache of read-only MCP tool results, keyed by tool name and arguments.
+
+    The cache is meant to be scoped to a single TokenContext (one chat or one
+    batch of chats) so results are never shared between users.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, Any] = {}
+        # Calls still in flight (prefetches); readers wait for them
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate(), so in-flight calls started before a write
+        # know not to store their (possibly stale) results
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Build a stable cache key for a tool call."""
+        return f"{tool_name}:{codec.dumps_str(arguments, sort_keys=True)}"
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+        """Return a cached result, or None on a miss."""
+        result = self._results.get(self.make_key(tool_name, arguments))
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def get_or_wait(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[Any]:
+        """Return a cached result, waiting for it if the call is in flight; None on a miss."""
+        key = self.make_key(tool_name, arguments)
+        result = self._results.get(key)
+        future = self._pending.get(key)
+        if result is None and future is not None:
+            # wait() rather than await: a cancelled prefetch is just a miss
+            await asyncio.wait({future})
+            if not future.cancelled() and future.exception() is None:
+                result = future.result()
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def contains(self, tool_name: str, arguments: Dict[str, Any]) -> bool:
+        """Whether a result is cached or still being fetched."""
+        key = self.make_key(tool_name, arguments)
+        future = self._pending.get(key)
+        return key in self._results or (future is not None and not future.done())
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], result: Any, generation: int) -> None:
+        """
+        Store a tool result.
+
+        Args:
+            tool_name: Tool called
+            arguments: Its arguments
+            result: Its result
+            generation: self.generation when the call started; if a write
+                invalidated the cache since, the result may be stale and is
+                not stored
+        """
+        if generation != self.generation:
+            return
+        key = self.make_key(tool_name, arguments)
+        self._results[key] = result
+        self._pending.pop(key, None)
+
+    def put_pending(self, tool_name: str, arguments: Dict[str, Any], future: asyncio.Future) -> None:
+        """Register an in-flight call whose result put() will store."""
+        self._pending[self.make_key(tool_name, arguments)] = future
+
+    def drop_pending(self, tool_name: str, arguments: Dict[str, Any]) -> None:
+        """Forget an in-flight call that failed."""
+        self._pending.pop(self.make_key(tool_name, arguments), None)
+
+    def invalidate(self) -> None:
+        """Drop all cached results (called after any write tool succeeds)."""
+        self._results.clear()
+        self._pending.clear()
+        self.generation += 1
+
 
 # Pydantic models for tool arguments
 class GetEmployeeArgs(BaseModel):
@@ -35,6 +134,34 @@ class UpdateSalaryArgs(BaseModel):
     bonus: Optional[int] = Field(None, description="New bonus amount")
 
 
+class EmployeeUpdateItem(BaseModel):
+    employee_id: str = Field(description="The employee ID")
+    title: Optional[str] = Field(None, description="New job title")
+    location: Optional[str] = Field(None, description="New location")
+
+
+class UpdateEmployeesArgs(BaseModel):
+    updates: List[EmployeeUpdateItem] = Field(
+        description="Employee updates to apply atomically in one call",
+        min_length=1,
+        max_length=1000,
+    )
+
+
+class SalaryUpdateItem(BaseModel):
+    employee_id: str = Field(description="The employee ID")
+    base: Optional[int] = Field(None, description="New base salary")
+    bonus: Optional[int] = Field(None, description="New bonus amount")
+
+
+class UpdateSalariesArgs(BaseModel):
+    updates: List[SalaryUpdateItem] = Field(
+        description="Salary updates to apply atomically in one call",
+        min_length=1,
+        max_length=1000,
+    )
+
+
 class GetOrgChartArgs(BaseModel):
     """No arguments required for get_org_chart."""
     pass
@@ -46,29 +173,86 @@ class ListEmployeesArgs(BaseModel):
 
 
 class ListEmployeesWithSalariesArgs(BaseModel):
-    """No arguments required for list_employees_with_salaries."""
-    pass
+    limit: Optional[int] = Field(
+        None, description="Only return the top N employees by base salary (highest first)"
+    )
 
 
 class ListEmployeesByDepartmentArgs(BaseModel):
-    """No arguments required for list_employees_by_department."""
-    pass
+    department: Optional[str] = Field(
+        None, description="Only list employees of this department (e.g., Engineering)"
+    )
+
+
+AggregateOp = Literal["count", "sum", "avg", "min", "max"]
+
+
+class AggregateArgs(BaseModel):
+    group_by: Literal["department", "location", "manager", "title"] = Field(
+        description="Employee attribute to group by"
+    )
+    field: Optional[Literal["base_salary", "bonus", "equity", "total_compensation"]] = Field(
+        None, description="Salary field to aggregate; omit for headcount only"
+    )
+    ops: Optional[List[AggregateOp]] = Field(
+        None, description="Statistics per group (count is always included); defaults to avg when field is set"
+    )
+    sort_by: Optional[AggregateOp] = Field(
+        None, description="Statistic to order groups by (default: the first op, or count)"
+    )
+    order: Optional[Literal["desc", "asc"]] = Field(None, description="Sort order of the groups (default desc)")
+    top_k: Optional[int] = Field(None, description="Only return the first K groups in sort order")
+    department: Optional[str] = Field(None, description="Only include employees of this department")
+    location: Optional[str] = Field(None, description="Only include employees at this location")
+
+
+def _to_json_value(value: Any) -> Any:
+    """Convert argument models (and lists of them) into JSON-compatible values."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, list):
+        return [_to_json_value(item) for item in value]
+    return value
+
+
+async def _report_progress(tool_name: str, event: Dict[str, Any]) -> None:
+    """Dispatch an MCP progress event to the LangChain run the tool is part of."""
+    try:
+        await adispatch_custom_event(TOOL_PROGRESS_EVENT, {
+            "tool": tool_name,
+            "progress": event["progress"],
+            "total": event["total"],
+            "message": event["message"],
+        })
+    except RuntimeError:
+        # Called outside a LangChain run
+        pass
 
 
 class MCPToolFactory:
     """Factory for creating LangChain tools from MCP tools."""
 
-    def __init__(self, mcp_client: MCPClient, token_context: TokenContext):
+    def __init__(
+        self,
+        mcp_client: MCPClient,
+        token_context: TokenContext,
+        cache: Optional[ToolResultCache] = None,
+        prefetcher: Optional[Prefetcher] = None,
+    ):
         """
         Initialize tool factory.
 
         Args:
             mcp_client: MCP client instance
             token_context: Token context with user scopes and headers
+            cache: Optional result cache shared by all tools from this factory
+            prefetcher: Optional prefetcher of likely follow-up calls; needs cache
         """
         self.mcp_client = mcp_client
         self.token_context = token_context
         self.headers = token_context.get_headers()
+        self.cache = cache
+        self.prefetcher = prefetcher if cache is not None else None
 
     async def get_available_tools(self) -> List[StructuredTool]:
         """
@@ -153,6 +337,22 @@ class MCPToolFactory:
                 coroutine=self._make_tool_coroutine("update_salary"),
                 args_schema=UpdateSalaryArgs,
             )
+        elif tool_name == "update_employees":
+            return StructuredTool(
+                name="update_employees",
+                description=description,
+                func=self._make_tool_func("update_employees"),
+                coroutine=self._make_tool_coroutine("update_employees"),
+                args_schema=UpdateEmployeesArgs,
+            )
+        elif tool_name == "update_salaries":
+            return StructuredTool(
+                name="update_salaries",
+                description=description,
+                func=self._make_tool_func("update_salaries"),
+                coroutine=self._make_tool_coroutine("update_salaries"),
+                args_schema=UpdateSalariesArgs,
+            )
         elif tool_name == "get_org_chart":
             return StructuredTool(
                 name="get_org_chart",
@@ -185,6 +385,14 @@ class MCPToolFactory:
                 coroutine=self._make_tool_coroutine("list_employees_by_department"),
                 args_schema=ListEmployeesByDepartmentArgs,
             )
+        elif tool_name == "aggregate":
+            return StructuredTool(
+                name="aggregate",
+                description=description,
+                func=self._make_tool_func("aggregate"),
+                coroutine=self._make_tool_coroutine("aggregate"),
+                args_schema=AggregateArgs,
+            )
 
         logger.warning(f"Unknown MCP tool: {tool_name}")
         return None
@@ -200,18 +408,154 @@ class MCPToolFactory:
     def _make_tool_coroutine(self, tool_name: str):
         """Create an async wrapper function for calling MCP tools."""
         async def async_wrapper(**kwargs):
+            # LangChain passes nested argument models (e.g. bulk update rows)
+            # as model instances; MCP needs plain JSON values.
+            kwargs = {
+                key: _to_json_value(value) for key, value in kwargs.items()
+            }
+            if self.prefetcher is not None:
+                self.prefetcher.observe(tool_name, kwargs, self._call)
+            trace = tracelog.current()
+            started = time.perf_counter()
+            cacheable = self.cache is not None and tool_name not in WRITE_TOOLS
+            if cacheable:
+                generation = self.cache.generation
+                cached = await self.cache.get_or_wait(tool_name, kwargs)
+                if cached is not None:
+                    logger.info(f"Tool {tool_name} served from result cache")
+                    if trace is not None:
+                        trace.note_tool(tool_name, time.perf_counter() - started, cached, "hit")
+                    return cached
+
             try:
                 logger.info(f"Executing tool {tool_name} with args: {kwargs}")
-                result = await self.mcp_client.call_tool(
-                    tool_name=tool_name,
-                    arguments=kwargs,
-                    headers=self.headers,
-                )
+                result = await self._call(tool_name, kwargs, report_progress=True)
                 logger.info(f"Tool {tool_name} completed successfully")
+                if trace is not None:
+                    trace.note_tool(tool_name, time.perf_counter() - started, result, "miss" if cacheable else "none")
+
+                if cacheable:
+                    self.cache.put(tool_name, kwargs, result, generation)
+                elif self.cache is not None:
+                    self.cache.invalidate()
                 return result
             except Exception as e:
                 error_msg = f"Error calling {tool_name}: {str(e)}"
                 logger.error(error_msg)
+                if trace is not None:
+                    trace.note_tool(
+                        tool_name, time.perf_counter() - started, None, "miss" if cacheable else "none", error=True
+                    )
                 return f"ERROR: {error_msg}"
 
         return async_wrapper
+
+    async def _call(self, tool_name: str, arguments: Dict[str, Any], report_progress: bool = False) -> Any:
+        """
+        Call an MCP tool; reads go over the event stream or through the
+        streaming parser when enabled.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Tool arguments
+            report_progress: Forward event stream progress to the current
+                LangChain run (not for prefetches, which run outside it)
+        """
+        if settings.mcp_event_stream and tool_name not in WRITE_TOOLS:
+            return await self._call_events(tool_name, arguments, report_progress)
+        if settings.mcp_stream_results and tool_name not in WRITE_TOOLS:
+            return await self._call_streaming(tool_name, arguments)
+        return await self.mcp_client.call_tool(
+            tool_name=tool_name,
+            arguments=arguments,
+            headers=self.headers,
+        )
+
+    async def _call_events(self, tool_name: str, arguments: Dict[str, Any], report_progress: bool) -> Any:
+        """
+        Call a read tool over the MCP event stream.
+
+        Progress is dispatched as TOOL_PROGRESS_EVENT custom events, which
+        HRAgent.stream_chat passes on as "tool_progress". At most
+        settings.mcp_stream_max_records items are kept; the stream is closed
+        once they have arrived and a note tells the LLM it was truncated.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Tool arguments
+            report_progress: Dispatch progress events to the current run
+
+        Returns:
+            The tool result, as call_tool returns it
+        """
+        limit = settings.mcp_stream_max_records
+        records: List[Any] = []
+
+        stream = self.mcp_client.call_tool_events(
+            tool_name=tool_name,
+            arguments=arguments,
+            headers=self.headers,
+        )
+        try:
+            async for event in stream:
+                if event["type"] == "result":
+                    return event["result"]
+                if event["type"] == "chunk":
+                    records.extend(event["items"])
+                    if limit and len(records) > limit:
+                        text = codec.dumps_str(records[:limit])
+                        return text + f"\n[Result truncated to the first {limit} records]"
+                elif report_progress:
+                    await _report_progress(tool_name, event)
+        finally:
+            await stream.aclose()
+        raise Exception(f"Tool '{tool_name}' failed: no result")
+
+    async def _call_streaming(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Call a read tool through the streaming parser and re-serialize it.
+
+        At most settings.mcp_stream_max_records records are kept; the rest of
+        the response is not read and a note tells the LLM it was truncated.
+
+        Args:
+            tool_name: Name of the tool to call
+            arguments: Tool arguments
+
+        Returns:
+            Compact JSON text of the (possibly truncated) result
+        """
+        limit = settings.mcp_stream_max_records
+        # Records are encoded as they arrive; only their JSON text is kept
+        parts: List[str] = []
+        first: Any = None
+        truncated = False
+
+        stream = self.mcp_client.call_tool_stream(
+            tool_name=tool_name,
+            arguments=arguments,
+            headers=self.headers,
+        )
+        try:
+            async for record in stream:
+                if limit and len(parts) >= limit:
+                    truncated = True
+                    break
+                if not parts:
+                    first = record
+                if isinstance(record, tuple):
+                    parts.append(f"{codec.dumps_str(record[0])}:{codec.dumps_str(record[1])}")
+                else:
+                    parts.append(codec.dumps_str(record))
+        finally:
+            await stream.aclose()
+
+        if len(parts) == 1 and isinstance(first, str):
+            return first  # Plain-text tool result
+        if isinstance(first, tuple):
+            text = "{" + ",".join(parts) + "}"
+        else:
+            text = "[" + ",".join(parts) + "]"
+        if truncated:
+            text += f"\n[Result truncated to the first {limit} records]"
+        return text
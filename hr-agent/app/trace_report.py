@@ -0,0 +1,255 @@
+"""Latency report from trace logs (app/tracelog.py and the UI's TRACE_LOG_PATH).
+
+Reads NDJSON trace records (plain or .gz, rotated files included) and prints
+percentile breakdowns:
+
+- requests: end-to-end time per service and route, with error counts
+- hops: time per hop (agent setup, LLM, tools; the UI's call to the agent).
+  Where a UI record and agent records share a request id, the UI's agent hop
+  minus the agent's own time is reported as the "gateway" hop (Kong plus
+  network)
+- tools: time (cache misses only), result size and cache hit rate per tool
+- users: requests, time and LLM tokens per hashed user id
+- shapes: the slowest request shapes, a shape being the route and the
+  sequence of tools a run called
+
+Run from the hr-agent directory; needs no settings or services:
+
+    python -m app.trace_report /var/log/hr-agent/trace.ndjson* /var/log/hr-ui/trace.ndjson*
+    python -m app.trace_report trace.ndjson --last 24 --route /chat --top 20
+    python -m app.trace_report trace.ndjson --json > report.json
+"""
+import argparse
+import gzip
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+PERCENTILES = (50, 90, 99)
+
+# Longest tool sequence in a shape; longer ones end in "..."
+MAX_SHAPE_TOOLS = 6
+
+
+def read_records(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield the records of trace log files, skipping lines that are not JSON objects."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and isinstance(record.get("ms"), (int, float)):
+                    yield record
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Count, percentiles and maximum of some values."""
+    values = sorted(values)
+    summary: Dict[str, float] = {"count": len(values)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(values, pct)
+    summary["max"] = values[-1] if values else 0.0
+    return summary
+
+
+def shape(record: Dict[str, Any]) -> str:
+    """Route plus the run's tool sequence, repeats of the same tool collapsed."""
+    tools: List[str] = []
+    for call in record.get("tools") or []:
+        if not tools or tools[-1] != call.get("name"):
+            tools.append(call.get("name", "?"))
+    path = " > ".join(tools[:MAX_SHAPE_TOOLS]) + (" > ..." if len(tools) > MAX_SHAPE_TOOLS else "")
+    return f"{record.get('route', '?')} [{path or 'no tools'}]"
+
+
+def analyze(records: Iterable[Dict[str, Any]], min_shape_count: int = 1) -> Dict[str, Any]:
+    """
+    Aggregate trace records into the report sections.
+
+    Args:
+        records: Trace records of any services
+        min_shape_count: Shapes seen fewer times are left out of "shapes"
+
+    Returns:
+        Dict of report sections, each a list of rows sorted slowest first
+    """
+    requests: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    hops: Dict[str, List[float]] = defaultdict(list)
+    tool_ms: Dict[str, List[float]] = defaultdict(list)
+    tool_bytes: Dict[str, List[float]] = defaultdict(list)
+    tool_calls: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    users: Dict[str, List[float]] = defaultdict(list)
+    user_tokens: Dict[str, int] = defaultdict(int)
+    shapes: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    ui_agent_ms: Dict[str, float] = {}
+    agent_ms: Dict[str, float] = defaultdict(float)
+
+    for record in records:
+        svc = record.get("svc", "?")
+        key = f"{svc} {record.get('route', '?')}"
+        requests[key].append(record["ms"])
+        if record.get("status") != "ok":
+            errors[key] += 1
+        for hop, ms in (record.get("hops") or {}).items():
+            hops[f"{svc} {hop}"].append(ms)
+
+        request_id = record.get("id")
+        if request_id:
+            if svc == "ui" and "agent" in (record.get("hops") or {}):
+                ui_agent_ms[request_id] = record["hops"]["agent"]
+            elif svc == "agent":
+                agent_ms[request_id] += record["ms"]
+
+        if svc != "agent":
+            continue
+        for call in record.get("tools") or []:
+            name = call.get("name", "?")
+            tool_calls[name]["calls"] += 1
+            tool_calls[name][call.get("cache", "none")] += 1
+            if call.get("error"):
+                tool_calls[name]["errors"] += 1
+            if call.get("cache") != "hit":
+                tool_ms[name].append(call.get("ms", 0.0))
+            if "bytes" in call:
+                tool_bytes[name].append(call["bytes"])
+        user = record.get("user") or "anonymous"
+        users[user].append(record["ms"])
+        user_tokens[user] += (record.get("llm") or {}).get("tokens", 0)
+        shapes[shape(record)].append(record)
+
+    for request_id, ms in ui_agent_ms.items():
+        if request_id in agent_ms:
+            hops["ui gateway"].append(max(0.0, ms - agent_ms[request_id]))
+
+    def by_p90(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return sorted(rows, key=lambda row: row.get("p90", 0.0), reverse=True)
+
+    tools_rows = []
+    for name, counts in tool_calls.items():
+        looked_up = counts["hit"] + counts["miss"]
+        sizes = summarize(tool_bytes[name])
+        tools_rows.append({
+            "tool": name,
+            **summarize(tool_ms[name]),
+            "count": counts["calls"],
+            "hit_rate": counts["hit"] / looked_up if looked_up else None,
+            "errors": counts["errors"],
+            "bytes_p50": sizes["p50"],
+            "bytes_max": sizes["max"],
+        })
+
+    shape_rows = []
+    for name, runs in shapes.items():
+        if len(runs) < min_shape_count:
+            continue
+        shape_rows.append({
+            "shape": name,
+            **summarize([run["ms"] for run in runs]),
+            "llm_calls_avg": sum((run.get("llm") or {}).get("calls", 0) for run in runs) / len(runs),
+            "llm_ms_avg": sum((run.get("hops") or {}).get("llm", 0.0) for run in runs) / len(runs),
+            "tools_ms_avg": sum((run.get("hops") or {}).get("tools", 0.0) for run in runs) / len(runs),
+        })
+
+    return {
+        "requests": by_p90([{"route": key, **summarize(ms), "errors": errors[key]} for key, ms in requests.items()]),
+        "hops": by_p90([{"hop": key, **summarize(ms)} for key, ms in hops.items()]),
+        "tools": by_p90(tools_rows),
+        "users": sorted(
+            ({"user": user, **summarize(ms), "tokens": user_tokens[user]} for user, ms in users.items()),
+            key=lambda row: row["count"],
+            reverse=True,
+        ),
+        "shapes": by_p90(shape_rows),
+    }
+
+
+def _row(label: str, summary: Dict[str, Any], extra: str = "") -> str:
+    stats = " ".join(f"{summary[f'p{pct}']:>9.1f}" for pct in PERCENTILES)
+    return f"{label[:44]:<44} {summary['count']:>7} {stats} {summary['max']:>9.1f}  {extra}".rstrip()
+
+
+def print_report(report: Dict[str, Any], top: int) -> None:
+    """Print the report as text tables, at most top rows per section."""
+    header = " ".join(f"{f'p{pct} ms':>9}" for pct in PERCENTILES)
+    titles = {
+        "requests": "Requests (service route)",
+        "hops": "Hops (service hop)",
+        "tools": "Tools (time of cache misses)",
+        "users": "Users (most requests first)",
+        "shapes": "Slowest request shapes",
+    }
+    for section, title in titles.items():
+        rows = report[section]
+        print(f"\n{title}")
+        print(f"{'':<44} {'count':>7} {header} {'max ms':>9}")
+        for row in rows[:top]:
+            if section == "requests":
+                print(_row(row["route"], row, f"errors {row['errors']}" if row["errors"] else ""))
+            elif section == "hops":
+                print(_row(row["hop"], row))
+            elif section == "tools":
+                hit_rate = "-" if row["hit_rate"] is None else f"{row['hit_rate']:.0%}"
+                print(_row(row["tool"], row, f"hits {hit_rate}  bytes p50 {row['bytes_p50']:.0f} max {row['bytes_max']:.0f}"
+                           + (f"  errors {row['errors']}" if row["errors"] else "")))
+            elif section == "users":
+                print(_row(row["user"], row, f"tokens {row['tokens']}"))
+            else:
+                print(_row(row["shape"], row, f"llm {row['llm_calls_avg']:.1f} calls {row['llm_ms_avg']:.0f} ms"
+                           f"  tools {row['tools_ms_avg']:.0f} ms"))
+                if len(row["shape"]) > 44:
+                    print(f"  {row['shape']}")
+        if len(rows) > top:
+            print(f"({len(rows) - top} more)")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Trace log files (.gz allowed)")
+    parser.add_argument("--last", type=float, help="Only records of the last N hours")
+    parser.add_argument("--svc", help="Only records of this service (agent, ui)")
+    parser.add_argument("--route", help="Only records of this route")
+    parser.add_argument("--top", type=int, default=10, help="Rows per section")
+    parser.add_argument("--min-count", type=int, default=3, help="Fewest runs for a shape to be listed")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    since = time.time() - args.last * 3600 if args.last else None
+    records = [
+        record for record in read_records(args.paths)
+        if (since is None or record.get("ts", 0) >= since)
+        and (args.svc is None or record.get("svc") == args.svc)
+        and (args.route is None or record.get("route") == args.route)
+    ]
+    if not records:
+        sys.exit("No trace records found")
+
+    report = analyze(records, args.min_count)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    first, last = min(r.get("ts", 0) for r in records), max(r.get("ts", 0) for r in records)
+    print(
+        f"{len(records)} records, {time.strftime('%Y-%m-%d %H:%M', time.localtime(first))} to "
+        f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(last))}"
+    )
+    print_report(report, args.top)
+
+
+if __name__ == "__main__":
+    main()
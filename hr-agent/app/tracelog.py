@@ -0,0 +1,244 @@
+"""Compact per-request trace log.
+
+With TRACE_LOG_PATH set, every agent run (a /chat request, a batch item, a
+WebSocket message or a job) appends one JSON line to that file, which rotates
+at TRACE_LOG_MAX_BYTES keeping TRACE_LOG_BACKUPS old files:
+
+    {"ts": 1760000000.123, "svc": "agent", "route": "/chat", "id": "<X-Request-ID>",
+     "user": "<hashed sub>", "status": "ok", "ms": 2310.4,
+     "hops": {"setup": 41.2, "llm": 1912.7, "tools": 301.9},
+     "llm": {"calls": 3, "iterations": 3, "tokens": 5120, "cached_tokens": 3072},
+     "tools": [{"name": "search_employees", "ms": 288.1, "bytes": 5321, "cache": "miss"}],
+     "cache": {"tool_miss": 1, "mcp_unchanged": 1}}
+
+- ``status`` is "ok", "error" (with ``error``, the exception type) or
+  "cancelled"; ``llm.abort`` is set when the loop guard ended the run
+- ``hops``: time spent setting up the run (agent executor and tool catalog),
+  in LLM calls and in tool calls (summed, so parallel calls can add up to
+  more than the run took)
+- ``tools[].cache`` is "hit" (result cache, including prefetches), "miss" or
+  "none" (write tools)
+- ``cache`` counts tool result cache and MCP revalidation outcomes
+
+User ids are hashed (``hash_user``) and messages are not logged. The UI
+writes records of its own, with the X-Request-ID it sends as ``id`` and the
+same user hash when TRACE_LOG_USER_SALT matches, so ``python -m
+app.trace_report`` can join both logs.
+"""
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app import codec
+from app.config import settings
+
+# Header carrying the request id; Kong's correlation-id plugin sets it when
+# the client did not
+REQUEST_ID_HEADER = "X-Request-ID"
+
+_writer: Optional[logging.Logger] = None
+_writer_lock = threading.Lock()
+
+# Route, id and extra fields of the request being served, set by the
+# endpoint with bind() and inherited by the tasks it starts
+_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "trace_request", default=None
+)
+
+# Trace of the current agent run. The object is mutable, so tool calls in
+# child tasks (parallel tool calls) record into the run's trace.
+_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace_run", default=None)
+
+
+def enabled() -> bool:
+    """Whether trace records are written."""
+    return bool(settings.trace_log_path)
+
+
+def hash_user(user_sub: Optional[str]) -> Optional[str]:
+    """Stable pseudonymous id for a user (salted SHA-256, 16 hex digits)."""
+    if not user_sub:
+        return None
+    return hashlib.sha256(f"{settings.trace_log_user_salt}{user_sub}".encode("utf-8")).hexdigest()[:16]
+
+
+def bind(route: str, request_id: Optional[str] = None, **fields: Any) -> None:
+    """
+    Name the request that the following agent runs in this context serve.
+
+    Args:
+        route: Endpoint, e.g. "/chat"
+        request_id: Request id (X-Request-ID, job id); generated if missing
+        **fields: Extra record fields, e.g. the WebSocket message id
+    """
+    if enabled():
+        _request.set({"route": route, "id": request_id or uuid.uuid4().hex, **fields})
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+class Trace(AsyncCallbackHandler):
+    """Timings and counts of one agent run; also times its LLM calls as a callback."""
+
+    def __init__(self, user_sub: Optional[str]):
+        self.ts = time.time()
+        self.started = time.perf_counter()
+        self.request = _request.get() or {"route": "unknown", "id": uuid.uuid4().hex}
+        self.user = hash_user(user_sub)
+        self.hops: Dict[str, float] = {}
+        self.tools: List[Dict[str, Any]] = []
+        self.cache: Counter = Counter()
+        self.llm_calls = 0
+        self._llm_started: Dict[UUID, float] = {}
+        # Set once the record is written. Prefetch tasks cancelled at the end
+        # of the run can still finish a step and see this trace; counts made
+        # after the write would be lost, so they are dropped
+        self.finished = False
+
+    def add_hop(self, name: str, seconds: float) -> None:
+        """Add time spent in a hop."""
+        self.hops[name] = self.hops.get(name, 0.0) + seconds
+
+    def note_tool(self, name: str, seconds: float, result: Any, cache: str, error: bool = False) -> None:
+        """Record a tool call and its result size."""
+        if self.finished:
+            return
+        entry: Dict[str, Any] = {"name": name, "ms": _ms(seconds), "cache": cache}
+        if error:
+            entry["error"] = True
+        elif result is not None:
+            entry["bytes"] = len(result.encode("utf-8")) if isinstance(result, str) else len(codec.dumps(result))
+        self.tools.append(entry)
+        if cache != "none":
+            self.cache[f"tool_{cache}"] += 1
+        self.add_hop("tools", seconds)
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._llm_started[run_id] = time.perf_counter()
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._llm_started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._llm_done(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._llm_done(run_id)
+
+    def _llm_done(self, run_id: UUID) -> None:
+        started = self._llm_started.pop(run_id, None)
+        if started is not None:
+            self.llm_calls += 1
+            self.add_hop("llm", time.perf_counter() - started)
+
+    def record(
+        self,
+        status: str,
+        error: Optional[str],
+        usage: Dict[str, Any],
+        iterations: int,
+        abort: Optional[str],
+    ) -> Dict[str, Any]:
+        """The run's trace record; empty fields are left out."""
+        record: Dict[str, Any] = {
+            "ts": round(self.ts, 3),
+            "svc": "agent",
+            **self.request,
+            "user": self.user,
+            "status": status,
+            "error": error,
+            "ms": _ms(time.perf_counter() - self.started),
+            "hops": {name: _ms(seconds) for name, seconds in self.hops.items()},
+            "llm": {
+                "calls": self.llm_calls,
+                "iterations": iterations,
+                "tokens": usage.get("total_tokens", 0),
+                "cached_tokens": usage.get("cached_input_tokens", 0),
+                "abort": abort,
+            },
+            "tools": self.tools,
+            "cache": dict(self.cache),
+        }
+        record["llm"] = {key: value for key, value in record["llm"].items() if value is not None}
+        return {key: value for key, value in record.items() if value is not None and value != {} and value != []}
+
+
+def start(user_sub: Optional[str]) -> Optional[Trace]:
+    """Start tracing an agent run in the current context; None when disabled."""
+    if not enabled():
+        return None
+    trace = Trace(user_sub)
+    _trace.set(trace)
+    return trace
+
+
+def current() -> Optional[Trace]:
+    """Trace of the current agent run, if any."""
+    return _trace.get()
+
+
+def count(name: str) -> None:
+    """Count a cache outcome in the current run's trace, unless it has been written."""
+    trace = _trace.get()
+    if trace is not None and not trace.finished:
+        trace.cache[name] += 1
+
+
+def finish(
+    trace: Trace,
+    status: str,
+    error: Optional[str] = None,
+    usage: Optional[Dict[str, Any]] = None,
+    iterations: int = 0,
+    abort: Optional[str] = None,
+) -> None:
+    """
+    End a run's trace and write its record.
+
+    Args:
+        trace: Trace returned by start()
+        status: "ok", "error" or "cancelled"
+        error: Exception type of a failed run
+        usage: UsageTracker.summary() of the run
+        iterations: Agent iterations run
+        abort: Loop guard reason, if the run was ended early
+    """
+    _trace.set(None)
+    trace.finished = True
+    write(trace.record(status, error, usage or {}, iterations, abort))
+
+
+def _get_writer() -> logging.Logger:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            handler = RotatingFileHandler(
+                settings.trace_log_path,
+                maxBytes=settings.trace_log_max_bytes,
+                backupCount=settings.trace_log_backups,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            writer = logging.getLogger("hr_agent.trace")
+            writer.addHandler(handler)
+            writer.setLevel(logging.INFO)
+            writer.propagate = False
+            _writer = writer
+        return _writer
+
+
+def write(record: Dict[str, Any]) -> None:
+    """Append a record to the trace log."""
+    _get_writer().info(codec.dumps_str(record))
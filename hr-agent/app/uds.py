@@ -0,0 +1,43 @@
+"""Unix domain socket URLs for the agent's outbound hops.
+
+When the agent runs next to the Kong data plane, MCP_SERVER_URL,
+LLM_API_URL and LLM_FAST_API_URL can name a Unix socket instead of a TCP
+address, saving loopback TCP overhead and ephemeral ports:
+
+    unix://<socket path>:<HTTP path>    e.g. unix:///var/run/kong/proxy.sock:/mcp
+
+Requests are sent over the socket as plain HTTP with Host ``localhost`` (Kong
+routes these hops by path). Cassette recording (app/cassette.py) still
+forwards over TCP; replay needs no connection at all.
+"""
+from typing import Optional, Tuple
+
+import httpx
+
+UNIX_PREFIX = "unix://"
+
+# Host of requests sent over a socket
+SOCKET_HOST = "localhost"
+
+
+def split_url(url: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a hop URL into the HTTP URL to request and the socket to use.
+
+    Args:
+        url: http(s) URL, or unix://<socket path>:<HTTP path>
+
+    Returns:
+        (HTTP URL, socket path); the socket path is None for TCP URLs
+    """
+    if not url.startswith(UNIX_PREFIX):
+        return url, None
+    socket_path, _, path = url[len(UNIX_PREFIX):].partition(":")
+    if not socket_path:
+        raise ValueError(f"No socket path in {url}")
+    return f"http://{SOCKET_HOST}/{path.lstrip('/')}", socket_path
+
+
+def async_transport(socket_path: str) -> httpx.AsyncHTTPTransport:
+    """httpx transport sending requests over a Unix socket."""
+    return httpx.AsyncHTTPTransport(uds=socket_path)
@@ -0,0 +1,241 @@
+"""LLM token usage accounting, including provider prompt-cache hits.
+
+Usage is totalled per agent run (UsageTracker), per user over a time window
+(UsageLedger, which also enforces the optional per-user token budget) and per
+tool path, the sequence of tools a run called (metrics).
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.config import settings
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe(
+    "hr_agent_llm_prompt_tokens_total",
+    "LLM prompt tokens, by prompt cache outcome (read, write, uncached)",
+)
+metrics.describe("hr_agent_llm_completion_tokens_total", "LLM completion tokens")
+metrics.describe("hr_agent_llm_calls_total", "LLM calls made by the agent")
+metrics.describe(
+    "hr_agent_chat_tokens",
+    "LLM tokens (prompt plus completion) per agent run, by the first tool it called",
+)
+metrics.describe(
+    "hr_agent_usage_over_budget_total",
+    "Agent runs from users over their token budget, by action (reject, degrade)",
+)
+
+# Tool paths longer than this are truncated in summaries
+MAX_TOOL_PATH = 4
+
+
+def _usage_from_message(message: Any) -> Optional[Dict[str, int]]:
+    """Extract token counts from a chat message's standard usage_metadata."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    details = usage.get("input_token_details") or {}
+    return {
+        "input": usage.get("input_tokens", 0),
+        "output": usage.get("output_tokens", 0),
+        "cache_read": details.get("cache_read", 0) or 0,
+        "cache_write": details.get("cache_creation", 0) or 0,
+    }
+
+
+def _usage_from_llm_output(llm_output: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """Fall back to the raw OpenAI-style token_usage block."""
+    token_usage = (llm_output or {}).get("token_usage") or {}
+    if not token_usage:
+        return None
+    details = token_usage.get("prompt_tokens_details") or {}
+    return {
+        "input": token_usage.get("prompt_tokens", 0),
+        "output": token_usage.get("completion_tokens", 0),
+        "cache_read": details.get("cached_tokens", 0) or 0,
+        "cache_write": 0,
+    }
+
+
+class UsageTracker(AsyncCallbackHandler):
+    """Callback that totals LLM token usage for one agent run.
+
+    Prompt tokens are split into those served from the provider's prompt
+    cache (cache_read), those written to it (cache_write, Anthropic only) and
+    the rest (uncached).
+    """
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.tools: List[str] = []
+
+    @property
+    def total_tokens(self) -> int:
+        """Prompt plus completion tokens."""
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def tool_path(self) -> str:
+        """Distinct tools the run called, in first-call order (e.g. "get_employee>get_salary")."""
+        path: List[str] = []
+        for tool in self.tools:
+            if tool not in path:
+                path.append(tool)
+        if not path:
+            return "none"
+        if len(path) > MAX_TOOL_PATH:
+            path = path[:MAX_TOOL_PATH] + ["..."]
+        return ">".join(path)
+
+    @property
+    def first_tool(self) -> str:
+        """First tool the run called, or "none". Unlike tool_path, its values are bounded by the tool count."""
+        return self.tools[0] if self.tools else "none"
+
+    @property
+    def uncached_input_tokens(self) -> int:
+        """Prompt tokens processed without any help from the prompt cache."""
+        return max(0, self.input_tokens - self.cache_read_tokens - self.cache_write_tokens)
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        self.tools.append((serialized or {}).get("name") or kwargs.get("name") or "unknown")
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                usage = _usage_from_message(getattr(generation, "message", None))
+                if usage:
+                    break
+            if usage:
+                break
+        if usage is None:
+            usage = _usage_from_llm_output(response.llm_output)
+        if usage is None:
+            return
+
+        self.llm_calls += 1
+        self.input_tokens += usage["input"]
+        self.output_tokens += usage["output"]
+        self.cache_read_tokens += usage["cache_read"]
+        self.cache_write_tokens += usage["cache_write"]
+
+        uncached = max(0, usage["input"] - usage["cache_read"] - usage["cache_write"])
+        metrics.inc("hr_agent_llm_calls_total")
+        metrics.inc("hr_agent_llm_prompt_tokens_total", usage["cache_read"], cache="read")
+        metrics.inc("hr_agent_llm_prompt_tokens_total", usage["cache_write"], cache="write")
+        metrics.inc("hr_agent_llm_prompt_tokens_total", uncached, cache="uncached")
+        metrics.inc("hr_agent_llm_completion_tokens_total", usage["output"])
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals for the run, suitable for logging or API responses."""
+        return {
+            "llm_calls": self.llm_calls,
+            "total_tokens": self.total_tokens,
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cache_read_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "uncached_input_tokens": self.uncached_input_tokens,
+            "output_tokens": self.output_tokens,
+            "tool_calls": len(self.tools),
+            "tool_path": self.tool_path,
+        }
+
+    def finish(self, user_sub: Optional[str]) -> None:
+        """Log the run's usage, export it by first tool and charge it to the user."""
+        self.log_summary()
+        metrics.observe("hr_agent_chat_tokens", self.total_tokens, first_tool=self.first_tool)
+        usage_ledger.charge(user_sub, self.total_tokens)
+
+    def log_summary(self) -> None:
+        """Log the run's prompt cache effectiveness."""
+        if not self.llm_calls:
+            return
+        hit_rate = self.cache_read_tokens / self.input_tokens * 100 if self.input_tokens else 0.0
+        logger.info(
+            f"[LLM] {self.llm_calls} calls: {self.input_tokens} prompt tokens "
+            f"({self.cache_read_tokens} cached, {self.cache_write_tokens} cache writes, "
+            f"{self.uncached_input_tokens} uncached, {hit_rate:.0f}% hit), "
+            f"{self.output_tokens} completion tokens"
+        )
+
+
+class UsageLedger:
+    """Per-user LLM token totals over fixed time windows, with an optional budget.
+
+    Windows are aligned to the epoch, so every user's budget resets at the
+    same moment and the ledger only ever holds the current window's users.
+    """
+
+    def __init__(self, budget_tokens: int = 0, window_seconds: int = 3600):
+        """
+        Initialize the ledger.
+
+        Args:
+            budget_tokens: Tokens each user may use per window; 0 disables the budget
+            window_seconds: Length of a budget window
+        """
+        self.budget_tokens = budget_tokens
+        self.window_seconds = max(1, window_seconds)
+        self._lock = threading.Lock()
+        self._window = self._current_window()
+        self._used: Dict[str, int] = {}
+
+    def _current_window(self) -> int:
+        return int(time.time() // self.window_seconds)
+
+    def _roll(self) -> None:
+        """Start a new window if the current one has ended (lock held)."""
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self._used.clear()
+
+    def charge(self, user_sub: Optional[str], tokens: int) -> None:
+        """Add a run's tokens to the user's total."""
+        if tokens <= 0:
+            return
+        user = user_sub or "anonymous"
+        with self._lock:
+            self._roll()
+            self._used[user] = self._used.get(user, 0) + tokens
+
+    def used(self, user_sub: Optional[str]) -> int:
+        """Tokens the user has used in the current window."""
+        with self._lock:
+            self._roll()
+            return self._used.get(user_sub or "anonymous", 0)
+
+    def over_budget(self, user_sub: Optional[str]) -> bool:
+        """Whether the user has used up this window's budget."""
+        return self.budget_tokens > 0 and self.used(user_sub) >= self.budget_tokens
+
+    def seconds_until_reset(self) -> int:
+        """Seconds until the current window ends and budgets reset."""
+        return int(self.window_seconds - time.time() % self.window_seconds) + 1
+
+    def status(self, user_sub: Optional[str]) -> Dict[str, Any]:
+        """The user's usage and budget, suitable for API responses."""
+        used = self.used(user_sub)
+        return {
+            "used_tokens": used,
+            "budget_tokens": self.budget_tokens or None,
+            "remaining_tokens": max(0, self.budget_tokens - used) if self.budget_tokens else None,
+            "resets_in_seconds": self.seconds_until_reset(),
+            "action": settings.usage_budget_action,
+        }
+
+
+usage_ledger = UsageLedger(settings.usage_budget_tokens, settings.usage_budget_window_seconds)
+
@@ -0,0 +1,166 @@
+"""Data-scale benchmark for MCPClient.call_tool on large list-tool responses.
+
+Serves a synthetic list_employees_with_salaries response of N employees
+through an in-memory httpx transport and measures, per size:
+
+- parse time of MCPClient.call_tool (body read, JSON decode, text extraction)
+- peak Python memory allocated during the call (tracemalloc)
+- prompt tokens the tool result adds when handed to the LLM
+
+Run from the hr-agent directory:
+
+    python -m benchmarks.bench_call_tool --employees 1000 10000 100000
+
+Use --payload to benchmark a response captured from a real MCP server
+(generated with HR_DATASET_EMPLOYEES) instead of the built-in generator, and
+--stream to measure MCPClient.call_tool_stream (records decoded incrementally
+from a chunked body) instead.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List
+
+import httpx
+
+from app.mcp_client import MCPClient
+
+LOCATIONS = ["San Francisco", "New York", "Seattle", "Austin", "Chicago", "Boston", "Denver", "London"]
+DEPARTMENTS = ["Engineering", "Product", "Human Resources", "Sales", "Marketing", "Finance"]
+FIRST_NAMES = ["Sarah", "Marcus", "Priya", "James", "Emma", "David", "Lisa", "Robert", "Aisha", "Carlos"]
+LAST_NAMES = ["Chen", "Johnson", "Patel", "Lee", "Wilson", "Park", "Martinez", "Taylor", "Khan", "Garcia"]
+
+
+def generate_rows(employees: int, seed: int) -> List[dict]:
+    """Generate list_employees_with_salaries rows shaped like the Go server's."""
+    rng = random.Random(seed)
+    width = max(3, len(str(employees)))
+    rows = []
+    for n in range(1, employees + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        base = 70000 + rng.randrange(6) * 25000 + rng.randrange(30000)
+        bonus = base // 10 * rng.randrange(4)
+        equity = base // 5 * rng.randrange(3)
+        department = DEPARTMENTS[(n - 1) % len(DEPARTMENTS)]
+        rows.append({
+            "id": f"emp-{n:0{width}d}",
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{n}@corp.com",
+            "title": f"Specialist, {department}",
+            "department": department,
+            "location": rng.choice(LOCATIONS),
+            "base_salary": base,
+            "bonus": bonus,
+            "equity": equity,
+            "total_compensation": base + bonus + equity,
+        })
+    rows.sort(key=lambda row: (-row["base_salary"], row["id"]))
+    return rows
+
+
+def build_envelope(result_text: str) -> bytes:
+    """Wrap a tool result the way the MCP server's tools/call handler does."""
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"content": [{"type": "text", "text": result_text}]},
+    }).encode()
+
+
+def token_counter() -> Callable[[str], int]:
+    """Return a prompt-token counter, estimating when tiktoken data is unavailable."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        return lambda text: len(text) // 4
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    """Response body delivered in fixed-size chunks, like a socket read loop."""
+
+    def __init__(self, body: bytes, chunk_size: int = 64 * 1024):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def __aiter__(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+async def measure(body: bytes, repeat: int, stream: bool = False) -> dict:
+    """Time and profile MCPClient.call_tool (or call_tool_stream) against a canned response body."""
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(
+            200, stream=ChunkedBody(body), headers={"Content-Type": "application/json"}
+        )
+    )
+    client = MCPClient(base_url="http://mcp.bench/mcp", transport=transport)
+
+    async def call() -> object:
+        if not stream:
+            return await client.call_tool("list_employees_with_salaries", {})
+        # Count records without keeping them, as a consumer streaming them on would
+        count = 0
+        async for _ in client.call_tool_stream("list_employees_with_salaries", {}):
+            count += 1
+        return count
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await call()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    await call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"result": result, "timings": timings, "peak_bytes": peak}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--payload", help="JSON file with a captured tools/call response body")
+    parser.add_argument("--stream", action="store_true", help="Measure call_tool_stream instead of call_tool")
+    args = parser.parse_args()
+
+    count_tokens = token_counter()
+
+    if args.payload:
+        with open(args.payload, "rb") as f:
+            cases = [(args.payload, f.read())]
+    else:
+        cases = [
+            (f"{n} employees", build_envelope(json.dumps(generate_rows(n, args.seed))))
+            for n in args.employees
+        ]
+
+    print(f"{'case':>20} {'body':>10} {'p50 ms':>9} {'max ms':>9} {'peak mem':>10} {'mem/body':>9} {'tokens':>10}")
+    for label, body in cases:
+        stats = await measure(body, args.repeat, args.stream)
+        result = json.loads(body).get("result", {})
+        content = result.get("content") or [{}]
+        result_text = content[0].get("text") or json.dumps(result)
+        print(
+            f"{label:>20} "
+            f"{len(body) / 1024:>8.0f}KB "
+            f"{statistics.median(stats['timings']):>9.1f} "
+            f"{max(stats['timings']):>9.1f} "
+            f"{stats['peak_bytes'] / 1024 / 1024:>8.1f}MB "
+            f"{stats['peak_bytes'] / len(body):>8.1f}x "
+            f"{count_tokens(result_text):>10}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
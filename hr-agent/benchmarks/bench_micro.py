@@ -0,0 +1,384 @@
+"""Micro-benchmarks of per-request hot functions, with a regression gate.
+
+Times small functions every chat request runs, in the agent and the UI:
+
+- ``token_context``: TokenContext construction from Kong's headers, including
+  the x-introspection-token decode (_extract_exchanged_token)
+- ``extract_exchanged_token``: _extract_exchanged_token alone
+- ``decode_jwt_payload_agent`` / ``decode_jwt_payload_ui``: both copies of
+  decode_jwt_payload (hr-agent/app/main.py, streamlit-app/app.py)
+- ``get_available_tools``: MCPToolFactory.get_available_tools against an
+  in-memory MCP server returning the full tool catalog
+- ``chat_response_fingerprint`` / ``chat_response_full``: building and
+  serializing a ChatResponse with realistic exchanged tokens, for both
+  TOKEN_DISPLAY_MODE values
+- ``ui_api_chat_dedupe``: the Flask /api/chat view relaying an agent
+  response whose exchanged tokens are already in the session (the common
+  case: the session is left unmodified)
+
+Each benchmark is run in batches sized to take at least --min-time seconds;
+the per-call time of the fastest of --repeat batches is reported. Run from the
+hr-agent directory:
+
+    python -m benchmarks.bench_micro --save-baseline   # on the base revision
+    python -m benchmarks.bench_micro                   # after the change
+
+The second run compares against the saved baseline and exits with status 1
+when a benchmark got slower by more than --threshold (0.25 = 25%). Baselines
+only compare on the same machine and Python; they record both and say so
+when they differ. UI benchmarks are skipped when the UI's dependencies
+(requirements.txt of streamlit-app) are not installed.
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from app import codec
+from app.auth import TokenContext
+from app.main import ChatResponse, ExchangedTokensInfo, TokenInfo, UsageInfo, decode_jwt_payload
+from app.mcp_client import MCPClient
+from app.tools import MCPToolFactory
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "micro_baseline.json")
+UI_APP_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "streamlit-app", "app.py")
+
+SCOPES = "openid profile hr:employee:read hr:employee:write hr:salary:read hr:department:read hr:org:read"
+
+TOOL_NAMES = [
+    "get_employee", "update_employee", "list_departments", "get_salary", "update_salary",
+    "update_employees", "update_salaries", "get_org_chart", "list_employees",
+    "list_employees_with_salaries", "list_employees_by_department", "aggregate",
+]
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def make_jwt(audience: str, actor: Optional[str] = None) -> str:
+    """An Okta-shaped RS256 access token (unsigned; the signature is filler)."""
+    now = int(time.time())
+    claims: Dict[str, Any] = {
+        "ver": 1,
+        "jti": "AT.Q2k3bW9uZXlfMTIzNDU2Nzg5MGFiY2RlZmdoaWprbG1ub3A",
+        "iss": "https://dev-123456.okta.com/oauth2/aus1hrdemo0000000000",
+        "aud": audience,
+        "iat": now,
+        "exp": now + 3600,
+        "cid": "0oa1hrdemoclient00000",
+        "uid": "00u1hrdemouser000000",
+        "scp": SCOPES.split(),
+        "scope": SCOPES,
+        "auth_time": now - 60,
+        "sub": "sarah.chen@corp.com",
+        "groups": ["Everyone", "HR Managers", "Engineering"],
+    }
+    if actor:
+        claims["act"] = {"sub": actor}
+    header = {"kid": "hr-demo-signing-key-2024", "alg": "RS256", "typ": "JWT"}
+    return ".".join([
+        _b64url(json.dumps(header).encode()),
+        _b64url(json.dumps(claims).encode()),
+        _b64url(bytes(range(256))),  # RS256 signatures are 256 bytes
+    ])
+
+
+def make_introspection_header(access_token: str) -> str:
+    """x-introspection-token as Kong sends it: the base64 RFC 8693 response."""
+    exchange_response = {
+        "access_token": access_token,
+        "issued_token_type": "urn:ietf:params:oauth:token-type:access_token",
+        "token_type": "Bearer",
+        "expires_in": 3600,
+        "scope": SCOPES,
+    }
+    return base64.b64encode(json.dumps(exchange_response).encode()).decode("ascii")
+
+
+USER_TOKEN = make_jwt("api://hr-ui")
+HOP1_TOKEN = make_jwt("api://hr-agent", actor="hr-ui")
+HOP2_TOKEN = make_jwt("api://hr-mcp", actor="hr-agent")
+INTROSPECTION_HEADER = make_introspection_header(HOP1_TOKEN)
+CLAIMS = {token: decode_jwt_payload(token) for token in (HOP1_TOKEN, HOP2_TOKEN)}
+
+
+def make_token_context() -> TokenContext:
+    return TokenContext(
+        user_scopes=SCOPES,
+        user_sub="sarah.chen@corp.com",
+        actor_chain="hr-ui,hr-agent",
+        authorization=f"Bearer {USER_TOKEN}",
+        x_introspection_token=INTROSPECTION_HEADER,
+    )
+
+
+def make_token_infos(full: bool) -> List[TokenInfo]:
+    infos = []
+    for hop, token, description in (
+        (1, HOP1_TOKEN, "Token exchanged by Kong OIDC for HR Agent (Hop 1: Flask UI → HR Agent)"),
+        (2, HOP2_TOKEN, "Token exchanged by Kong for MCP Server (Hop 2: HR Agent → MCP Server)"),
+    ):
+        claims = CLAIMS[token]
+        infos.append(TokenInfo(
+            fingerprint=codec.dumps(hop).hex().ljust(16, "0"),
+            token=token if full else None,
+            claims=claims if full else None,
+            hop=hop,
+            description=description,
+            audience=claims["aud"],
+        ))
+    return infos
+
+
+ANSWER = (
+    "The Engineering department has 42 employees. The highest paid is Marcus Johnson "
+    "(Principal Engineer, Seattle) with a base salary of $210,000, followed by Priya Patel "
+    "(Staff Engineer, San Francisco) at $195,000. The average base salary is $148,300."
+)
+
+USAGE = {
+    "llm_calls": 2, "total_tokens": 5210, "input_tokens": 4860, "cached_input_tokens": 3584,
+    "cache_write_tokens": 0, "uncached_input_tokens": 1276, "output_tokens": 350, "tool_calls": 1,
+    "tool_path": "aggregate",
+}
+
+
+def chat_response_body(full: bool) -> bytes:
+    """A /chat response as the agent renders it."""
+    response = ChatResponse(
+        response=ANSWER,
+        user_scopes=SCOPES.split(),
+        user_sub="sarah.chen@corp.com",
+        exchanged_token=ExchangedTokensInfo(tokens=make_token_infos(full)),
+        usage=UsageInfo(**USAGE),
+    )
+    return codec.dumps(jsonable_encoder(response))
+
+
+# Registered benchmarks: name -> setup returning the function to time (sync or async)
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("token_context")
+def bench_token_context():
+    return make_token_context
+
+
+@benchmark("extract_exchanged_token")
+def bench_extract_exchanged_token():
+    return make_token_context()._extract_exchanged_token
+
+
+@benchmark("decode_jwt_payload_agent")
+def bench_decode_jwt_payload_agent():
+    return lambda: decode_jwt_payload(HOP1_TOKEN)
+
+
+@benchmark("decode_jwt_payload_ui")
+def bench_decode_jwt_payload_ui():
+    ui = load_ui()
+    return lambda: ui.decode_jwt_payload(USER_TOKEN)
+
+
+@benchmark("get_available_tools")
+def bench_get_available_tools():
+    catalog = codec.dumps({
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {"tools": [
+            {
+                "name": name,
+                "description": f"{name.replace('_', ' ').capitalize()} from the HR system.",
+                "inputSchema": {"type": "object", "properties": {}},
+            }
+            for name in TOOL_NAMES
+        ]},
+    })
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, content=catalog, headers={"Content-Type": "application/json"})
+    )
+    factory = MCPToolFactory(MCPClient(base_url="http://mcp.bench/mcp", transport=transport), make_token_context())
+    return factory.get_available_tools
+
+
+@benchmark("chat_response_fingerprint")
+def bench_chat_response_fingerprint():
+    return lambda: chat_response_body(full=False)
+
+
+@benchmark("chat_response_full")
+def bench_chat_response_full():
+    return lambda: chat_response_body(full=True)
+
+
+@benchmark("ui_api_chat_dedupe")
+def bench_ui_api_chat_dedupe():
+    ui = load_ui()
+    agent_response = SimpleNamespace(status_code=200, content=chat_response_body(full=False), text="")
+    # Only the UI module's reference is replaced; no request leaves the process
+    ui.agent_http = SimpleNamespace(post=lambda *args, **kwargs: agent_response)
+
+    client = ui.app.test_client()
+    with client.session_transaction() as session:
+        session["access_token"] = USER_TOKEN
+        token_refs = session.setdefault("exchanged_token_refs", {})
+        ui.remember_exchanged_tokens(token_refs, json.loads(agent_response.content)["exchanged_token"]["tokens"])
+    request = {"message": "Who are the highest paid engineers?", "chat_history": []}
+    return lambda: client.post("/api/chat", json=request)
+
+
+_ui = None
+
+
+def load_ui() -> Any:
+    """Import the UI's app.py (its module name clashes with the agent's app package)."""
+    global _ui
+    if _ui is None:
+        spec = importlib.util.spec_from_file_location("hr_ui_app", UI_APP_PATH)
+        module = importlib.util.module_from_spec(spec)
+        with quiet():
+            spec.loader.exec_module(module)
+        _ui = module
+    return _ui
+
+
+@contextlib.contextmanager
+def quiet():
+    """Send stdout and the root logger's output to /dev/null, keeping their cost."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        handlers = [h for h in logging.getLogger().handlers if isinstance(h, logging.StreamHandler)]
+        streams = [h.setStream(devnull) for h in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, streams):
+                handler.setStream(stream)
+
+
+def run_batch(fn: Callable[[], Any], number: int, loop: asyncio.AbstractEventLoop) -> float:
+    """Seconds taken by number calls of fn."""
+    if asyncio.iscoroutinefunction(fn):
+        async def batch():
+            started = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            return time.perf_counter() - started
+        return loop.run_until_complete(batch())
+
+    started = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - started
+
+
+def measure(fn: Callable[[], Any], min_time: float, repeat: int, loop: asyncio.AbstractEventLoop) -> Dict[str, float]:
+    """Per-call microseconds of fn: fastest and median of repeat batches."""
+    # Calibrate the batch size like timeit.Timer.autorange
+    number = 1
+    while True:
+        elapsed = run_batch(fn, number, loop)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    per_call = [run_batch(fn, number, loop) / number * 1e6 for _ in range(repeat)]
+    return {"us_per_call": min(per_call), "median_us": statistics.median(per_call), "number": number}
+
+
+def environment() -> Dict[str, str]:
+    return {"python": platform.python_version(), "machine": f"{platform.system()} {platform.machine()} {platform.node()}"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default all): {', '.join(BENCHMARKS)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed batch")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    baseline: Dict[str, Any] = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print(f"Warning: baseline was recorded on {baseline.get('environment')}, this is {environment()}")
+    elif not args.save_baseline:
+        print(f"No baseline at {args.baseline}; run with --save-baseline on the base revision first")
+
+    loop = asyncio.new_event_loop()
+    results: Dict[str, Dict[str, float]] = {}
+    regressions = []
+    print(f"{'benchmark':<28} {'us/call':>10} {'median':>10} {'baseline':>10} {'change':>8}")
+    for name in args.names or BENCHMARKS:
+        # The UI and the agent log on every request
+        with quiet():
+            try:
+                fn = BENCHMARKS[name]()
+            except ImportError as e:
+                fn, skipped = None, e
+            if fn is not None:
+                result = measure(fn, args.min_time, args.repeat, loop)
+        if fn is None:
+            print(f"{name:<28} {'skipped':>10}  ({skipped})")
+            continue
+        results[name] = result
+
+        line = f"{name:<28} {result['us_per_call']:>10.2f} {result['median_us']:>10.2f}"
+        reference = baseline.get("results", {}).get(name)
+        if reference:
+            change = result["us_per_call"] / reference["us_per_call"] - 1
+            line += f" {reference['us_per_call']:>10.2f} {change:>+7.0%}"
+            if change > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+    loop.close()
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "environment": environment(),
+                "results": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""End-to-end agent benchmark replaying a recorded cassette.
+
+Record a cassette by running the agent (or the whole stack) with
+
+    CASSETTE_MODE=record CASSETTE_PATH=/tmp/chats.ndjson.gz
+
+and sending it some chats. Every LLM and MCP exchange is recorded together
+with each chat's input and answer. This benchmark then replays every recorded
+chat through a fresh HRAgent, serving LLM and MCP responses from the cassette
+(no Okta, Kong or LLM provider needed), and reports per chat:
+
+- wall time of HRAgent.chat, with recorded latencies scaled by --latency-scale
+- peak Python memory allocated during the chat (tracemalloc)
+- whether the answer is identical to the recorded one
+
+Run from the hr-agent directory:
+
+    python -m benchmarks.bench_replay /tmp/chats.ndjson.gz --latency-scale 1 --repeat 3
+
+A chat that issues a request the cassette has no response for (for example
+after a change to the prompt or the tool arguments) fails with the request
+that was not found.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from app import cassette
+from app.agent import HRAgent
+from app.auth import TokenContext
+
+
+async def replay_chat(chat: dict) -> dict:
+    """Replay one recorded chat against the active cassette."""
+    agent = HRAgent(TokenContext(user_scopes=chat["user_scopes"], user_sub=chat["user_sub"]))
+    started = time.perf_counter()
+    try:
+        response, error = await agent.run(chat["message"], chat.get("chat_history")), None
+    except Exception as e:
+        response, error = None, str(e)
+    return {
+        "duration_ms": (time.perf_counter() - started) * 1000,
+        "identical": response == chat["response"],
+        "error": error,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="Cassette file recorded with CASSETTE_MODE=record")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Recorded latency multiplier; 0 = none")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for _ in range(args.repeat):
+        # A fresh cassette per pass: replay consumes recorded exchanges
+        tape = cassette.Cassette(args.cassette, "replay", args.latency_scale)
+        cassette.use(tape)
+        for index, chat in enumerate(tape.chats):
+            tracemalloc.start()
+            outcome = await replay_chat(chat)
+            _, outcome["peak_bytes"] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.setdefault(index, []).append(outcome)
+        await tape.aclose()
+    cassette.use(None)
+
+    print(f"{'chat':>4} {'recorded ms':>12} {'p50 ms':>9} {'max ms':>9} {'peak mem':>10} {'identical':>10}  message")
+    for index, chat in enumerate(tape.chats):
+        outcomes = results[index]
+        timings = [o["duration_ms"] for o in outcomes]
+        identical = sum(o["identical"] for o in outcomes)
+        print(
+            f"{index:>4} "
+            f"{chat.get('duration_ms', 0):>12.1f} "
+            f"{statistics.median(timings):>9.1f} "
+            f"{max(timings):>9.1f} "
+            f"{max(o['peak_bytes'] for o in outcomes) / 1024 / 1024:>8.1f}MB "
+            f"{identical:>6}/{len(outcomes):<3}  "
+            f"{chat['message'][:50]}"
+        )
+        for error in {o["error"] for o in outcomes if o["error"]}:
+            print(f"{'':>5}error: {error}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""Races between cancelling a chat job and the job finishing (app/jobs.py).
+
+Run from the hr-agent directory: python -m pytest tests
+"""
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app import jobs
+from app.auth import TokenContext
+from app.metrics import metrics
+
+CALLBACK_URL = "http://hooks.test/jobs"
+
+
+def finished_count(status: str) -> float:
+    return metrics.get_counter("hr_agent_jobs_finished_total", status=status)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    release = asyncio.Event()
+
+    async def run(self, message, chat_history=None, usage=None):
+        await release.wait()
+        return f"answer to {message}"
+
+    monkeypatch.setattr(jobs.HRAgent, "run", run)
+    manager = jobs.JobManager(
+        jobs.JobStore(":memory:"), workers=1, max_queue=10, ttl_seconds=60,
+        callback_allowed_hosts=["hooks.test"],
+    )
+    manager.release = release
+    manager.callbacks: List[Dict[str, Any]] = []
+
+    async def send_callback(callback_url, job):
+        manager.callbacks.append(job)
+
+    manager._send_callback = send_callback
+    return manager
+
+
+async def wait_for_status(manager, job_id: str, status: str) -> None:
+    for _ in range(200):
+        if manager.store.get(job_id)["status"] == status:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+
+def test_finish_keeps_first_outcome():
+    store = jobs.JobStore(":memory:")
+    store.create("j1", "alice", "hi", None)
+
+    assert store.finish("j1", jobs.SUCCEEDED, result={"response": "done"})
+    assert not store.finish("j1", jobs.CANCELLED, error="Cancelled by user")
+
+    job = store.get("j1")
+    assert job["status"] == jobs.SUCCEEDED
+    assert job["result"] == {"response": "done"}
+    assert job["error"] is None
+
+
+def test_cancel_racing_completion_keeps_result(manager):
+    """A cancel that saw the job running while it completed must not overwrite its result."""
+
+    async def scenario():
+        await manager.start()
+        job = await manager.submit(TokenContext(user_sub="alice"), "hi", [], CALLBACK_URL)
+        await wait_for_status(manager, job["id"], jobs.RUNNING)
+
+        get = manager.get
+
+        async def get_then_complete(job_id, user_sub):
+            # cancel() reads the record while the job is running, then the
+            # job completes before cancel() looks for its task
+            record = await get(job_id, user_sub)
+            manager.release.set()
+            await wait_for_status(manager, job_id, jobs.SUCCEEDED)
+            return record
+
+        manager.get = get_then_complete
+        succeeded, cancelled = finished_count(jobs.SUCCEEDED), finished_count(jobs.CANCELLED)
+        await manager.cancel(job["id"], "alice")
+        await manager._queue.join()
+        record = await get(job["id"], "alice")
+        await manager.stop()
+        return record, succeeded, cancelled
+
+    record, succeeded, cancelled = asyncio.run(scenario())
+
+    assert record["status"] == jobs.SUCCEEDED
+    assert record["result"]["response"] == "answer to hi"
+    assert finished_count(jobs.SUCCEEDED) == succeeded + 1
+    assert finished_count(jobs.CANCELLED) == cancelled
+    assert [callback["status"] for callback in manager.callbacks] == [jobs.SUCCEEDED]
+
+
+def test_late_cancel_finish_is_ignored(manager):
+    """A CANCELLED outcome arriving after success is neither stored, counted nor called back."""
+
+    async def scenario():
+        await manager.start()
+        manager.release.set()
+        job = await manager.submit(TokenContext(user_sub="alice"), "hi", [], CALLBACK_URL)
+        await manager._queue.join()
+        cancelled = finished_count(jobs.CANCELLED)
+        await manager._finish(job["id"], None, jobs.CANCELLED, error="Cancelled by user")
+        record = await manager.get(job["id"], "alice")
+        await manager.stop()
+        return record, cancelled
+
+    record, cancelled = asyncio.run(scenario())
+
+    assert record["status"] == jobs.SUCCEEDED
+    assert record["result"]["response"] == "answer to hi"
+    assert finished_count(jobs.CANCELLED) == cancelled
+    assert [callback["status"] for callback in manager.callbacks] == [jobs.SUCCEEDED]
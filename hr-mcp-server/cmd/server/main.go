@@ -1,9 +1,15 @@
 package main
 
 import (
+	"context"
+	"errors"
 	"log"
 	"net/http"
 	"os"
+	"os/signal"
+	"strconv"
+	"syscall"
+	"time"
 
 	"github.com/hr-token-exchange-demo/hr-mcp-server/internal/data"
 	"github.com/hr-token-exchange-demo/hr-mcp-server/internal/handlers"
@@ -16,15 +22,19 @@ func main() {
 		port = "9000"
 	}
 
-	// Initialize data store
-	store := data.NewStore()
-	log.Println("Initialized mock HR data store")
+	// Initialize data store, persisted under HR_DATA_DIR when set
+	store, stopCompaction := openStore()
 
 	// Create MCP handler
 	mcpHandler := handlers.NewHandler(store)
 
-	// Setup HTTP server
-	http.Handle("/mcp", mcpHandler)
+	// Setup HTTP server, gzip-compressing MCP responses of at least
+	// HR_COMPRESS_MIN_BYTES (default 1 KiB; negative disables compression)
+	if minSize := envInt("HR_COMPRESS_MIN_BYTES", 1024); minSize >= 0 {
+		http.Handle("/mcp", handlers.Compress(mcpHandler, minSize))
+	} else {
+		http.Handle("/mcp", mcpHandler)
+	}
 	http.HandleFunc("/health", healthHandler)
 
 	addr := ":" + port
@@ -32,9 +42,103 @@ func main() {
 	log.Printf("MCP endpoint: http://localhost%s/mcp", addr)
 	log.Printf("Health endpoint: http://localhost%s/health", addr)
 
-	if err := http.ListenAndServe(addr, nil); err != nil {
-		log.Fatalf("Server failed to start: %v", err)
+	server := &http.Server{Addr: addr}
+	go func() {
+		if err := server.ListenAndServe(); err != nil && !errors.Is(err, http.ErrServerClosed) {
+			log.Fatalf("Server failed to start: %v", err)
+		}
+	}()
+
+	// On SIGINT/SIGTERM, finish in-flight requests, then close the store so
+	// its write log is closed cleanly
+	signals := make(chan os.Signal, 1)
+	signal.Notify(signals, syscall.SIGINT, syscall.SIGTERM)
+	log.Printf("Received %v, shutting down", <-signals)
+
+	ctx, cancel := context.WithTimeout(context.Background(), 10*time.Second)
+	defer cancel()
+	if err := server.Shutdown(ctx); err != nil {
+		log.Printf("Shutdown: %v", err)
+	}
+	stopCompaction()
+	if err := store.Close(); err != nil {
+		log.Printf("Failed to close data store: %v", err)
+	}
+}
+
+// newStore builds the mock data store, or a synthetic dataset when
+// HR_DATASET_EMPLOYEES is set (with optional HR_DATASET_DEPARTMENTS and
+// HR_DATASET_SEED)
+func newStore() *data.Store {
+	employees := envInt("HR_DATASET_EMPLOYEES", 0)
+	if employees <= 0 {
+		log.Println("Initialized mock HR data store")
+		return data.NewStore()
+	}
+
+	opts := data.GenerateOptions{
+		Employees:   employees,
+		Departments: envInt("HR_DATASET_DEPARTMENTS", 0),
+		Seed:        int64(envInt("HR_DATASET_SEED", 1)),
+	}
+	start := time.Now()
+	store := data.NewGeneratedStore(opts)
+	log.Printf("Initialized synthetic HR data store: %d employees, seed %d (%v)",
+		opts.Employees, opts.Seed, time.Since(start))
+	return store
+}
+
+// openStore returns the in-memory store from newStore, or, when HR_DATA_DIR
+// is set, a store persisted as a snapshot plus write log in that directory.
+// The snapshot is seeded from newStore on first start and compacted every
+// HR_COMPACT_INTERVAL (default 5m) or once the log exceeds
+// HR_COMPACT_LOG_BYTES (default 64 MiB). The returned function stops
+// compaction.
+func openStore() (*data.Store, func()) {
+	dir := os.Getenv("HR_DATA_DIR")
+	if dir == "" {
+		return newStore(), func() {}
+	}
+
+	backend, err := data.OpenFileBackend(dir)
+	if err != nil {
+		log.Fatalf("Failed to open data dir %s: %v", dir, err)
+	}
+
+	start := time.Now()
+	store, err := data.OpenStore(backend, newStore)
+	if err != nil {
+		log.Fatalf("Failed to load data store from %s: %v", dir, err)
+	}
+	log.Printf("Loaded persistent HR data store from %s (%v)", dir, time.Since(start))
+
+	interval, err := time.ParseDuration(envString("HR_COMPACT_INTERVAL", "5m"))
+	if err != nil {
+		log.Fatalf("Invalid HR_COMPACT_INTERVAL: %v", err)
+	}
+	stop := store.StartCompaction(interval, int64(envInt("HR_COMPACT_LOG_BYTES", 64<<20)))
+	return store, stop
+}
+
+// envString reads a string environment variable, falling back to def
+func envString(name, def string) string {
+	if value := os.Getenv(name); value != "" {
+		return value
+	}
+	return def
+}
+
+// envInt reads an integer environment variable, falling back to def
+func envInt(name string, def int) int {
+	value := os.Getenv(name)
+	if value == "" {
+		return def
+	}
+	n, err := strconv.Atoi(value)
+	if err != nil {
+		log.Fatalf("Invalid %s: %v", name, err)
 	}
+	return n
 }
 
 func healthHandler(w http.ResponseWriter, r *http.Request) {
@@ -0,0 +1,164 @@
+package data
+
+import (
+	"fmt"
+	"log"
+	"maps"
+	"time"
+)
+
+// Backend persists the store's contents across restarts.
+//
+// The store calls Append with its write lock held, before applying a change
+// in memory, so a mutation is only visible once it is durable.
+type Backend interface {
+	// Load fills an empty store from persisted state. It returns false if
+	// there is no persisted state yet.
+	Load(s *Store) (bool, error)
+	// Append durably records mutations in the write log
+	Append(mutations ...Mutation) error
+	// Compact writes view as the new snapshot and drops the first
+	// logOffset bytes of the write log, which view already contains.
+	// Appends may continue while it runs; view must not change.
+	Compact(view *Store, logOffset int64) error
+	// LogSize returns the number of bytes in the write log
+	LogSize() int64
+	// Close releases files held by the backend
+	Close() error
+}
+
+// Mutation is one write-log entry: the full new version of a record
+type Mutation struct {
+	Employee *Employee `json:"employee,omitempty"`
+	Salary   *Salary   `json:"salary,omitempty"`
+}
+
+// apply replays a mutation into the store's maps without logging it or
+// updating indexes (used while loading, before indexes are rebuilt)
+func (m Mutation) apply(s *Store) error {
+	switch {
+	case m.Employee != nil:
+		s.employees[m.Employee.ID] = m.Employee
+	case m.Salary != nil:
+		s.salaries[m.Salary.EmployeeID] = m.Salary
+	default:
+		return fmt.Errorf("empty mutation")
+	}
+	return nil
+}
+
+// OpenStore loads a store from a backend. If the backend holds no data yet,
+// the store returned by seed is persisted as the initial snapshot.
+func OpenStore(backend Backend, seed func() *Store) (*Store, error) {
+	store := &Store{
+		employees:   make(map[string]*Employee),
+		departments: make(map[string]*Department),
+		salaries:    make(map[string]*Salary),
+	}
+
+	loaded, err := backend.Load(store)
+	if err != nil {
+		return nil, err
+	}
+	if !loaded {
+		store = seed()
+		if err := backend.Compact(store, backend.LogSize()); err != nil {
+			return nil, fmt.Errorf("write initial snapshot: %w", err)
+		}
+	} else {
+		store.rebuildIndexes()
+	}
+
+	store.backend = backend
+	return store, nil
+}
+
+// logMutations appends mutations to the backend, if one is configured.
+// Must be called with s.mu held for writing.
+func (s *Store) logMutations(mutations ...Mutation) error {
+	if s.backend == nil || len(mutations) == 0 {
+		return nil
+	}
+	if err := s.backend.Append(mutations...); err != nil {
+		return fmt.Errorf("persist change: %w", err)
+	}
+	return nil
+}
+
+// Compact snapshots the store through its backend and resets the write log.
+// The store is only locked while its maps are copied, so neither readers nor
+// writers wait for the snapshot to be serialized.
+func (s *Store) Compact() error {
+	if s.backend == nil {
+		return nil
+	}
+	s.mu.RLock()
+	view := s.snapshotView()
+	// Appends happen under the write lock, so this offset matches the view
+	logOffset := s.backend.LogSize()
+	s.mu.RUnlock()
+	return s.backend.Compact(view, logOffset)
+}
+
+// snapshotView returns a store sharing s's records but not its maps.
+// Records are replaced rather than modified in place, so the view stays
+// consistent after the lock is released. Must be called with s.mu held.
+func (s *Store) snapshotView() *Store {
+	return &Store{
+		employees:   maps.Clone(s.employees),
+		departments: maps.Clone(s.departments),
+		salaries:    maps.Clone(s.salaries),
+	}
+}
+
+// StartCompaction compacts the store in the background every interval, or
+// sooner once the write log grows beyond maxLogBytes. It returns a function
+// that stops the background goroutine, waiting for a running compaction.
+func (s *Store) StartCompaction(interval time.Duration, maxLogBytes int64) func() {
+	if s.backend == nil {
+		return func() {}
+	}
+
+	const checkEvery = 5 * time.Second
+	stop := make(chan struct{})
+	done := make(chan struct{})
+	go func() {
+		defer close(done)
+		ticker := time.NewTicker(checkEvery)
+		defer ticker.Stop()
+		last := time.Now()
+
+		for {
+			select {
+			case <-stop:
+				return
+			case <-ticker.C:
+				size := s.backend.LogSize()
+				if size == 0 || (size < maxLogBytes && time.Since(last) < interval) {
+					continue
+				}
+				start := time.Now()
+				if err := s.Compact(); err != nil {
+					log.Printf("[STORE] Compaction failed: %v", err)
+					continue
+				}
+				last = time.Now()
+				log.Printf("[STORE] Compacted %d-byte write log into snapshot (%v)", size, time.Since(start))
+			}
+		}
+	}()
+	return func() {
+		close(stop)
+		<-done
+	}
+}
+
+// Close releases the store's backend
+func (s *Store) Close() error {
+	if s.backend == nil {
+		return nil
+	}
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	return s.backend.Close()
+}
@@ -0,0 +1,133 @@
+package data
+
+import (
+	"fmt"
+	"math/rand"
+	"strings"
+)
+
+// GenerateOptions controls synthetic dataset generation
+type GenerateOptions struct {
+	Employees   int   // Number of employees to generate
+	Departments int   // Number of departments (defaults to max(4, Employees/250))
+	Seed        int64 // Random seed; the same seed always yields the same dataset
+}
+
+var (
+	generatedFirstNames = []string{
+		"Sarah", "Marcus", "Priya", "James", "Emma", "David", "Lisa", "Robert",
+		"Jennifer", "Michael", "Aisha", "Carlos", "Mei", "Olivia", "Noah", "Fatima",
+		"Liam", "Sofia", "Ethan", "Yuki", "Hannah", "Omar", "Grace", "Diego",
+	}
+	generatedLastNames = []string{
+		"Chen", "Johnson", "Patel", "Lee", "Wilson", "Park", "Martinez", "Taylor",
+		"Adams", "Brown", "Khan", "Garcia", "Wang", "Smith", "Nguyen", "Ali",
+		"Kim", "Rossi", "Müller", "Tanaka", "Cohen", "Haddad", "Okafor", "Silva",
+	}
+	generatedLocations = []string{
+		"San Francisco", "New York", "Seattle", "Austin", "Chicago",
+		"Boston", "Denver", "London", "Berlin", "Singapore",
+	}
+	generatedDepartmentNames = []string{
+		"Engineering", "Product", "Human Resources", "Sales", "Marketing",
+		"Finance", "Legal", "Support", "Operations", "Design", "Security", "Data",
+	}
+	generatedTitles = []string{
+		"Associate", "Specialist", "Senior Specialist", "Lead", "Manager", "Senior Manager",
+	}
+)
+
+// NewGeneratedStore creates a data store filled with a seeded synthetic
+// dataset instead of the hard-coded mock data
+func NewGeneratedStore(opts GenerateOptions) *Store {
+	store := &Store{
+		employees:   make(map[string]*Employee, opts.Employees),
+		departments: make(map[string]*Department),
+		salaries:    make(map[string]*Salary, opts.Employees),
+	}
+	store.loadGeneratedData(opts)
+	store.rebuildIndexes()
+	return store
+}
+
+// loadGeneratedData fills the store with a synthetic organization: each
+// department has a head, every other employee reports to an earlier
+// employee of the same department, and salaries scale with seniority.
+func (s *Store) loadGeneratedData(opts GenerateOptions) {
+	rng := rand.New(rand.NewSource(opts.Seed))
+
+	numDepts := opts.Departments
+	if numDepts <= 0 {
+		numDepts = opts.Employees / 250
+		if numDepts < 4 {
+			numDepts = 4
+		}
+	}
+	if numDepts > opts.Employees && opts.Employees > 0 {
+		numDepts = opts.Employees
+	}
+
+	idWidth := len(fmt.Sprint(opts.Employees))
+	if idWidth < 3 {
+		idWidth = 3
+	}
+	employeeID := func(n int) string {
+		return fmt.Sprintf("emp-%0*d", idWidth, n)
+	}
+
+	type deptInfo struct {
+		dept    *Department
+		members []string
+	}
+	depts := make([]*deptInfo, numDepts)
+	for i := range depts {
+		name := generatedDepartmentNames[i%len(generatedDepartmentNames)]
+		if i >= len(generatedDepartmentNames) {
+			name = fmt.Sprintf("%s %d", name, i/len(generatedDepartmentNames)+1)
+		}
+		id := "dept-" + strings.ToLower(strings.ReplaceAll(name, " ", "-"))
+		dept := &Department{ID: id, Name: name}
+		s.departments[id] = dept
+		depts[i] = &deptInfo{dept: dept}
+	}
+
+	for n := 1; n <= opts.Employees; n++ {
+		d := depts[(n-1)%numDepts]
+		first := generatedFirstNames[rng.Intn(len(generatedFirstNames))]
+		last := generatedLastNames[rng.Intn(len(generatedLastNames))]
+		id := employeeID(n)
+
+		emp := &Employee{
+			ID:         id,
+			Name:       first + " " + last,
+			Email:      fmt.Sprintf("%s.%s.%d@corp.com", strings.ToLower(first), strings.ToLower(last), n),
+			Department: d.dept.Name,
+			StartDate:  fmt.Sprintf("%d-%02d-%02d", 2010+rng.Intn(15), 1+rng.Intn(12), 1+rng.Intn(28)),
+			Location:   generatedLocations[rng.Intn(len(generatedLocations))],
+		}
+
+		var level int
+		if len(d.members) == 0 {
+			// First member heads the department
+			emp.Title = "VP " + d.dept.Name
+			d.dept.HeadID = id
+			level = len(generatedTitles) + 1
+		} else {
+			// Report to a random earlier member, which keeps the tree acyclic
+			emp.ManagerID = d.members[rng.Intn(len(d.members))]
+			level = rng.Intn(len(generatedTitles))
+			emp.Title = generatedTitles[level] + ", " + d.dept.Name
+		}
+		d.members = append(d.members, id)
+		s.employees[id] = emp
+
+		base := int64(70000+level*25000) + rng.Int63n(30000)
+		s.salaries[id] = &Salary{
+			EmployeeID: id,
+			Base:       base,
+			Bonus:      base / 10 * rng.Int63n(4),
+			Equity:     base / 5 * rng.Int63n(3),
+		}
+		d.dept.Budget += base
+	}
+}
@@ -0,0 +1,191 @@
+package data
+
+import "sort"
+
+// Secondary indexes over the store's collections. Every helper in this file
+// must be called with s.mu held for writing, except the view accessors which
+// need at least a read lock.
+
+// EmployeeSalary joins an employee with their salary record
+type EmployeeSalary struct {
+	Employee *Employee
+	Salary   *Salary
+}
+
+// insertID inserts id into a sorted slice of IDs
+func insertID(ids []string, id string) []string {
+	i := sort.SearchStrings(ids, id)
+	if i < len(ids) && ids[i] == id {
+		return ids
+	}
+	ids = append(ids, "")
+	copy(ids[i+1:], ids[i:])
+	ids[i] = id
+	return ids
+}
+
+// removeID removes id from a sorted slice of IDs
+func removeID(ids []string, id string) []string {
+	i := sort.SearchStrings(ids, id)
+	if i < len(ids) && ids[i] == id {
+		return append(ids[:i], ids[i+1:]...)
+	}
+	return ids
+}
+
+// salaryBefore reports whether salary a sorts before salary b: highest base
+// first, ties broken by employee ID
+func salaryBefore(a, b *Salary) bool {
+	if a.Base != b.Base {
+		return a.Base > b.Base
+	}
+	return a.EmployeeID < b.EmployeeID
+}
+
+// salaryPosition returns the index in salaryOrder at which sal belongs
+func (s *Store) salaryPosition(sal *Salary) int {
+	return sort.Search(len(s.salaryOrder), func(i int) bool {
+		return !salaryBefore(s.salaries[s.salaryOrder[i]], sal)
+	})
+}
+
+// indexEmployee adds an employee to the department and manager indexes
+func (s *Store) indexEmployee(emp *Employee) {
+	s.byDepartment[emp.Department] = insertID(s.byDepartment[emp.Department], emp.ID)
+	if emp.ManagerID != "" {
+		s.byManager[emp.ManagerID] = insertID(s.byManager[emp.ManagerID], emp.ID)
+	}
+}
+
+// unindexEmployee removes an employee from the department and manager indexes
+func (s *Store) unindexEmployee(emp *Employee) {
+	if ids := removeID(s.byDepartment[emp.Department], emp.ID); len(ids) > 0 {
+		s.byDepartment[emp.Department] = ids
+	} else {
+		delete(s.byDepartment, emp.Department)
+	}
+	if emp.ManagerID != "" {
+		if ids := removeID(s.byManager[emp.ManagerID], emp.ID); len(ids) > 0 {
+			s.byManager[emp.ManagerID] = ids
+		} else {
+			delete(s.byManager, emp.ManagerID)
+		}
+	}
+}
+
+// replaceEmployee swaps in a new employee record, keeping indexes current
+func (s *Store) replaceEmployee(emp *Employee) {
+	if old, ok := s.employees[emp.ID]; ok {
+		s.unindexEmployee(old)
+	}
+	s.employees[emp.ID] = emp
+	s.indexEmployee(emp)
+	s.employeesVersion = s.recordChange(CollectionEmployees, emp.ID)
+}
+
+// replaceSalary swaps in a new salary record, keeping the salary order current.
+// The old record must still be in s.salaries when its position is looked up.
+func (s *Store) replaceSalary(sal *Salary) {
+	if old, ok := s.salaries[sal.EmployeeID]; ok {
+		i := s.salaryPosition(old)
+		if i < len(s.salaryOrder) && s.salaryOrder[i] == old.EmployeeID {
+			s.salaryOrder = append(s.salaryOrder[:i], s.salaryOrder[i+1:]...)
+		}
+	}
+	s.salaries[sal.EmployeeID] = sal
+
+	i := s.salaryPosition(sal)
+	s.salaryOrder = append(s.salaryOrder, "")
+	copy(s.salaryOrder[i+1:], s.salaryOrder[i:])
+	s.salaryOrder[i] = sal.EmployeeID
+	s.salariesVersion = s.recordChange(CollectionSalaries, sal.EmployeeID)
+}
+
+// rebuildIndexes recomputes every index from scratch (used after bulk loads)
+func (s *Store) rebuildIndexes() {
+	s.byDepartment = make(map[string][]string)
+	s.byManager = make(map[string][]string)
+	for _, emp := range s.employees {
+		s.byDepartment[emp.Department] = append(s.byDepartment[emp.Department], emp.ID)
+		if emp.ManagerID != "" {
+			s.byManager[emp.ManagerID] = append(s.byManager[emp.ManagerID], emp.ID)
+		}
+	}
+	for _, ids := range s.byDepartment {
+		sort.Strings(ids)
+	}
+	for _, ids := range s.byManager {
+		sort.Strings(ids)
+	}
+
+	// Sort the records themselves; looking them up by ID inside the
+	// comparator dominates load time at large headcounts
+	sals := make([]*Salary, 0, len(s.salaries))
+	for _, sal := range s.salaries {
+		sals = append(sals, sal)
+	}
+	sort.Slice(sals, func(i, j int) bool {
+		return salaryBefore(sals[i], sals[j])
+	})
+	s.salaryOrder = make([]string, len(sals))
+	for i, sal := range sals {
+		s.salaryOrder[i] = sal.EmployeeID
+	}
+
+	s.resetVersions()
+}
+
+// employeesFor resolves a slice of employee IDs to records
+func (s *Store) employeesFor(ids []string) []*Employee {
+	emps := make([]*Employee, 0, len(ids))
+	for _, id := range ids {
+		if emp, ok := s.employees[id]; ok {
+			emps = append(emps, emp)
+		}
+	}
+	return emps
+}
+
+// departmentView returns employees grouped by department, rebuilding the
+// cached view only when the employee collection has changed since it was
+// built. Callers must hold s.mu for reading and must not modify the result.
+func (s *Store) departmentView() map[string][]*Employee {
+	s.viewMu.Lock()
+	defer s.viewMu.Unlock()
+
+	if s.deptView == nil || s.deptViewVersion != s.employeesVersion {
+		view := make(map[string][]*Employee, len(s.byDepartment))
+		for dept, ids := range s.byDepartment {
+			view[dept] = s.employeesFor(ids)
+		}
+		s.deptView = view
+		s.deptViewVersion = s.employeesVersion
+	}
+	return s.deptView
+}
+
+// orgChartView returns the cached org chart, rebuilding it only when
+// employees or departments have changed since it was built. Callers must hold
+// s.mu for reading and must not modify the result.
+func (s *Store) orgChartView() map[string]interface{} {
+	empByDept := s.departmentView()
+
+	s.viewMu.Lock()
+	defer s.viewMu.Unlock()
+
+	if s.orgChart == nil ||
+		s.orgChartEmployeesVersion != s.employeesVersion ||
+		s.orgChartDepartmentsVersion != s.departmentsVersion {
+		depts := make(map[string]*Department, len(s.departments))
+		for id, dept := range s.departments {
+			depts[id] = dept
+		}
+		s.orgChart = map[string]interface{}{
+			"departments":             depts,
+			"employees_by_department": empByDept,
+		}
+		s.orgChartEmployeesVersion = s.employeesVersion
+		s.orgChartDepartmentsVersion = s.departmentsVersion
+	}
+	return s.orgChart
+}
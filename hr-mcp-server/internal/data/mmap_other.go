@@ -0,0 +1,15 @@
+//go:build !unix
+
+package data
+
+import "os"
+
+// mapFile reads a whole file into memory on platforms without mmap support
+func mapFile(path string) ([]byte, error) {
+	return os.ReadFile(path)
+}
+
+// syncDir is a no-op where directories cannot be opened for syncing
+func syncDir(dir string) error {
+	return nil
+}
@@ -33,12 +33,73 @@ type Salary struct {
 	Equity     int64  `json:"equity"`
 }
 
-// Store provides access to mock HR data
+// EmployeeUpdate describes a partial update to an employee record.
+// Nil fields are left unchanged.
+type EmployeeUpdate struct {
+	EmployeeID string  `json:"employee_id"`
+	Title      *string `json:"title,omitempty"`
+	Location   *string `json:"location,omitempty"`
+}
+
+// SalaryUpdate describes a partial update to a salary record.
+// Nil fields are left unchanged.
+type SalaryUpdate struct {
+	EmployeeID string `json:"employee_id"`
+	Base       *int64 `json:"base,omitempty"`
+	Bonus      *int64 `json:"bonus,omitempty"`
+	Equity     *int64 `json:"equity,omitempty"`
+}
+
+// UpdateResult reports the outcome of one row of a bulk update
+type UpdateResult struct {
+	EmployeeID string      `json:"employee_id"`
+	Success    bool        `json:"success"`
+	Error      string      `json:"error,omitempty"`
+	Record     interface{} `json:"record,omitempty"`
+}
+
+// errBatchRejected is reported for valid rows of a bulk update that was not
+// applied because another row failed
+const errBatchRejected = "not applied: another row in the batch failed"
+
+// Store provides access to mock HR data.
+//
+// Records are treated as immutable once stored: writes replace the pointer
+// instead of mutating it, so records returned by read methods stay valid and
+// secondary indexes never go stale behind the store's back.
 type Store struct {
 	employees   map[string]*Employee
 	departments map[string]*Department
 	salaries    map[string]*Salary
 	mu          sync.RWMutex
+
+	// Secondary indexes, updated incrementally on every write
+	byDepartment map[string][]string // department name -> sorted employee IDs
+	byManager    map[string][]string // manager ID -> sorted employee IDs
+	salaryOrder  []string            // employee IDs by base salary, highest first
+
+	// Change versions (see versions.go): the change sequence, the version
+	// of the last load, per-record and per-collection versions of later
+	// writes, and the recent change feed
+	version            uint64
+	loadVersion        uint64
+	employeeVersions   map[string]uint64
+	salaryVersions     map[string]uint64
+	employeesVersion   uint64
+	departmentsVersion uint64
+	salariesVersion    uint64
+	changes            changeLog
+
+	// Derived views, rebuilt lazily when their source versions change
+	viewMu                     sync.Mutex
+	deptView                   map[string][]*Employee
+	deptViewVersion            uint64
+	orgChart                   map[string]interface{}
+	orgChartEmployeesVersion   uint64
+	orgChartDepartmentsVersion uint64
+
+	// Optional persistence; nil keeps the store purely in memory
+	backend Backend
 }
 
 // NewStore creates a new data store with mock data
@@ -49,6 +110,7 @@ func NewStore() *Store {
 		salaries:    make(map[string]*Salary),
 	}
 	store.loadMockData()
+	store.rebuildIndexes()
 	return store
 }
 
@@ -222,10 +284,73 @@ func (s *Store) UpdateEmployee(emp *Employee) error {
 	if _, ok := s.employees[emp.ID]; !ok {
 		return fmt.Errorf("employee not found: %s", emp.ID)
 	}
-	s.employees[emp.ID] = emp
+	if err := s.logMutations(Mutation{Employee: emp}); err != nil {
+		return err
+	}
+	s.replaceEmployee(emp)
 	return nil
 }
 
+// UpdateEmployees applies a batch of employee updates atomically under a
+// single lock acquisition. Either every row is applied or none is; the
+// returned bool reports which. Rows are applied in order, so several updates
+// to the same employee compose.
+func (s *Store) UpdateEmployees(updates []EmployeeUpdate) ([]UpdateResult, bool) {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	results := make([]UpdateResult, len(updates))
+	staged := make(map[string]*Employee, len(updates))
+	ok := true
+
+	for i, upd := range updates {
+		results[i].EmployeeID = upd.EmployeeID
+
+		emp, found := staged[upd.EmployeeID]
+		if !found {
+			current, exists := s.employees[upd.EmployeeID]
+			if !exists {
+				results[i].Error = fmt.Sprintf("employee not found: %s", upd.EmployeeID)
+				ok = false
+				continue
+			}
+			copied := *current
+			emp = &copied
+			staged[upd.EmployeeID] = emp
+		}
+
+		if upd.Title != nil {
+			emp.Title = *upd.Title
+		}
+		if upd.Location != nil {
+			emp.Location = *upd.Location
+		}
+
+		snapshot := *emp
+		results[i].Success = true
+		results[i].Record = &snapshot
+	}
+
+	if !ok {
+		rejectValidRows(results)
+		return results, false
+	}
+
+	mutations := make([]Mutation, 0, len(staged))
+	for _, emp := range staged {
+		mutations = append(mutations, Mutation{Employee: emp})
+	}
+	if err := s.logMutations(mutations...); err != nil {
+		failAllRows(results, err)
+		return results, false
+	}
+
+	for _, emp := range staged {
+		s.replaceEmployee(emp)
+	}
+	return results, true
+}
+
 // ListEmployees returns all employees
 func (s *Store) ListEmployees() []*Employee {
 	s.mu.RLock()
@@ -270,25 +395,159 @@ func (s *Store) UpdateSalary(sal *Salary) error {
 	if _, ok := s.salaries[sal.EmployeeID]; !ok {
 		return fmt.Errorf("salary not found for employee: %s", sal.EmployeeID)
 	}
-	s.salaries[sal.EmployeeID] = sal
+	if err := s.logMutations(Mutation{Salary: sal}); err != nil {
+		return err
+	}
+	s.replaceSalary(sal)
 	return nil
 }
 
-// GetOrgChart returns organizational structure
+// UpdateSalaries applies a batch of salary updates atomically under a single
+// lock acquisition. Either every row is applied or none is; the returned bool
+// reports which.
+func (s *Store) UpdateSalaries(updates []SalaryUpdate) ([]UpdateResult, bool) {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+
+	results := make([]UpdateResult, len(updates))
+	staged := make(map[string]*Salary, len(updates))
+	ok := true
+
+	for i, upd := range updates {
+		results[i].EmployeeID = upd.EmployeeID
+
+		sal, found := staged[upd.EmployeeID]
+		if !found {
+			current, exists := s.salaries[upd.EmployeeID]
+			if !exists {
+				results[i].Error = fmt.Sprintf("salary not found for employee: %s", upd.EmployeeID)
+				ok = false
+				continue
+			}
+			copied := *current
+			sal = &copied
+			staged[upd.EmployeeID] = sal
+		}
+
+		if upd.Base != nil {
+			sal.Base = *upd.Base
+		}
+		if upd.Bonus != nil {
+			sal.Bonus = *upd.Bonus
+		}
+		if upd.Equity != nil {
+			sal.Equity = *upd.Equity
+		}
+		if sal.Base < 0 || sal.Bonus < 0 || sal.Equity < 0 {
+			results[i].Error = "salary components must not be negative"
+			ok = false
+			continue
+		}
+
+		snapshot := *sal
+		results[i].Success = true
+		results[i].Record = &snapshot
+	}
+
+	if !ok {
+		rejectValidRows(results)
+		return results, false
+	}
+
+	mutations := make([]Mutation, 0, len(staged))
+	for _, sal := range staged {
+		mutations = append(mutations, Mutation{Salary: sal})
+	}
+	if err := s.logMutations(mutations...); err != nil {
+		failAllRows(results, err)
+		return results, false
+	}
+
+	for _, sal := range staged {
+		s.replaceSalary(sal)
+	}
+	return results, true
+}
+
+// rejectValidRows marks the successful rows of a failed batch as not applied
+func rejectValidRows(results []UpdateResult) {
+	for i := range results {
+		if results[i].Success {
+			results[i].Success = false
+			results[i].Error = errBatchRejected
+			results[i].Record = nil
+		}
+	}
+}
+
+// failAllRows marks every row of a batch as failed with the same error
+func failAllRows(results []UpdateResult, err error) {
+	for i := range results {
+		results[i].Success = false
+		results[i].Error = err.Error()
+		results[i].Record = nil
+	}
+}
+
+// GetOrgChart returns organizational structure. The result is a shared,
+// cached view and must not be modified.
 func (s *Store) GetOrgChart() map[string]interface{} {
 	s.mu.RLock()
 	defer s.mu.RUnlock()
 
-	// Build a simple org chart structure
-	orgChart := make(map[string]interface{})
-	orgChart["departments"] = s.departments
+	return s.orgChartView()
+}
 
-	// Group employees by department
-	empByDept := make(map[string][]*Employee)
-	for _, emp := range s.employees {
-		empByDept[emp.Department] = append(empByDept[emp.Department], emp)
+// ListEmployeesByDepartment returns all employees grouped by department name,
+// each group sorted by employee ID. The result is a shared, cached view and
+// must not be modified.
+func (s *Store) ListEmployeesByDepartment() map[string][]*Employee {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	return s.departmentView()
+}
+
+// ListEmployeesInDepartment returns the employees of one department, sorted
+// by employee ID
+func (s *Store) ListEmployeesInDepartment(department string) []*Employee {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	return s.employeesFor(s.byDepartment[department])
+}
+
+// ListDirectReports returns the employees reporting to a manager, sorted by
+// employee ID
+func (s *Store) ListDirectReports(managerID string) []*Employee {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	return s.employeesFor(s.byManager[managerID])
+}
+
+// ListEmployeesWithSalaries returns employees joined with their salaries,
+// ordered by base salary (highest first). A limit of 0 or less returns all.
+// Employees without salary data are omitted.
+func (s *Store) ListEmployeesWithSalaries(limit int) []EmployeeSalary {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	n := len(s.salaryOrder)
+	if limit > 0 && limit < n {
+		n = limit
 	}
-	orgChart["employees_by_department"] = empByDept
 
-	return orgChart
+	result := make([]EmployeeSalary, 0, n)
+	for _, id := range s.salaryOrder {
+		if len(result) == n {
+			break
+		}
+		emp, ok := s.employees[id]
+		if !ok {
+			continue
+		}
+		result = append(result, EmployeeSalary{Employee: emp, Salary: s.salaries[id]})
+	}
+	return result
 }
@@ -0,0 +1,455 @@
+package data
+
+import (
+	"bufio"
+	"bytes"
+	"encoding/binary"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"hash/crc32"
+	"io"
+	"log"
+	"os"
+	"path/filepath"
+	"sync"
+	"unsafe"
+)
+
+// Snapshot file layout (all integers are varints):
+//
+//	"HRSNAP01"
+//	count departments, count employees, count salaries
+//	departments: ID, Name, HeadID (strings), Budget
+//	employees:   ID, Name, Email, Title, Department, ManagerID, StartDate, Location
+//	salaries:    EmployeeID (string), Base, Bonus, Equity
+//	CRC-32C of everything above (4 bytes, little endian)
+//
+// Strings are a uvarint length followed by the bytes. Loaded records point
+// straight into the memory-mapped file, so strings are never copied.
+
+const (
+	snapshotMagic = "HRSNAP01"
+	snapshotFile  = "store.snap"
+	logFile       = "store.wal"
+)
+
+var crcTable = crc32.MakeTable(crc32.Castagnoli)
+
+// FileBackend keeps a memory-mapped snapshot plus an append-only JSON-lines
+// write log in a directory
+type FileBackend struct {
+	dir string
+
+	compactMu sync.Mutex // Serializes compactions
+	mu        sync.Mutex // Guards the log; held by Append
+	log       *os.File
+	logSize   int64
+	mappings  [][]byte // Snapshots referenced by loaded records; never unmapped
+}
+
+// OpenFileBackend opens (creating if needed) a snapshot directory
+func OpenFileBackend(dir string) (*FileBackend, error) {
+	if err := os.MkdirAll(dir, 0o755); err != nil {
+		return nil, fmt.Errorf("create data dir: %w", err)
+	}
+	return &FileBackend{dir: dir}, nil
+}
+
+// Load maps the snapshot and replays the write log on top of it
+func (b *FileBackend) Load(s *Store) (bool, error) {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+
+	snapPath := filepath.Join(b.dir, snapshotFile)
+	data, err := mapFile(snapPath)
+	if errors.Is(err, os.ErrNotExist) {
+		return false, b.openLog(true)
+	}
+	if err != nil {
+		return false, fmt.Errorf("map snapshot: %w", err)
+	}
+	b.mappings = append(b.mappings, data)
+
+	if err := decodeSnapshot(data, s); err != nil {
+		return false, fmt.Errorf("decode snapshot %s: %w", snapPath, err)
+	}
+	if err := b.replayLog(s); err != nil {
+		return false, err
+	}
+	return true, b.openLog(false)
+}
+
+// replayLog applies every complete write-log entry to the store. A torn
+// final entry (from a crash mid-append) is discarded and cut off the log.
+func (b *FileBackend) replayLog(s *Store) error {
+	path := filepath.Join(b.dir, logFile)
+	f, err := os.Open(path)
+	if errors.Is(err, os.ErrNotExist) {
+		return nil
+	}
+	if err != nil {
+		return fmt.Errorf("open write log: %w", err)
+	}
+	defer f.Close()
+
+	reader := bufio.NewReaderSize(f, 1<<20)
+	var valid int64
+	for {
+		line, err := reader.ReadBytes('\n')
+		if err == io.EOF {
+			break
+		}
+		if err != nil {
+			return fmt.Errorf("read write log: %w", err)
+		}
+		var m Mutation
+		err = json.Unmarshal(line, &m)
+		if err == nil {
+			err = m.apply(s)
+		}
+		if err != nil {
+			// A bad last entry is a torn append (the file grew before its
+			// data reached disk); anywhere else the log is corrupt
+			if _, peekErr := reader.Peek(1); peekErr == io.EOF {
+				log.Printf("[STORE] Discarding torn write log entry at byte %d: %v", valid, err)
+				break
+			}
+			return fmt.Errorf("corrupt write log entry at byte %d: %w", valid, err)
+		}
+		valid += int64(len(line))
+	}
+
+	if info, err := f.Stat(); err == nil && info.Size() > valid {
+		if err := os.Truncate(path, valid); err != nil {
+			return fmt.Errorf("truncate torn write log: %w", err)
+		}
+	}
+	return nil
+}
+
+// openLog opens the write log for appending, optionally truncating it
+func (b *FileBackend) openLog(truncate bool) error {
+	flags := os.O_CREATE | os.O_WRONLY | os.O_APPEND
+	if truncate {
+		flags |= os.O_TRUNC
+	}
+	f, err := os.OpenFile(filepath.Join(b.dir, logFile), flags, 0o644)
+	if err != nil {
+		return fmt.Errorf("open write log: %w", err)
+	}
+	info, err := f.Stat()
+	if err != nil {
+		f.Close()
+		return err
+	}
+	if b.log != nil {
+		b.log.Close()
+	}
+	b.log = f
+	b.logSize = info.Size()
+	return nil
+}
+
+// Append writes mutations to the log and syncs it once for the whole batch
+func (b *FileBackend) Append(mutations ...Mutation) error {
+	var buf bytes.Buffer
+	enc := json.NewEncoder(&buf)
+	for _, m := range mutations {
+		if err := enc.Encode(m); err != nil {
+			return err
+		}
+	}
+
+	b.mu.Lock()
+	defer b.mu.Unlock()
+
+	if b.log == nil {
+		return fmt.Errorf("write log is not open")
+	}
+	n, err := b.log.Write(buf.Bytes())
+	b.logSize += int64(n)
+	if err != nil {
+		return err
+	}
+	return b.log.Sync()
+}
+
+// LogSize returns the number of bytes in the write log
+func (b *FileBackend) LogSize() int64 {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	return b.logSize
+}
+
+// Compact atomically replaces the snapshot with view and drops the log
+// entries before logOffset, keeping those appended while it ran. The
+// snapshot is serialized without holding b.mu, so appends are not blocked.
+func (b *FileBackend) Compact(view *Store, logOffset int64) error {
+	b.compactMu.Lock()
+	defer b.compactMu.Unlock()
+
+	tmp, err := os.CreateTemp(b.dir, snapshotFile+".*")
+	if err != nil {
+		return fmt.Errorf("create snapshot: %w", err)
+	}
+	defer os.Remove(tmp.Name())
+
+	w := bufio.NewWriterSize(tmp, 1<<20)
+	if err := encodeSnapshot(w, view); err != nil {
+		tmp.Close()
+		return fmt.Errorf("write snapshot: %w", err)
+	}
+	if err := w.Flush(); err != nil {
+		tmp.Close()
+		return err
+	}
+	if err := tmp.Sync(); err != nil {
+		tmp.Close()
+		return err
+	}
+	if err := tmp.Close(); err != nil {
+		return err
+	}
+
+	b.mu.Lock()
+	defer b.mu.Unlock()
+
+	if err := os.Rename(tmp.Name(), filepath.Join(b.dir, snapshotFile)); err != nil {
+		return fmt.Errorf("install snapshot: %w", err)
+	}
+	// The rename must be durable before the log loses entries. Should the
+	// log trim below not complete, replaying the whole old log over the new
+	// snapshot is harmless: entries are full records, applied in order.
+	if err := syncDir(b.dir); err != nil {
+		return fmt.Errorf("sync data dir: %w", err)
+	}
+	return b.trimLog(logOffset)
+}
+
+// trimLog drops the first offset bytes of the write log. Must be called
+// with b.mu held.
+func (b *FileBackend) trimLog(offset int64) error {
+	if offset >= b.logSize {
+		return b.openLog(true)
+	}
+
+	path := filepath.Join(b.dir, logFile)
+	src, err := os.Open(path)
+	if err != nil {
+		return fmt.Errorf("open write log: %w", err)
+	}
+	defer src.Close()
+
+	tmp, err := os.CreateTemp(b.dir, logFile+".*")
+	if err != nil {
+		return fmt.Errorf("create write log: %w", err)
+	}
+	defer os.Remove(tmp.Name())
+
+	if _, err := io.Copy(tmp, io.NewSectionReader(src, offset, b.logSize-offset)); err != nil {
+		tmp.Close()
+		return fmt.Errorf("copy write log: %w", err)
+	}
+	if err := tmp.Sync(); err != nil {
+		tmp.Close()
+		return err
+	}
+	if err := tmp.Close(); err != nil {
+		return err
+	}
+	if err := os.Rename(tmp.Name(), path); err != nil {
+		return fmt.Errorf("install write log: %w", err)
+	}
+	if err := syncDir(b.dir); err != nil {
+		return fmt.Errorf("sync data dir: %w", err)
+	}
+	return b.openLog(false)
+}
+
+// Close closes the write log. Mapped snapshots stay mapped because loaded
+// records still reference their memory.
+func (b *FileBackend) Close() error {
+	b.mu.Lock()
+	defer b.mu.Unlock()
+	if b.log == nil {
+		return nil
+	}
+	err := b.log.Close()
+	b.log = nil
+	return err
+}
+
+// snapshotWriter encodes snapshot fields while tracking the checksum
+type snapshotWriter struct {
+	w   io.Writer
+	crc uint32
+	buf [binary.MaxVarintLen64]byte
+	err error
+}
+
+func (sw *snapshotWriter) write(p []byte) {
+	if sw.err != nil {
+		return
+	}
+	sw.crc = crc32.Update(sw.crc, crcTable, p)
+	_, sw.err = sw.w.Write(p)
+}
+
+func (sw *snapshotWriter) uvarint(v uint64) {
+	n := binary.PutUvarint(sw.buf[:], v)
+	sw.write(sw.buf[:n])
+}
+
+func (sw *snapshotWriter) varint(v int64) {
+	n := binary.PutVarint(sw.buf[:], v)
+	sw.write(sw.buf[:n])
+}
+
+func (sw *snapshotWriter) str(v string) {
+	sw.uvarint(uint64(len(v)))
+	sw.write([]byte(v))
+}
+
+func encodeSnapshot(w io.Writer, s *Store) error {
+	sw := &snapshotWriter{w: w}
+	sw.write([]byte(snapshotMagic))
+	sw.uvarint(uint64(len(s.departments)))
+	sw.uvarint(uint64(len(s.employees)))
+	sw.uvarint(uint64(len(s.salaries)))
+
+	for _, d := range s.departments {
+		sw.str(d.ID)
+		sw.str(d.Name)
+		sw.str(d.HeadID)
+		sw.varint(d.Budget)
+	}
+	for _, e := range s.employees {
+		sw.str(e.ID)
+		sw.str(e.Name)
+		sw.str(e.Email)
+		sw.str(e.Title)
+		sw.str(e.Department)
+		sw.str(e.ManagerID)
+		sw.str(e.StartDate)
+		sw.str(e.Location)
+	}
+	for _, sal := range s.salaries {
+		sw.str(sal.EmployeeID)
+		sw.varint(sal.Base)
+		sw.varint(sal.Bonus)
+		sw.varint(sal.Equity)
+	}
+	if sw.err != nil {
+		return sw.err
+	}
+
+	var trailer [4]byte
+	binary.LittleEndian.PutUint32(trailer[:], sw.crc)
+	_, err := w.Write(trailer[:])
+	return err
+}
+
+// snapshotReader decodes fields from a mapped snapshot
+type snapshotReader struct {
+	data []byte
+	pos  int
+	err  error
+}
+
+func (sr *snapshotReader) uvarint() uint64 {
+	if sr.err != nil {
+		return 0
+	}
+	v, n := binary.Uvarint(sr.data[sr.pos:])
+	if n <= 0 {
+		sr.err = fmt.Errorf("bad varint at offset %d", sr.pos)
+		return 0
+	}
+	sr.pos += n
+	return v
+}
+
+func (sr *snapshotReader) varint() int64 {
+	if sr.err != nil {
+		return 0
+	}
+	v, n := binary.Varint(sr.data[sr.pos:])
+	if n <= 0 {
+		sr.err = fmt.Errorf("bad varint at offset %d", sr.pos)
+		return 0
+	}
+	sr.pos += n
+	return v
+}
+
+// str returns a string that aliases the mapped bytes (no copy)
+func (sr *snapshotReader) str() string {
+	n := int(sr.uvarint())
+	if sr.err != nil {
+		return ""
+	}
+	if n < 0 || sr.pos+n > len(sr.data) {
+		sr.err = fmt.Errorf("string overruns snapshot at offset %d", sr.pos)
+		return ""
+	}
+	if n == 0 {
+		return ""
+	}
+	v := unsafe.String(&sr.data[sr.pos], n)
+	sr.pos += n
+	return v
+}
+
+func decodeSnapshot(data []byte, s *Store) error {
+	if len(data) < len(snapshotMagic)+4 || string(data[:len(snapshotMagic)]) != snapshotMagic {
+		return fmt.Errorf("not a snapshot file")
+	}
+	body := data[:len(data)-4]
+	if crc32.Checksum(body, crcTable) != binary.LittleEndian.Uint32(data[len(data)-4:]) {
+		return fmt.Errorf("checksum mismatch")
+	}
+
+	sr := &snapshotReader{data: body, pos: len(snapshotMagic)}
+	numDepts, numEmps, numSals := sr.uvarint(), sr.uvarint(), sr.uvarint()
+	if sr.err != nil {
+		return sr.err
+	}
+
+	if len(s.departments) == 0 && len(s.employees) == 0 && len(s.salaries) == 0 {
+		s.departments = make(map[string]*Department, numDepts)
+		s.employees = make(map[string]*Employee, numEmps)
+		s.salaries = make(map[string]*Salary, numSals)
+	}
+
+	// Allocate records in slabs: one allocation per collection
+	depts := make([]Department, numDepts)
+	for i := range depts {
+		d := &depts[i]
+		d.ID, d.Name, d.HeadID, d.Budget = sr.str(), sr.str(), sr.str(), sr.varint()
+		s.departments[d.ID] = d
+	}
+
+	emps := make([]Employee, numEmps)
+	for i := range emps {
+		e := &emps[i]
+		e.ID, e.Name, e.Email, e.Title = sr.str(), sr.str(), sr.str(), sr.str()
+		e.Department, e.ManagerID, e.StartDate, e.Location = sr.str(), sr.str(), sr.str(), sr.str()
+		s.employees[e.ID] = e
+	}
+
+	sals := make([]Salary, numSals)
+	for i := range sals {
+		sal := &sals[i]
+		sal.EmployeeID, sal.Base, sal.Bonus, sal.Equity = sr.str(), sr.varint(), sr.varint(), sr.varint()
+		s.salaries[sal.EmployeeID] = sal
+	}
+
+	if sr.err != nil {
+		return sr.err
+	}
+	if sr.pos != len(body) {
+		return fmt.Errorf("%d trailing bytes", len(body)-sr.pos)
+	}
+	return nil
+}
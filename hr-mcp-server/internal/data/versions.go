@@ -0,0 +1,169 @@
+package data
+
+import "time"
+
+// Change versions. Every write advances the store's change sequence and
+// stamps the written record and its collection with the new value, so all
+// versions are comparable: data derived from several records is unchanged as
+// long as the highest of their versions is. Records not written since the
+// store was loaded carry the load version.
+//
+// The sequence starts at the load time in microseconds, so a version handed
+// out by an earlier process is never mistaken for one of this process.
+
+// Collection names used in versions and changes
+const (
+	CollectionEmployees   = "employees"
+	CollectionDepartments = "departments"
+	CollectionSalaries    = "salaries"
+)
+
+// maxChanges is the number of recent changes kept for ChangesSince
+const maxChanges = 4096
+
+// Change is one entry of the change feed: a record written at a version
+type Change struct {
+	Version    uint64 `json:"version"`
+	Collection string `json:"collection"`
+	ID         string `json:"id"`
+}
+
+// changeLog is a ring buffer of the most recent changes, oldest first
+type changeLog struct {
+	entries [maxChanges]Change
+	start   int
+	size    int
+}
+
+func (l *changeLog) add(c Change) {
+	if l.size < maxChanges {
+		l.entries[(l.start+l.size)%maxChanges] = c
+		l.size++
+		return
+	}
+	l.entries[l.start] = c
+	l.start = (l.start + 1) % maxChanges
+}
+
+func (l *changeLog) at(i int) Change {
+	return l.entries[(l.start+i)%maxChanges]
+}
+
+// nextVersion advances the change sequence. Must be called with s.mu held
+// for writing.
+func (s *Store) nextVersion() uint64 {
+	if s.version == 0 {
+		s.version = uint64(time.Now().UnixMicro())
+	}
+	s.version++
+	return s.version
+}
+
+// recordChange stamps a written record with a new version. Must be called
+// with s.mu held for writing.
+func (s *Store) recordChange(collection, id string) uint64 {
+	v := s.nextVersion()
+	switch collection {
+	case CollectionEmployees:
+		s.employeeVersions[id] = v
+	case CollectionSalaries:
+		s.salaryVersions[id] = v
+	}
+	s.changes.add(Change{Version: v, Collection: collection, ID: id})
+	return v
+}
+
+// resetVersions starts a new version for every record (after bulk loads).
+// Must be called with s.mu held for writing.
+func (s *Store) resetVersions() {
+	s.loadVersion = s.nextVersion()
+	s.employeeVersions = make(map[string]uint64)
+	s.salaryVersions = make(map[string]uint64)
+	s.changes = changeLog{}
+	s.employeesVersion = s.loadVersion
+	s.departmentsVersion = s.loadVersion
+	s.salariesVersion = s.loadVersion
+}
+
+// Version returns the version of the latest change to the store
+func (s *Store) Version() uint64 {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	return s.version
+}
+
+// EmployeeVersion returns the version of an employee record
+func (s *Store) EmployeeVersion(id string) uint64 {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	if v, ok := s.employeeVersions[id]; ok {
+		return v
+	}
+	return s.loadVersion
+}
+
+// SalaryVersion returns the version of an employee's salary record
+func (s *Store) SalaryVersion(employeeID string) uint64 {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	if v, ok := s.salaryVersions[employeeID]; ok {
+		return v
+	}
+	return s.loadVersion
+}
+
+// CollectionVersion returns the highest version of the named collections
+func (s *Store) CollectionVersion(collections ...string) uint64 {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	var v uint64
+	for _, name := range collections {
+		var cv uint64
+		switch name {
+		case CollectionEmployees:
+			cv = s.employeesVersion
+		case CollectionDepartments:
+			cv = s.departmentsVersion
+		case CollectionSalaries:
+			cv = s.salariesVersion
+		}
+		if cv > v {
+			v = cv
+		}
+	}
+	return v
+}
+
+// ChangesSince returns the changes made after version, oldest first, and the
+// store's current version. complete is false when the change log no longer
+// reaches back to version (or it predates the last load); callers must then
+// treat everything as changed.
+func (s *Store) ChangesSince(version uint64) (changes []Change, latest uint64, complete bool) {
+	s.mu.RLock()
+	defer s.mu.RUnlock()
+
+	latest = s.version
+	changes = []Change{}
+	if version < s.loadVersion {
+		return changes, latest, false
+	}
+	// The oldest kept change must directly follow version for the list to be complete
+	if s.changes.size == maxChanges && s.changes.at(0).Version > version+1 {
+		return changes, latest, false
+	}
+
+	for i := s.changes.size - 1; i >= 0; i-- {
+		if s.changes.at(i).Version <= version {
+			break
+		}
+		changes = append(changes, s.changes.at(i))
+	}
+	for i, j := 0, len(changes)-1; i < j; i, j = i+1, j-1 {
+		changes[i], changes[j] = changes[j], changes[i]
+	}
+	return changes, latest, true
+}
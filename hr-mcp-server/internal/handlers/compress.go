@@ -0,0 +1,174 @@
+package handlers
+
+import (
+	"compress/gzip"
+	"net/http"
+	"strconv"
+	"strings"
+	"sync"
+)
+
+// compressibleTypes lists content types worth compressing
+var compressibleTypes = []string{"application/json", "text/"}
+
+var gzipWriters = sync.Pool{
+	New: func() interface{} {
+		gz, _ := gzip.NewWriterLevel(nil, gzip.DefaultCompression)
+		return gz
+	},
+}
+
+// Compress wraps next with gzip response compression for clients that accept
+// it. Bodies smaller than minSize are sent as is; streamed responses are
+// compressed and flushed chunk by chunk whenever the handler flushes.
+func Compress(next http.Handler, minSize int) http.Handler {
+	return http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		if !acceptsGzip(r.Header.Get("Accept-Encoding")) || r.Method == http.MethodHead {
+			w.Header().Add("Vary", "Accept-Encoding")
+			next.ServeHTTP(w, r)
+			return
+		}
+
+		cw := &compressWriter{ResponseWriter: w, minSize: minSize, status: http.StatusOK}
+		defer cw.finish()
+		next.ServeHTTP(cw, r)
+	})
+}
+
+// acceptsGzip reports whether an Accept-Encoding header allows gzip
+func acceptsGzip(header string) bool {
+	accepted := false
+	for _, part := range strings.Split(header, ",") {
+		coding, params, _ := strings.Cut(strings.TrimSpace(part), ";")
+		coding = strings.ToLower(strings.TrimSpace(coding))
+		if coding != "gzip" && coding != "*" {
+			continue
+		}
+		q := 1.0
+		for _, param := range strings.Split(params, ";") {
+			key, value, _ := strings.Cut(param, "=")
+			if !strings.EqualFold(strings.TrimSpace(key), "q") {
+				continue
+			}
+			parsed, err := strconv.ParseFloat(strings.TrimSpace(value), 64)
+			if err != nil {
+				parsed = 0
+			}
+			q = parsed
+		}
+		if coding == "gzip" {
+			return q > 0
+		}
+		accepted = q > 0
+	}
+	return accepted
+}
+
+// compressWriter buffers the start of a response until it knows whether the
+// body is large enough to compress
+type compressWriter struct {
+	http.ResponseWriter
+	minSize int
+	status  int
+	buf     []byte
+	gz      *gzip.Writer
+	started bool // Headers have been sent
+}
+
+func (cw *compressWriter) WriteHeader(status int) {
+	if !cw.started {
+		cw.status = status
+	}
+}
+
+func (cw *compressWriter) Write(p []byte) (int, error) {
+	if cw.gz != nil {
+		return cw.gz.Write(p)
+	}
+	if cw.started {
+		return cw.ResponseWriter.Write(p)
+	}
+
+	cw.buf = append(cw.buf, p...)
+	if len(cw.buf) >= cw.minSize {
+		if err := cw.start(true); err != nil {
+			return 0, err
+		}
+	}
+	return len(p), nil
+}
+
+// Flush sends buffered output, committing to compression for streamed bodies
+func (cw *compressWriter) Flush() {
+	if !cw.started {
+		if err := cw.start(true); err != nil {
+			return
+		}
+	}
+	if cw.gz != nil {
+		cw.gz.Flush()
+	}
+	if f, ok := cw.ResponseWriter.(http.Flusher); ok {
+		f.Flush()
+	}
+}
+
+// start sends the headers and buffered body, compressing if allowed and wanted
+func (cw *compressWriter) start(compress bool) error {
+	cw.started = true
+	header := cw.Header()
+	header.Add("Vary", "Accept-Encoding")
+	if header.Get("Content-Type") == "" && len(cw.buf) > 0 {
+		header.Set("Content-Type", http.DetectContentType(cw.buf))
+	}
+
+	if compress && cw.compressible(header) {
+		header.Set("Content-Encoding", "gzip")
+		header.Del("Content-Length")
+		cw.gz = gzipWriters.Get().(*gzip.Writer)
+		cw.gz.Reset(cw.ResponseWriter)
+	}
+	cw.ResponseWriter.WriteHeader(cw.status)
+
+	buf := cw.buf
+	cw.buf = nil
+	if len(buf) == 0 {
+		return nil
+	}
+	if cw.gz != nil {
+		_, err := cw.gz.Write(buf)
+		return err
+	}
+	_, err := cw.ResponseWriter.Write(buf)
+	return err
+}
+
+func (cw *compressWriter) compressible(header http.Header) bool {
+	if header.Get("Content-Encoding") != "" {
+		return false
+	}
+	if cw.status < http.StatusOK || cw.status == http.StatusNoContent || cw.status == http.StatusNotModified {
+		return false
+	}
+	contentType := header.Get("Content-Type")
+	for _, prefix := range compressibleTypes {
+		if strings.HasPrefix(contentType, prefix) {
+			return true
+		}
+	}
+	return false
+}
+
+// finish completes the response once the wrapped handler returns
+func (cw *compressWriter) finish() {
+	if !cw.started {
+		// The whole body fit under minSize
+		cw.start(false)
+		return
+	}
+	if cw.gz != nil {
+		cw.gz.Close()
+		gzipWriters.Put(cw.gz)
+		cw.gz = nil
+	}
+}
@@ -3,6 +3,7 @@ package handlers
 import (
 	"encoding/base64"
 	"encoding/json"
+	"errors"
 	"fmt"
 	"io"
 	"log"
@@ -175,7 +176,9 @@ func (h *Handler) ServeHTTP(w http.ResponseWriter, r *http.Request) {
 	case "tools/list":
 		h.handleToolsList(w, &req, userScopes)
 	case "tools/call":
-		h.handleToolsCall(w, &req, userScopes)
+		h.handleToolsCall(w, &req, userScopes, wantsEventStream(r))
+	case "changes/since":
+		h.handleChangesSince(w, &req, userScopes)
 	default:
 		h.sendError(w, req.ID, -32601, "Method not found", nil)
 	}
@@ -213,7 +216,7 @@ func (h *Handler) handleToolsList(w http.ResponseWriter, req *MCPRequest, scopes
 }
 
 // handleToolsCall handles tools/call requests
-func (h *Handler) handleToolsCall(w http.ResponseWriter, req *MCPRequest, scopes []string) {
+func (h *Handler) handleToolsCall(w http.ResponseWriter, req *MCPRequest, scopes []string, stream bool) {
 	// Extract tool name
 	toolName, ok := req.Params["name"].(string)
 	if !ok {
@@ -231,6 +234,35 @@ func (h *Handler) handleToolsCall(w http.ResponseWriter, req *MCPRequest, scopes
 	// If the request reaches here, Kong has already validated that the user has the required scopes
 	log.Printf("[MCP] Executing tool: %s for user with scopes: %v", toolName, scopes)
 
+	// Some tools need further scopes depending on their arguments
+	if err := h.registry.Authorize(toolName, args, scopes); err != nil {
+		var scopeErr *auth.ScopeError
+		if errors.As(err, &scopeErr) {
+			log.Printf("[MCP] Tool call denied - Tool: %s, Missing scope: %s", toolName, scopeErr.RequiredScope)
+			h.sendError(w, req.ID, -32001, scopeErr.Error(), map[string]interface{}{
+				"required_scope": scopeErr.RequiredScope,
+			})
+			return
+		}
+	}
+
+	// Versioned reads: a caller that already holds the current version gets
+	// an empty "unchanged" result instead of the payload
+	version, versioned := h.registry.Version(toolName, args)
+	if versioned && knownVersion(req.Params) == version {
+		log.Printf("[MCP] Tool result unchanged - Tool: %s, Version: %d", toolName, version)
+		h.sendResponse(w, req.ID, map[string]interface{}{
+			"content": []map[string]interface{}{},
+			"_meta":   map[string]interface{}{"version": version, "unchanged": true},
+		})
+		return
+	}
+
+	if stream {
+		h.streamToolsCall(w, req, toolName, args, version, versioned)
+		return
+	}
+
 	// Execute the tool (CallTool will validate that the tool exists)
 	result, err := h.registry.CallTool(toolName, args)
 	if err != nil {
@@ -258,10 +290,57 @@ func (h *Handler) handleToolsCall(w http.ResponseWriter, req *MCPRequest, scopes
 			},
 		},
 	}
+	if versioned {
+		response["_meta"] = map[string]interface{}{"version": version}
+	}
 
 	h.sendResponse(w, req.ID, response)
 }
 
+// knownVersion reads params._meta.known_version of a tools/call request (0 if absent)
+func knownVersion(params map[string]interface{}) uint64 {
+	meta, _ := params["_meta"].(map[string]interface{})
+	if v, ok := meta["known_version"].(float64); ok && v > 0 {
+		return uint64(v)
+	}
+	return 0
+}
+
+// collectionScopes maps each collection to the scope needed to read it
+var collectionScopes = map[string]string{
+	data.CollectionEmployees:   "hr:employee:read",
+	data.CollectionDepartments: "hr:department:read",
+	data.CollectionSalaries:    "hr:salary:read",
+}
+
+// handleChangesSince handles changes/since requests: the records written
+// after params.version, so clients can revalidate cached results in bulk.
+// If the change log no longer reaches back that far, complete is false and
+// every cached result must be treated as stale.
+//
+// This is not a tool call, so Kong's per-tool ACL does not cover it: only
+// changes to collections the caller may read are listed.
+func (h *Handler) handleChangesSince(w http.ResponseWriter, req *MCPRequest, scopes []string) {
+	since, ok := req.Params["version"].(float64)
+	if !ok || since < 0 {
+		h.sendError(w, req.ID, -32602, "Invalid params: version required", nil)
+		return
+	}
+
+	changes, latest, complete := h.store.ChangesSince(uint64(since))
+	visible := changes[:0]
+	for _, change := range changes {
+		if scope, known := collectionScopes[change.Collection]; known && auth.HasScope(scope, scopes) {
+			visible = append(visible, change)
+		}
+	}
+	h.sendResponse(w, req.ID, map[string]interface{}{
+		"version":  latest,
+		"complete": complete,
+		"changes":  visible,
+	})
+}
+
 // sendResponse sends a successful JSON-RPC response
 func (h *Handler) sendResponse(w http.ResponseWriter, id interface{}, result interface{}) {
 	resp := MCPResponse{
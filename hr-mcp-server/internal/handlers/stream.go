@@ -0,0 +1,190 @@
+package handlers
+
+import (
+	"encoding/json"
+	"fmt"
+	"log"
+	"net/http"
+	"reflect"
+	"strings"
+)
+
+// Streamable HTTP transport for tools/call. A client that accepts
+// text/event-stream gets the response as server-sent events, one JSON-RPC
+// message per event:
+//
+//   - notifications/progress (only if the request carries
+//     params._meta.progressToken): progress and total count result items sent
+//   - notifications/tools/chunk: the next items of an array result,
+//     {"requestId", "seq", "items": [...]}, sent as soon as they are encoded
+//   - the JSON-RPC response, last. For chunked results its content is empty
+//     and _meta.chunked is true; the result is the concatenation of the
+//     chunks' items, in seq order
+//
+// Results that are not arrays are sent whole in the response. Errors found
+// before the stream starts (bad params, missing scopes) are plain JSON
+// responses, as for clients that do not stream.
+
+// streamChunkBytes is the encoded size at which a chunk of items is sent
+const streamChunkBytes = 64 * 1024
+
+// MCPNotification represents a JSON-RPC 2.0 notification
+type MCPNotification struct {
+	JSONRPC string      `json:"jsonrpc"`
+	Method  string      `json:"method"`
+	Params  interface{} `json:"params"`
+}
+
+// wantsEventStream reports whether the client accepts an SSE response
+func wantsEventStream(r *http.Request) bool {
+	for _, part := range strings.Split(r.Header.Get("Accept"), ",") {
+		mediaType, _, _ := strings.Cut(strings.TrimSpace(part), ";")
+		if strings.EqualFold(strings.TrimSpace(mediaType), "text/event-stream") {
+			return true
+		}
+	}
+	return false
+}
+
+// progressToken reads params._meta.progressToken of a request (nil if absent)
+func progressToken(params map[string]interface{}) interface{} {
+	meta, _ := params["_meta"].(map[string]interface{})
+	return meta["progressToken"]
+}
+
+// eventStream writes JSON-RPC messages as server-sent events
+type eventStream struct {
+	w       http.ResponseWriter
+	flusher http.Flusher
+}
+
+func newEventStream(w http.ResponseWriter) *eventStream {
+	header := w.Header()
+	header.Set("Content-Type", "text/event-stream")
+	header.Set("Cache-Control", "no-cache")
+	header.Set("X-Accel-Buffering", "no")
+	w.WriteHeader(http.StatusOK)
+	flusher, _ := w.(http.Flusher)
+	return &eventStream{w: w, flusher: flusher}
+}
+
+// send writes one message and flushes it to the client
+func (s *eventStream) send(message interface{}) error {
+	payload, err := json.Marshal(message)
+	if err != nil {
+		return err
+	}
+	if _, err := fmt.Fprintf(s.w, "event: message\ndata: %s\n\n", payload); err != nil {
+		return err
+	}
+	if s.flusher != nil {
+		s.flusher.Flush()
+	}
+	return nil
+}
+
+func (s *eventStream) notify(method string, params map[string]interface{}) error {
+	return s.send(MCPNotification{JSONRPC: "2.0", Method: method, Params: params})
+}
+
+// progress sends a progress notification if the client asked for them
+func (s *eventStream) progress(token interface{}, progress, total int, message string) error {
+	if token == nil {
+		return nil
+	}
+	params := map[string]interface{}{"progressToken": token, "progress": progress}
+	if total > 0 {
+		params["total"] = total
+	}
+	if message != "" {
+		params["message"] = message
+	}
+	return s.notify("notifications/progress", params)
+}
+
+// streamToolsCall runs a tool and streams its result (see above)
+func (h *Handler) streamToolsCall(w http.ResponseWriter, req *MCPRequest, toolName string, args map[string]interface{}, version uint64, versioned bool) {
+	stream := newEventStream(w)
+	token := progressToken(req.Params)
+	stream.progress(token, 0, 0, "Running "+toolName)
+
+	result, err := h.registry.CallTool(toolName, args)
+	if err != nil {
+		log.Printf("[MCP] Tool execution error - Tool: %s, Error: %v", toolName, err)
+		stream.send(MCPResponse{JSONRPC: "2.0", ID: req.ID, Error: &MCPError{
+			Code:    -32000,
+			Message: fmt.Sprintf("Tool execution failed: %v", err),
+		}})
+		return
+	}
+
+	meta := map[string]interface{}{}
+	if versioned {
+		meta["version"] = version
+	}
+
+	items := reflect.ValueOf(result)
+	if items.Kind() != reflect.Slice {
+		resultJSON, err := json.Marshal(result)
+		if err != nil {
+			log.Printf("[MCP] Error marshaling result: %v", err)
+			stream.send(MCPResponse{JSONRPC: "2.0", ID: req.ID, Error: &MCPError{
+				Code:    -32000,
+				Message: fmt.Sprintf("Failed to format result: %v", err),
+			}})
+			return
+		}
+		response := map[string]interface{}{
+			"content": []map[string]interface{}{{"type": "text", "text": string(resultJSON)}},
+		}
+		if versioned {
+			response["_meta"] = meta
+		}
+		stream.send(MCPResponse{JSONRPC: "2.0", ID: req.ID, Result: response})
+		return
+	}
+
+	total := items.Len()
+	chunk := make([]json.RawMessage, 0, 64)
+	size, sent, seq := 0, 0, 0
+	for i := 0; i < total; i++ {
+		item, err := json.Marshal(items.Index(i).Interface())
+		if err != nil {
+			log.Printf("[MCP] Error marshaling result: %v", err)
+			stream.send(MCPResponse{JSONRPC: "2.0", ID: req.ID, Error: &MCPError{
+				Code:    -32000,
+				Message: fmt.Sprintf("Failed to format result: %v", err),
+			}})
+			return
+		}
+		chunk = append(chunk, item)
+		size += len(item)
+		if size < streamChunkBytes && i < total-1 {
+			continue
+		}
+
+		err = stream.notify("notifications/tools/chunk", map[string]interface{}{
+			"requestId": req.ID,
+			"seq":       seq,
+			"items":     chunk,
+		})
+		if err != nil {
+			// The client went away
+			log.Printf("[MCP] Stream aborted - Tool: %s, Sent: %d/%d items", toolName, sent, total)
+			return
+		}
+		sent += len(chunk)
+		seq++
+		stream.progress(token, sent, total, "")
+		chunk, size = chunk[:0], 0
+	}
+
+	log.Printf("[MCP] Tool executed successfully - Tool: %s, Streamed: %d items in %d chunks", toolName, total, seq)
+	meta["chunked"] = true
+	meta["chunks"] = seq
+	meta["items"] = total
+	stream.send(MCPResponse{JSONRPC: "2.0", ID: req.ID, Result: map[string]interface{}{
+		"content": []map[string]interface{}{},
+		"_meta":   meta,
+	}})
+}
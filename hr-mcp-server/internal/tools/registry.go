@@ -3,17 +3,48 @@ package tools
 import (
 	"encoding/json"
 	"fmt"
+	"math"
+	"sort"
 
+	"github.com/hr-token-exchange-demo/hr-mcp-server/internal/auth"
 	"github.com/hr-token-exchange-demo/hr-mcp-server/internal/data"
 )
 
 // Tool represents an MCP tool with scope requirements
 type Tool struct {
-	Name        string                 `json:"name"`
-	Description string                 `json:"description"`
-	InputSchema map[string]interface{} `json:"inputSchema"`
-	RequiredScope string               `json:"-"`
-	Handler     ToolHandler            `json:"-"`
+	Name          string                 `json:"name"`
+	Description   string                 `json:"description"`
+	InputSchema   map[string]interface{} `json:"inputSchema"`
+	RequiredScope string                 `json:"-"`
+	// ArgScopes optionally lists further scopes a call needs given its
+	// arguments (e.g. salary fields in aggregate)
+	ArgScopes func(args map[string]interface{}) []string `json:"-"`
+	// Version returns the version of the data a call would read (see
+	// data/versions.go); nil for write tools
+	Version func(store *data.Store, args map[string]interface{}) uint64 `json:"-"`
+	Handler ToolHandler                                                 `json:"-"`
+}
+
+// maxBulkRows limits the number of rows accepted by bulk update tools
+const maxBulkRows = 1000
+
+// employeeVersion versions a call by the employee record it reads
+func employeeVersion(store *data.Store, args map[string]interface{}) uint64 {
+	id, _ := args["employee_id"].(string)
+	return store.EmployeeVersion(id)
+}
+
+// salaryVersion versions a call by the salary record it reads
+func salaryVersion(store *data.Store, args map[string]interface{}) uint64 {
+	id, _ := args["employee_id"].(string)
+	return store.SalaryVersion(id)
+}
+
+// collectionVersion versions calls by the collections they read
+func collectionVersion(collections ...string) func(*data.Store, map[string]interface{}) uint64 {
+	return func(store *data.Store, args map[string]interface{}) uint64 {
+		return store.CollectionVersion(collections...)
+	}
 }
 
 // ToolHandler is a function that executes a tool
@@ -52,6 +83,7 @@ func (r *Registry) registerTools() {
 			"required": []string{"employee_id"},
 		},
 		RequiredScope: "hr:employee:read",
+		Version:       employeeVersion,
 		Handler:       r.getEmployee,
 	}
 
@@ -81,6 +113,43 @@ func (r *Registry) registerTools() {
 		Handler:       r.updateEmployee,
 	}
 
+	// update_employees tool - EFFICIENT: Applies many employee updates in one call
+	r.tools["update_employees"] = &Tool{
+		Name:        "update_employees",
+		Description: "Update many employee records in one call (e.g. relocating a team). All updates are applied atomically: if any row fails, none are applied. Use this instead of calling update_employee for each employee individually.",
+		InputSchema: map[string]interface{}{
+			"type": "object",
+			"properties": map[string]interface{}{
+				"updates": map[string]interface{}{
+					"type":        "array",
+					"description": "Employee updates to apply",
+					"maxItems":    maxBulkRows,
+					"items": map[string]interface{}{
+						"type": "object",
+						"properties": map[string]interface{}{
+							"employee_id": map[string]interface{}{
+								"type":        "string",
+								"description": "The employee ID",
+							},
+							"title": map[string]interface{}{
+								"type":        "string",
+								"description": "New job title",
+							},
+							"location": map[string]interface{}{
+								"type":        "string",
+								"description": "New location",
+							},
+						},
+						"required": []string{"employee_id"},
+					},
+				},
+			},
+			"required": []string{"updates"},
+		},
+		RequiredScope: "hr:employee:write",
+		Handler:       r.updateEmployees,
+	}
+
 	// list_departments tool
 	r.tools["list_departments"] = &Tool{
 		Name:        "list_departments",
@@ -90,6 +159,7 @@ func (r *Registry) registerTools() {
 			"properties": map[string]interface{}{},
 		},
 		RequiredScope: "hr:department:read",
+		Version:       collectionVersion(data.CollectionDepartments),
 		Handler:       r.listDepartments,
 	}
 
@@ -108,6 +178,7 @@ func (r *Registry) registerTools() {
 			"required": []string{"employee_id"},
 		},
 		RequiredScope: "hr:salary:read",
+		Version:       salaryVersion,
 		Handler:       r.getSalary,
 	}
 
@@ -137,6 +208,43 @@ func (r *Registry) registerTools() {
 		Handler:       r.updateSalary,
 	}
 
+	// update_salaries tool - EFFICIENT: Applies many salary updates in one call
+	r.tools["update_salaries"] = &Tool{
+		Name:        "update_salaries",
+		Description: "Update salary information for many employees in one call (e.g. a department-wide raise). Highly sensitive operation. All updates are applied atomically: if any row fails, none are applied. Use this instead of calling update_salary for each employee individually.",
+		InputSchema: map[string]interface{}{
+			"type": "object",
+			"properties": map[string]interface{}{
+				"updates": map[string]interface{}{
+					"type":        "array",
+					"description": "Salary updates to apply",
+					"maxItems":    maxBulkRows,
+					"items": map[string]interface{}{
+						"type": "object",
+						"properties": map[string]interface{}{
+							"employee_id": map[string]interface{}{
+								"type":        "string",
+								"description": "The employee ID",
+							},
+							"base": map[string]interface{}{
+								"type":        "integer",
+								"description": "New base salary",
+							},
+							"bonus": map[string]interface{}{
+								"type":        "integer",
+								"description": "New bonus amount",
+							},
+						},
+						"required": []string{"employee_id"},
+					},
+				},
+			},
+			"required": []string{"updates"},
+		},
+		RequiredScope: "hr:salary:write",
+		Handler:       r.updateSalaries,
+	}
+
 	// get_org_chart tool
 	r.tools["get_org_chart"] = &Tool{
 		Name:        "get_org_chart",
@@ -146,6 +254,7 @@ func (r *Registry) registerTools() {
 			"properties": map[string]interface{}{},
 		},
 		RequiredScope: "hr:org:read",
+		Version:       collectionVersion(data.CollectionEmployees, data.CollectionDepartments),
 		Handler:       r.getOrgChart,
 	}
 
@@ -158,32 +267,104 @@ func (r *Registry) registerTools() {
 			"properties": map[string]interface{}{},
 		},
 		RequiredScope: "hr:employee:read",
+		Version:       collectionVersion(data.CollectionEmployees),
 		Handler:       r.listEmployees,
 	}
 
 	// list_employees_with_salaries tool - EFFICIENT: Returns all employees with salary in one call
 	r.tools["list_employees_with_salaries"] = &Tool{
 		Name:        "list_employees_with_salaries",
-		Description: "List all employees with their salary information. Use this instead of calling get_salary for each employee individually.",
+		Description: "List all employees with their salary information, ordered by base salary (highest first). Use this instead of calling get_salary for each employee individually. Pass limit to get only the top earners.",
 		InputSchema: map[string]interface{}{
-			"type":       "object",
-			"properties": map[string]interface{}{},
+			"type": "object",
+			"properties": map[string]interface{}{
+				"limit": map[string]interface{}{
+					"type":        "integer",
+					"description": "Maximum number of employees to return (highest base salary first). Omit for all.",
+				},
+			},
 		},
 		RequiredScope: "hr:salary:read",
+		Version:       collectionVersion(data.CollectionEmployees, data.CollectionSalaries),
 		Handler:       r.listEmployeesWithSalaries,
 	}
 
 	// list_employees_by_department tool - EFFICIENT: Returns employees grouped by department
 	r.tools["list_employees_by_department"] = &Tool{
 		Name:        "list_employees_by_department",
-		Description: "List all employees grouped by their department. Use this to see which employees belong to each department.",
+		Description: "List all employees grouped by their department. Use this to see which employees belong to each department. Pass department to list a single department.",
 		InputSchema: map[string]interface{}{
-			"type":       "object",
-			"properties": map[string]interface{}{},
+			"type": "object",
+			"properties": map[string]interface{}{
+				"department": map[string]interface{}{
+					"type":        "string",
+					"description": "Only list employees of this department (e.g., Engineering). Omit for all departments.",
+				},
+			},
 		},
 		RequiredScope: "hr:employee:read",
+		Version:       collectionVersion(data.CollectionEmployees),
 		Handler:       r.listEmployeesByDepartment,
 	}
+
+	// aggregate tool - EFFICIENT: Grouped headcount and salary statistics computed server-side
+	r.tools["aggregate"] = &Tool{
+		Name:        "aggregate",
+		Description: "Compute grouped statistics over employees in one call, e.g. headcount per location or average salary by department. Groups employees by department, location, manager or title and returns count plus sum/avg/min/max of a salary field per group. Use this instead of listing all employees (with salaries) and computing the numbers yourself. Salary fields require salary read permission.",
+		InputSchema: map[string]interface{}{
+			"type": "object",
+			"properties": map[string]interface{}{
+				"group_by": map[string]interface{}{
+					"type":        "string",
+					"enum":        aggregateGroupByNames,
+					"description": "Employee attribute to group by",
+				},
+				"field": map[string]interface{}{
+					"type":        "string",
+					"enum":        aggregateFieldNames,
+					"description": "Salary field to aggregate. Omit for headcount only.",
+				},
+				"ops": map[string]interface{}{
+					"type":        "array",
+					"items":       map[string]interface{}{"type": "string", "enum": aggregateOpNames},
+					"description": "Statistics per group (count is always included). Defaults to avg when field is set.",
+				},
+				"sort_by": map[string]interface{}{
+					"type":        "string",
+					"enum":        aggregateOpNames,
+					"description": "Statistic to order groups by (default: the first op, or count)",
+				},
+				"order": map[string]interface{}{
+					"type":        "string",
+					"enum":        []string{"desc", "asc"},
+					"description": "Sort order of the groups (default desc)",
+				},
+				"top_k": map[string]interface{}{
+					"type":        "integer",
+					"description": "Only return the first K groups in sort order. Omit for all.",
+				},
+				"department": map[string]interface{}{
+					"type":        "string",
+					"description": "Only include employees of this department",
+				},
+				"location": map[string]interface{}{
+					"type":        "string",
+					"description": "Only include employees at this location",
+				},
+			},
+			"required": []string{"group_by"},
+		},
+		RequiredScope: "hr:employee:read",
+		ArgScopes: func(args map[string]interface{}) []string {
+			// Same scope as list_employees_with_salaries when salaries are read
+			if field, _ := args["field"].(string); field != "" {
+				return []string{"hr:salary:read"}
+			}
+			return nil
+		},
+		Version: collectionVersion(data.CollectionEmployees, data.CollectionSalaries),
+		Handler: r.aggregate,
+	}
 }
 
 // GetTools returns all tools (optionally filtered by scopes)
@@ -212,6 +393,33 @@ func (r *Registry) GetTools(scopes []string) []*Tool {
 	return tools
 }
 
+// Authorize checks the scopes a tool call needs beyond the tool's
+// RequiredScope, which Kong enforces. It returns an *auth.ScopeError if one
+// is missing.
+func (r *Registry) Authorize(name string, args map[string]interface{}, scopes []string) error {
+	tool, ok := r.GetTool(name)
+	if !ok || tool.ArgScopes == nil {
+		return nil
+	}
+	for _, scope := range tool.ArgScopes(args) {
+		if !auth.HasScope(scope, scopes) {
+			return auth.NewScopeError(scope)
+		}
+	}
+	return nil
+}
+
+// Version returns the version of the data a tool call would read, and false
+// for tools whose results are not versioned (writes). Read it before calling
+// the tool: the result is then at least as new as the version.
+func (r *Registry) Version(name string, args map[string]interface{}) (uint64, bool) {
+	tool, ok := r.GetTool(name)
+	if !ok || tool.Version == nil {
+		return 0, false
+	}
+	return tool.Version(r.store, args), true
+}
+
 // GetTool retrieves a specific tool by name
 func (r *Registry) GetTool(name string) (*Tool, bool) {
 	tool, ok := r.tools[name]
@@ -240,12 +448,13 @@ func (r *Registry) updateEmployee(store *data.Store, args map[string]interface{}
 		return nil, fmt.Errorf("employee_id must be a string")
 	}
 
-	emp, err := store.GetEmployee(employeeID)
+	current, err := store.GetEmployee(employeeID)
 	if err != nil {
 		return nil, err
 	}
 
-	// Update fields if provided
+	// Update a copy: stored records are shared with readers and indexes
+	emp := *current
 	if title, ok := args["title"].(string); ok {
 		emp.Title = title
 	}
@@ -253,17 +462,110 @@ func (r *Registry) updateEmployee(store *data.Store, args map[string]interface{}
 		emp.Location = location
 	}
 
-	err = store.UpdateEmployee(emp)
+	err = store.UpdateEmployee(&emp)
 	if err != nil {
 		return nil, err
 	}
 
 	return map[string]interface{}{
-		"success": true,
-		"employee": emp,
+		"success":  true,
+		"employee": &emp,
 	}, nil
 }
 
+func (r *Registry) updateEmployees(store *data.Store, args map[string]interface{}) (interface{}, error) {
+	rows, err := bulkRows(args)
+	if err != nil {
+		return nil, err
+	}
+
+	updates := make([]data.EmployeeUpdate, len(rows))
+	for i, row := range rows {
+		employeeID, ok := row["employee_id"].(string)
+		if !ok {
+			return nil, fmt.Errorf("updates[%d].employee_id must be a string", i)
+		}
+		updates[i].EmployeeID = employeeID
+		if title, ok := row["title"].(string); ok {
+			updates[i].Title = &title
+		}
+		if location, ok := row["location"].(string); ok {
+			updates[i].Location = &location
+		}
+	}
+
+	results, applied := store.UpdateEmployees(updates)
+	return bulkResult(results, applied), nil
+}
+
+func (r *Registry) updateSalaries(store *data.Store, args map[string]interface{}) (interface{}, error) {
+	rows, err := bulkRows(args)
+	if err != nil {
+		return nil, err
+	}
+
+	updates := make([]data.SalaryUpdate, len(rows))
+	for i, row := range rows {
+		employeeID, ok := row["employee_id"].(string)
+		if !ok {
+			return nil, fmt.Errorf("updates[%d].employee_id must be a string", i)
+		}
+		updates[i].EmployeeID = employeeID
+		if base, ok := row["base"].(float64); ok {
+			v := int64(base)
+			updates[i].Base = &v
+		}
+		if bonus, ok := row["bonus"].(float64); ok {
+			v := int64(bonus)
+			updates[i].Bonus = &v
+		}
+		if equity, ok := row["equity"].(float64); ok {
+			v := int64(equity)
+			updates[i].Equity = &v
+		}
+	}
+
+	results, applied := store.UpdateSalaries(updates)
+	return bulkResult(results, applied), nil
+}
+
+// bulkRows extracts and validates the "updates" array of a bulk update tool
+func bulkRows(args map[string]interface{}) ([]map[string]interface{}, error) {
+	raw, ok := args["updates"].([]interface{})
+	if !ok {
+		return nil, fmt.Errorf("updates must be an array")
+	}
+	if len(raw) == 0 {
+		return nil, fmt.Errorf("updates must not be empty")
+	}
+	if len(raw) > maxBulkRows {
+		return nil, fmt.Errorf("too many updates: %d (max %d)", len(raw), maxBulkRows)
+	}
+
+	rows := make([]map[string]interface{}, len(raw))
+	for i, item := range raw {
+		row, ok := item.(map[string]interface{})
+		if !ok {
+			return nil, fmt.Errorf("updates[%d] must be an object", i)
+		}
+		rows[i] = row
+	}
+	return rows, nil
+}
+
+// bulkResult formats the outcome of a bulk update
+func bulkResult(results []data.UpdateResult, applied bool) map[string]interface{} {
+	appliedRows := 0
+	if applied {
+		appliedRows = len(results)
+	}
+	return map[string]interface{}{
+		"success": applied,
+		"applied": appliedRows,
+		"results": results,
+	}
+}
+
 func (r *Registry) listEmployees(store *data.Store, args map[string]interface{}) (interface{}, error) {
 	emps := store.ListEmployees()
 
@@ -304,12 +606,13 @@ func (r *Registry) updateSalary(store *data.Store, args map[string]interface{})
 		return nil, fmt.Errorf("employee_id must be a string")
 	}
 
-	sal, err := store.GetSalary(employeeID)
+	current, err := store.GetSalary(employeeID)
 	if err != nil {
 		return nil, err
 	}
 
-	// Update fields if provided
+	// Update a copy: stored records are shared with readers and indexes
+	sal := *current
 	if base, ok := args["base"].(float64); ok {
 		sal.Base = int64(base)
 	}
@@ -320,14 +623,14 @@ func (r *Registry) updateSalary(store *data.Store, args map[string]interface{})
 		sal.Equity = int64(equity)
 	}
 
-	err = store.UpdateSalary(sal)
+	err = store.UpdateSalary(&sal)
 	if err != nil {
 		return nil, err
 	}
 
 	return map[string]interface{}{
 		"success": true,
-		"salary":  sal,
+		"salary":  &sal,
 	}, nil
 }
 
@@ -337,9 +640,12 @@ func (r *Registry) getOrgChart(store *data.Store, args map[string]interface{}) (
 }
 
 func (r *Registry) listEmployeesWithSalaries(store *data.Store, args map[string]interface{}) (interface{}, error) {
-	emps := store.ListEmployees()
+	limit := 0
+	if l, ok := args["limit"].(float64); ok {
+		limit = int(l)
+	}
 
-	// Join employees with their salary information
+	// Join employees with their salary information, highest base salary first
 	type EmployeeWithSalary struct {
 		ID         string `json:"id"`
 		Name       string `json:"name"`
@@ -353,14 +659,10 @@ func (r *Registry) listEmployeesWithSalaries(store *data.Store, args map[string]
 		Total      int64  `json:"total_compensation"`
 	}
 
-	result := make([]EmployeeWithSalary, 0, len(emps))
-	for _, emp := range emps {
-		sal, err := store.GetSalary(emp.ID)
-		if err != nil {
-			// Skip employees without salary data
-			continue
-		}
-
+	rows := store.ListEmployeesWithSalaries(limit)
+	result := make([]EmployeeWithSalary, 0, len(rows))
+	for _, row := range rows {
+		emp, sal := row.Employee, row.Salary
 		result = append(result, EmployeeWithSalary{
 			ID:         emp.ID,
 			Name:       emp.Name,
@@ -378,24 +680,220 @@ func (r *Registry) listEmployeesWithSalaries(store *data.Store, args map[string]
 	return result, nil
 }
 
+// employeeSummary is the per-employee shape returned by list_employees_by_department
+type employeeSummary struct {
+	ID    string `json:"id"`
+	Name  string `json:"name"`
+	Title string `json:"title"`
+}
+
+func summarizeEmployees(emps []*data.Employee) []employeeSummary {
+	result := make([]employeeSummary, len(emps))
+	for i, emp := range emps {
+		result[i] = employeeSummary{ID: emp.ID, Name: emp.Name, Title: emp.Title}
+	}
+	return result
+}
+
 func (r *Registry) listEmployeesByDepartment(store *data.Store, args map[string]interface{}) (interface{}, error) {
-	emps := store.ListEmployees()
+	// A single department is served straight from the department index
+	if dept, ok := args["department"].(string); ok && dept != "" {
+		return map[string][]employeeSummary{
+			dept: summarizeEmployees(store.ListEmployeesInDepartment(dept)),
+		}, nil
+	}
 
-	// Group employees by department
-	empsByDept := make(map[string][]map[string]string)
-	for _, emp := range emps {
-		if _, exists := empsByDept[emp.Department]; !exists {
-			empsByDept[emp.Department] = make([]map[string]string, 0)
+	view := store.ListEmployeesByDepartment()
+	empsByDept := make(map[string][]employeeSummary, len(view))
+	for dept, emps := range view {
+		empsByDept[dept] = summarizeEmployees(emps)
+	}
+
+	return empsByDept, nil
+}
+
+// aggregate tool: group keys, salary fields and statistics
+var aggregateGroupBy = map[string]func(*data.Employee) string{
+	"department": func(e *data.Employee) string { return e.Department },
+	"location":   func(e *data.Employee) string { return e.Location },
+	"manager":    func(e *data.Employee) string { return e.ManagerID },
+	"title":      func(e *data.Employee) string { return e.Title },
+}
+
+var aggregateFields = map[string]func(*data.Salary) int64{
+	"base_salary":        func(s *data.Salary) int64 { return s.Base },
+	"bonus":              func(s *data.Salary) int64 { return s.Bonus },
+	"equity":             func(s *data.Salary) int64 { return s.Equity },
+	"total_compensation": func(s *data.Salary) int64 { return s.Base + s.Bonus + s.Equity },
+}
+
+var (
+	aggregateGroupByNames = []string{"department", "location", "manager", "title"}
+	aggregateFieldNames   = []string{"base_salary", "bonus", "equity", "total_compensation"}
+	aggregateOpNames      = []string{"count", "sum", "avg", "min", "max"}
+)
+
+// noGroup labels employees without a value for the group_by attribute
+const noGroup = "(none)"
+
+// aggregateGroup accumulates the statistics of one group
+type aggregateGroup struct {
+	key   string
+	count int64
+	sum   int64
+	min   int64
+	max   int64
+}
+
+func (g *aggregateGroup) add(value int64) {
+	if g.count == 0 || value < g.min {
+		g.min = value
+	}
+	if g.count == 0 || value > g.max {
+		g.max = value
+	}
+	g.count++
+	g.sum += value
+}
+
+func (g *aggregateGroup) stat(op string) float64 {
+	switch op {
+	case "sum":
+		return float64(g.sum)
+	case "avg":
+		return math.Round(float64(g.sum)/float64(g.count)*100) / 100
+	case "min":
+		return float64(g.min)
+	case "max":
+		return float64(g.max)
+	}
+	return float64(g.count)
+}
+
+// aggregateOps parses the ops argument, defaulting to avg for a field and
+// count otherwise
+func aggregateOps(args map[string]interface{}, field string) ([]string, error) {
+	raw, ok := args["ops"].([]interface{})
+	if !ok || len(raw) == 0 {
+		if field != "" {
+			return []string{"avg"}, nil
+		}
+		return []string{"count"}, nil
+	}
+
+	ops := make([]string, 0, len(raw))
+	for i, item := range raw {
+		op, _ := item.(string)
+		switch op {
+		case "count":
+		case "sum", "avg", "min", "max":
+			if field == "" {
+				return nil, fmt.Errorf("ops[%d]: %s needs a field", i, op)
+			}
+		default:
+			return nil, fmt.Errorf("ops[%d] must be one of count, sum, avg, min, max", i)
 		}
+		ops = append(ops, op)
+	}
+	return ops, nil
+}
 
-		empsByDept[emp.Department] = append(empsByDept[emp.Department], map[string]string{
-			"id":    emp.ID,
-			"name":  emp.Name,
-			"title": emp.Title,
-		})
+func (r *Registry) aggregate(store *data.Store, args map[string]interface{}) (interface{}, error) {
+	groupBy, _ := args["group_by"].(string)
+	keyOf, ok := aggregateGroupBy[groupBy]
+	if !ok {
+		return nil, fmt.Errorf("group_by must be one of department, location, manager, title")
+	}
+	field, _ := args["field"].(string)
+	valueOf, ok := aggregateFields[field]
+	if field != "" && !ok {
+		return nil, fmt.Errorf("field must be one of base_salary, bonus, equity, total_compensation")
+	}
+	ops, err := aggregateOps(args, field)
+	if err != nil {
+		return nil, err
+	}
+	sortBy, _ := args["sort_by"].(string)
+	if sortBy == "" {
+		sortBy = ops[0]
+	} else if _, err := aggregateOps(map[string]interface{}{"ops": []interface{}{sortBy}}, field); err != nil {
+		return nil, fmt.Errorf("sort_by must be count or one of the ops")
+	}
+	ascending := args["order"] == "asc"
+	topK := 0
+	if k, ok := args["top_k"].(float64); ok {
+		topK = int(k)
+	}
+	department, _ := args["department"].(string)
+	location, _ := args["location"].(string)
+
+	groups := make(map[string]*aggregateGroup)
+	employees := 0
+	add := func(emp *data.Employee, value int64) {
+		if (department != "" && emp.Department != department) || (location != "" && emp.Location != location) {
+			return
+		}
+		key := keyOf(emp)
+		if key == "" {
+			key = noGroup
+		}
+		g, ok := groups[key]
+		if !ok {
+			g = &aggregateGroup{key: key}
+			groups[key] = g
+		}
+		g.add(value)
+		employees++
+	}
+	if valueOf == nil {
+		for _, emp := range store.ListEmployees() {
+			add(emp, 0)
+		}
+	} else {
+		// Employees without salary data are left out, as in list_employees_with_salaries
+		for _, row := range store.ListEmployeesWithSalaries(0) {
+			add(row.Employee, valueOf(row.Salary))
+		}
 	}
 
-	return empsByDept, nil
+	ordered := make([]*aggregateGroup, 0, len(groups))
+	for _, g := range groups {
+		ordered = append(ordered, g)
+	}
+	sort.Slice(ordered, func(i, j int) bool {
+		a, b := ordered[i].stat(sortBy), ordered[j].stat(sortBy)
+		if a != b {
+			return (a < b) == ascending
+		}
+		return ordered[i].key < ordered[j].key
+	})
+	if topK > 0 && topK < len(ordered) {
+		ordered = ordered[:topK]
+	}
+
+	result := make([]map[string]interface{}, len(ordered))
+	for i, g := range ordered {
+		row := map[string]interface{}{"group": g.key, "count": g.count}
+		for _, op := range ops {
+			if op != "count" {
+				row[op] = g.stat(op)
+			}
+		}
+		if groupBy == "manager" && g.key != noGroup {
+			if manager, err := store.GetEmployee(g.key); err == nil {
+				row["manager_name"] = manager.Name
+			}
+		}
+		result[i] = row
+	}
+
+	return map[string]interface{}{
+		"group_by":     groupBy,
+		"field":        field,
+		"groups":       result,
+		"total_groups": len(groups),
+		"employees":    employees,
+	}, nil
 }
 
 // CallTool executes a tool with the given arguments
@@ -0,0 +1,195 @@
+package tools
+
+import (
+	"encoding/json"
+	"fmt"
+	"os"
+	"strconv"
+	"strings"
+	"testing"
+
+	"github.com/hr-token-exchange-demo/hr-mcp-server/internal/data"
+)
+
+// Data-scale benchmarks for every tool in the registry. Each case runs the
+// tool handler and marshals its result, as handleToolsCall does.
+//
+// Dataset sizes default to 1k, 10k and 100k employees; override with e.g.
+//
+//	HR_BENCH_SIZES=1000,1000000 go test -bench . -benchmem ./internal/tools/
+
+var benchRegistries = map[int]*Registry{}
+
+func benchSizes(b *testing.B) []int {
+	spec := os.Getenv("HR_BENCH_SIZES")
+	if spec == "" {
+		spec = "1000,10000,100000"
+	}
+	var sizes []int
+	for _, field := range strings.Split(spec, ",") {
+		n, err := strconv.Atoi(strings.TrimSpace(field))
+		if err != nil {
+			b.Fatalf("invalid HR_BENCH_SIZES entry %q: %v", field, err)
+		}
+		sizes = append(sizes, n)
+	}
+	return sizes
+}
+
+func benchRegistry(size int) *Registry {
+	if r, ok := benchRegistries[size]; ok {
+		return r
+	}
+	r := NewRegistry(data.NewGeneratedStore(data.GenerateOptions{Employees: size, Seed: 42}))
+	benchRegistries[size] = r
+	return r
+}
+
+// benchmarkTool runs one tool at every dataset size. argsFor builds the
+// arguments for iteration i so write tools can vary their input.
+func benchmarkTool(b *testing.B, name string, argsFor func(size, i int) map[string]interface{}) {
+	for _, size := range benchSizes(b) {
+		b.Run(fmt.Sprintf("employees=%d", size), func(b *testing.B) {
+			r := benchRegistry(size)
+			b.ReportAllocs()
+			b.ResetTimer()
+
+			var respBytes int
+			for i := 0; i < b.N; i++ {
+				result, err := r.CallTool(name, argsFor(size, i))
+				if err != nil {
+					b.Fatalf("%s failed: %v", name, err)
+				}
+				out, err := json.Marshal(result)
+				if err != nil {
+					b.Fatalf("marshal %s result: %v", name, err)
+				}
+				respBytes = len(out)
+			}
+			b.ReportMetric(float64(respBytes), "resp_bytes")
+		})
+	}
+}
+
+func noArgs(size, i int) map[string]interface{} {
+	return map[string]interface{}{}
+}
+
+// benchEmployeeID returns a generated employee ID spread across the dataset
+func benchEmployeeID(size, i int) string {
+	width := len(fmt.Sprint(size))
+	if width < 3 {
+		width = 3
+	}
+	return fmt.Sprintf("emp-%0*d", width, (i*7919)%size+1)
+}
+
+func BenchmarkGetEmployee(b *testing.B) {
+	benchmarkTool(b, "get_employee", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"employee_id": benchEmployeeID(size, i)}
+	})
+}
+
+func BenchmarkUpdateEmployee(b *testing.B) {
+	benchmarkTool(b, "update_employee", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{
+			"employee_id": benchEmployeeID(size, i),
+			"title":       fmt.Sprintf("Title %d", i%10),
+		}
+	})
+}
+
+func BenchmarkUpdateEmployees(b *testing.B) {
+	benchmarkTool(b, "update_employees", func(size, i int) map[string]interface{} {
+		updates := make([]interface{}, 200)
+		for j := range updates {
+			updates[j] = map[string]interface{}{
+				"employee_id": benchEmployeeID(size, i*200+j),
+				"location":    fmt.Sprintf("Office %d", i%10),
+			}
+		}
+		return map[string]interface{}{"updates": updates}
+	})
+}
+
+func BenchmarkListDepartments(b *testing.B) {
+	benchmarkTool(b, "list_departments", noArgs)
+}
+
+func BenchmarkGetSalary(b *testing.B) {
+	benchmarkTool(b, "get_salary", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"employee_id": benchEmployeeID(size, i)}
+	})
+}
+
+func BenchmarkUpdateSalary(b *testing.B) {
+	benchmarkTool(b, "update_salary", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{
+			"employee_id": benchEmployeeID(size, i),
+			"base":        float64(80000 + (i%100)*1000),
+		}
+	})
+}
+
+func BenchmarkUpdateSalaries(b *testing.B) {
+	benchmarkTool(b, "update_salaries", func(size, i int) map[string]interface{} {
+		updates := make([]interface{}, 200)
+		for j := range updates {
+			updates[j] = map[string]interface{}{
+				"employee_id": benchEmployeeID(size, i*200+j),
+				"base":        float64(80000 + ((i+j)%100)*1000),
+			}
+		}
+		return map[string]interface{}{"updates": updates}
+	})
+}
+
+func BenchmarkGetOrgChart(b *testing.B) {
+	benchmarkTool(b, "get_org_chart", noArgs)
+}
+
+func BenchmarkListEmployees(b *testing.B) {
+	benchmarkTool(b, "list_employees", noArgs)
+}
+
+func BenchmarkListEmployeesWithSalaries(b *testing.B) {
+	benchmarkTool(b, "list_employees_with_salaries", noArgs)
+}
+
+func BenchmarkListEmployeesWithSalariesTop10(b *testing.B) {
+	benchmarkTool(b, "list_employees_with_salaries", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"limit": float64(10)}
+	})
+}
+
+func BenchmarkListEmployeesByDepartment(b *testing.B) {
+	benchmarkTool(b, "list_employees_by_department", noArgs)
+}
+
+func BenchmarkListEmployeesInDepartment(b *testing.B) {
+	benchmarkTool(b, "list_employees_by_department", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"department": "Engineering"}
+	})
+}
+
+func BenchmarkAggregateHeadcountByLocation(b *testing.B) {
+	benchmarkTool(b, "aggregate", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"group_by": "location"}
+	})
+}
+
+func BenchmarkAggregateSalaryByDepartment(b *testing.B) {
+	benchmarkTool(b, "aggregate", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{
+			"group_by": "department",
+			"field":    "total_compensation",
+			"ops":      []interface{}{"avg", "min", "max"},
+		}
+	})
+}
+
+func BenchmarkAggregateTopManagers(b *testing.B) {
+	benchmarkTool(b, "aggregate", func(size, i int) map[string]interface{} {
+		return map[string]interface{}{"group_by": "manager", "top_k": float64(10)}
+	})
+}
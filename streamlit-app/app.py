@@ -14,27 +14,302 @@ Kong handles all OAuth flows automatically, including:
 - Proxying authenticated requests to this app
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, g, render_template, request, jsonify, session, redirect, url_for
+from flask.json.provider import DefaultJSONProvider
+from flask_sock import Sock
+from simple_websocket import Client as WebSocketClient, ConnectionClosed
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
 import requests
 import base64
+import gzip
+import hashlib
 import json
+import logging
 import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when available (stdlib otherwise)"""
+
+    def _orjson_option(self, kwargs):
+        """orjson option for json.dumps kwargs, or None if orjson cannot honor them"""
+        kwargs = dict(kwargs)
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.pop('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        # orjson writes either compact output or a two-space indent
+        indent = kwargs.pop('indent', None)
+        if indent == 2:
+            option |= orjson.OPT_INDENT_2
+            separators = (',', ': ')
+        elif indent is None:
+            separators = (',', ':')
+        else:
+            return None
+        if kwargs.pop('separators', None) not in (None, separators):
+            return None
+        # Escaping non-ASCII characters or not yields the same JSON value
+        kwargs.pop('ensure_ascii', None)
+        return None if kwargs else option
+
+    def dumps(self, obj, **kwargs):
+        option = None if orjson is None else self._orjson_option(kwargs)
+        if option is None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SESSION_COOKIE_NAME'] = 'flask_session'  # Avoid conflict with Kong's session cookie
+sock = Sock(app)
+
+def split_unix_url(url):
+    """
+    Split unix://<socket path>:<HTTP path> into an HTTP URL and the socket
+    to send it over; other URLs are returned with socket None
+    """
+    if not url.startswith('unix://'):
+        return url, None
+    socket_path, _, path = url[len('unix://'):].partition(':')
+    return f"http://localhost/{path.lstrip('/')}", socket_path
+
 
 # Configuration
 class Config:
     # Internal service URLs (accessed via Kong)
     KONG_INTERNAL_URL = os.environ.get('KONG_INTERNAL_URL', 'http://kong-gateway:8000')
 
-    # HR Agent endpoint
-    AGENT_URL = os.environ.get('AGENT_URL', f'{KONG_INTERNAL_URL}/api/agent')
+    # HR Agent endpoint; unix://<socket path>:<HTTP path> connects to a
+    # colocated Kong over a Unix socket instead of TCP
+    AGENT_URL, AGENT_SOCKET = split_unix_url(os.environ.get('AGENT_URL', f'{KONG_INTERNAL_URL}/api/agent'))
+
+    # HR Agent WebSocket chat endpoint (Kong proxies the upgrade to /chat/ws).
+    # The WebSocket client only speaks TCP, so it ignores AGENT_SOCKET.
+    AGENT_WS_URL = os.environ.get(
+        'AGENT_WS_URL',
+        (f'{KONG_INTERNAL_URL}/api/agent' if AGENT_SOCKET else AGENT_URL).replace('http', 'ws', 1) + '/ws'
+    )
+
+    # Responses at least this large are compressed for browsers that accept it
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+    # Per-request trace log (NDJSON, rotated at TRACE_LOG_MAX_BYTES); empty
+    # disables it. Use the agent's TRACE_LOG_USER_SALT so user hashes match.
+    TRACE_LOG_PATH = os.environ.get('TRACE_LOG_PATH', '')
+    TRACE_LOG_MAX_BYTES = int(os.environ.get('TRACE_LOG_MAX_BYTES', 50 * 1024 * 1024))
+    TRACE_LOG_BACKUPS = int(os.environ.get('TRACE_LOG_BACKUPS', 5))
+    TRACE_LOG_USER_SALT = os.environ.get('TRACE_LOG_USER_SALT', '')
 
 config = Config()
 
+# Accept-Encoding sent to the agent (requests decodes the body transparently)
+ACCEPT_ENCODING = 'br, gzip' if brotli is not None else 'gzip'
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'text/')
+
+
+# Trace log writer: one JSON line per request, in the format of the agent's
+# app/tracelog.py, so hr-agent's "python -m app.trace_report" reads both logs
+# and joins them on the X-Request-ID sent to the agent
+trace_log = None
+if config.TRACE_LOG_PATH:
+    trace_handler = RotatingFileHandler(
+        config.TRACE_LOG_PATH,
+        maxBytes=config.TRACE_LOG_MAX_BYTES,
+        backupCount=config.TRACE_LOG_BACKUPS,
+        encoding='utf-8'
+    )
+    trace_handler.setFormatter(logging.Formatter('%(message)s'))
+    trace_log = logging.getLogger('hr_ui.trace')
+    trace_log.addHandler(trace_handler)
+    trace_log.setLevel(logging.INFO)
+    trace_log.propagate = False
+
+
+def hash_user(user_sub):
+    """Pseudonymous user id of trace records, the same as the agent's"""
+    if not user_sub:
+        return None
+    return hashlib.sha256(f"{config.TRACE_LOG_USER_SALT}{user_sub}".encode('utf-8')).hexdigest()[:16]
+
+
+@app.before_request
+def start_trace():
+    """Start timing the request when tracing (WebSocket connections are not requests; health checks are noise)"""
+    if trace_log is None or request.path in ('/ws/chat', '/health') or request.path.startswith('/static/'):
+        return
+    g.trace = {
+        'ts': time.time(),
+        'started': time.perf_counter(),
+        'id': request.headers.get('X-Request-ID') or uuid.uuid4().hex,
+        'hops': {}
+    }
+
+
+def note_hop(name, started):
+    """Add the time since started to a hop of the current request's trace"""
+    trace = g.get('trace')
+    if trace is not None:
+        trace['hops'][name] = trace['hops'].get(name, 0.0) + time.perf_counter() - started
+
+
+def trace_headers():
+    """X-Request-ID for calls to the agent, so its trace records join this one"""
+    trace = g.get('trace')
+    return {'X-Request-ID': trace['id']} if trace is not None else {}
+
+
+# Registered before compress_response, so it runs after it and sees the final body
+@app.after_request
+def write_trace(response):
+    """Write the request's trace record"""
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    access_token = session.get('access_token')
+    token_payload = decode_jwt_payload(access_token) if access_token else None
+    record = {
+        'ts': round(trace['ts'], 3),
+        'svc': 'ui',
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'id': trace['id'],
+        'user': hash_user((token_payload or {}).get('sub')),
+        'status': 'ok' if response.status_code < 400 else 'error',
+        'code': response.status_code,
+        'ms': round((time.perf_counter() - trace['started']) * 1000, 1),
+        'hops': {name: round(seconds * 1000, 1) for name, seconds in trace['hops'].items()},
+        'bytes': response.calculate_content_length()
+    }
+    trace_log.info(json.dumps({k: v for k, v in record.items() if v is not None and v != {}}, separators=(',', ':')))
+    return response
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None"""
+    codings = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            codings[coding.strip().lower()] = q
+
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = codings.get(coding, codings.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+@app.after_request
+def compress_response(response):
+    """Compress page and API responses the browser can decode"""
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_MIMETYPES)):
+        return response
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    body = response.get_data()
+    if len(body) < config.COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=4))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class UnixSocketConnection(HTTPConnection):
+    """urllib3 connection over a Unix socket"""
+
+    def __init__(self, socket_path, **kwargs):
+        super().__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class UnixSocketConnectionPool(HTTPConnectionPool):
+    """urllib3 connection pool whose connections all go to one Unix socket"""
+
+    def __init__(self, socket_path, **kwargs):
+        super().__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        return UnixSocketConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """requests transport adapter sending every request over a Unix socket"""
+
+    def __init__(self, socket_path, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = UnixSocketConnectionPool(socket_path, maxsize=self._pool_maxsize)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.pool
+
+    def get_connection(self, url, proxies=None):
+        return self.pool
+
+    def close(self):
+        super().close()
+        self.pool.close()
+
+
+# HTTP client for calls to the HR Agent, reusing connections across requests
+agent_http = requests.Session()
+if config.AGENT_SOCKET:
+    agent_http.mount('http://', UnixSocketAdapter(config.AGENT_SOCKET))
+
 
 def decode_jwt_payload(token):
     """Decode JWT payload without verification (for display purposes)"""
@@ -49,13 +324,90 @@ def decode_jwt_payload(token):
         if padding != 4:
             payload_b64 += '=' * padding
 
-        payload_json = base64.urlsafe_b64decode(payload_b64).decode('utf-8')
-        return json.loads(payload_json)
+        return app.json.loads(base64.urlsafe_b64decode(payload_b64))
     except Exception as e:
         print(f"Error decoding JWT: {e}", flush=True)
         return None
 
 
+# Exchanged token references seen on WebSocket connections, by session. A
+# WebSocket handler cannot update the cookie session, so they are kept here
+# for the most recent sessions instead.
+WS_TOKEN_REFS_MAX_SESSIONS = 1000
+ws_token_refs = OrderedDict()
+ws_token_refs_lock = threading.Lock()
+
+
+def session_key(access_token):
+    """Server-side key for a login session"""
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()[:16]
+
+
+def remember_exchanged_tokens(token_refs, tokens_array):
+    """
+    Add exchanged token references (fingerprint and hop metadata) from an
+    agent response to token_refs. Returns True if any were new.
+    """
+    added = False
+    for token_info in tokens_array:
+        hop = token_info.get('hop')
+        fingerprint = token_info.get('fingerprint')
+        audience = token_info.get('audience', 'Unknown')
+
+        print(f"\n[TOKEN_DEBUG] Received Hop {hop} token {fingerprint}:", flush=True)
+        print(f"  Audience (aud): {audience}", flush=True)
+
+        if not fingerprint or fingerprint in token_refs:
+            print(f"[TOKEN_DEBUG] Token already stored, skipping duplicate", flush=True)
+            continue
+
+        token_refs[fingerprint] = {
+            'fingerprint': fingerprint,
+            'hop': hop,
+            'description': token_info.get('description'),
+            'audience': audience,
+            'order': len(token_refs),
+        }
+        added = True
+        print(f"[TOKEN] Stored exchanged token (Hop {hop}) with audience: {audience}", flush=True)
+    return added
+
+
+def exchanged_token_refs(access_token):
+    """Exchanged token references of this session, from HTTP and WebSocket chats"""
+    token_refs = dict(session.get('exchanged_token_refs', {}))
+    with ws_token_refs_lock:
+        for fingerprint, ref in ws_token_refs.get(session_key(access_token), {}).items():
+            token_refs.setdefault(fingerprint, {**ref, 'order': len(token_refs)})
+    return token_refs
+
+
+def content_version(*parts):
+    """ETag value for a response that is fully determined by the given parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(app.json.dumps(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:32]
+
+
+def not_modified(etag):
+    """304 response if the request's If-None-Match already has this ETag, else None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def with_etag(response, etag):
+    """Tag a response so the browser revalidates it with If-None-Match"""
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 def get_user_info():
     """Extract user info from Kong's Authorization header"""
     # Kong sends the access token via standard Authorization: Bearer header
@@ -161,57 +513,39 @@ def api_chat():
         print(f"  Message: {message}", flush=True)
 
         # Call HR Agent Service through Kong
-        response = requests.post(
+        agent_started = time.perf_counter()
+        response = agent_http.post(
             config.AGENT_URL,
             headers={
                 'Authorization': f'Bearer {access_token}',
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Accept-Encoding': ACCEPT_ENCODING,
+                **trace_headers()
             },
-            json={
+            data=app.json.dumps({
                 'message': message,
                 'chat_history': chat_history
-            },
+            }),
             timeout=60
         )
+        note_hop('agent', agent_started)
 
         print(f"[CHAT] Agent responded with status: {response.status_code}", flush=True)
 
         if response.status_code == 200:
-            data = response.json()
+            # Parse once for session bookkeeping; the body itself is relayed
+            # to the browser byte-for-byte below
+            data = app.json.loads(response.content)
             print(f"[CHAT] Agent responded successfully", flush=True)
 
-            # Store exchanged tokens if present in response
+            # Remember exchanged tokens by fingerprint only; the viewer fetches
+            # full tokens on demand from /api/tokens/<fingerprint>
             if 'exchanged_token' in data and data['exchanged_token']:
-                if 'exchanged_tokens' not in session:
-                    session['exchanged_tokens'] = []
-
-                # The exchanged_token now contains a 'tokens' array
-                tokens_array = data['exchanged_token'].get('tokens', [])
-
-                for token_info in tokens_array:
-                    # Log token details for debugging
-                    hop = token_info.get('hop')
-                    claims = token_info.get('claims', {})
-                    audience = claims.get('aud', 'Unknown')
-
-                    print(f"\n[TOKEN_DEBUG] Received Hop {hop} token:", flush=True)
-                    print(f"  Audience (aud): {audience}", flush=True)
-                    print(f"  Subject (sub): {claims.get('sub', 'Unknown')}", flush=True)
-                    print(f"  Scopes: {claims.get('scope', 'Unknown')}", flush=True)
-
-                    # Check if this token is already stored (avoid duplicates)
-                    token_exists = False
-                    for stored_token in session['exchanged_tokens']:
-                        if stored_token.get('token') == token_info.get('token'):
-                            token_exists = True
-                            print(f"[TOKEN_DEBUG] Token already stored, skipping duplicate", flush=True)
-                            break
-
-                    if not token_exists:
-                        session['exchanged_tokens'].append(token_info)
-                        print(f"[TOKEN] Stored exchanged token (Hop {hop}) with audience: {audience}", flush=True)
-
-            return jsonify(data)
+                token_refs = session.setdefault('exchanged_token_refs', {})
+                if remember_exchanged_tokens(token_refs, data['exchanged_token'].get('tokens', [])):
+                    session.modified = True
+
+            return Response(response.content, status=200, mimetype='application/json')
         else:
             print(f"[CHAT_ERROR] Agent returned {response.status_code}", flush=True)
             print(f"[CHAT_ERROR] Response: {response.text[:500]}", flush=True)
@@ -229,6 +563,99 @@ def api_chat():
         }), 500
 
 
+# Close code of chat connections whose token expired (the agent uses the
+# same one); the browser reconnects and Kong puts a fresh token on the upgrade
+WS_TOKEN_EXPIRED = 4401
+
+
+def token_expired(token_payload):
+    """Whether a decoded token's exp claim has passed"""
+    exp = (token_payload or {}).get('exp')
+    return isinstance(exp, (int, float)) and exp <= time.time()
+
+
+@sock.route('/ws/chat')
+def ws_chat(ws):
+    """
+    Persistent chat channel. Relays the browser's WebSocket to the HR Agent's
+    /chat/ws through Kong, which authenticates the connection once on upgrade.
+    The agent keeps the conversation history for the life of the connection
+    and streams tool and token events back; see /chat/ws in the agent for the
+    message format.
+
+    The token is fixed for the life of the connection. Once it expires the
+    connection is closed with WS_TOKEN_EXPIRED, here or by the agent.
+    """
+    # The token Kong put on this upgrade request is fresher than the one
+    # stored in the session when the page loaded
+    access_token = get_user_info()['access_token'] or session.get('access_token')
+
+    if not access_token:
+        print(f"[WS] No token in session, closing", flush=True)
+        ws.close(reason=1008, message='Not authenticated - no token in session')
+        return
+
+    token_payload = decode_jwt_payload(access_token)
+    if token_expired(token_payload):
+        print(f"[WS] Token expired, closing", flush=True)
+        ws.close(reason=WS_TOKEN_EXPIRED, message='Token expired')
+        return
+
+    try:
+        upstream = WebSocketClient.connect(
+            config.AGENT_WS_URL,
+            headers={'Authorization': f'Bearer {access_token}'}
+        )
+    except Exception as e:
+        print(f"[WS_ERROR] Could not connect to agent: {str(e)}", flush=True)
+        ws.close(reason=1011, message='Agent service unavailable')
+        return
+
+    print(f"[WS] Relaying chat connection to HR agent", flush=True)
+    key = session_key(access_token)
+
+    def relay_from_agent():
+        close_reason = close_message = None
+        try:
+            while True:
+                message = upstream.receive()
+                if '"response"' in message:
+                    data = app.json.loads(message)
+                    if data.get('type') == 'response' and data.get('exchanged_token'):
+                        with ws_token_refs_lock:
+                            token_refs = ws_token_refs.setdefault(key, {})
+                            ws_token_refs.move_to_end(key)
+                            remember_exchanged_tokens(token_refs, data['exchanged_token'].get('tokens', []))
+                            while len(ws_token_refs) > WS_TOKEN_REFS_MAX_SESSIONS:
+                                ws_token_refs.popitem(last=False)
+                ws.send(message)
+        except ConnectionClosed as e:
+            if e.reason == WS_TOKEN_EXPIRED:
+                # Pass the agent's close code on, so the browser reconnects
+                close_reason, close_message = e.reason, e.message
+        finally:
+            try:
+                ws.close(reason=close_reason, message=close_message)
+            except ConnectionClosed:
+                pass  # The browser side is closed already
+
+    relay = threading.Thread(target=relay_from_agent, daemon=True)
+    relay.start()
+    try:
+        while True:
+            message = ws.receive()
+            if token_expired(token_payload):
+                print(f"[WS] Token expired, closing", flush=True)
+                ws.close(reason=WS_TOKEN_EXPIRED, message='Token expired')
+                break
+            upstream.send(message)
+    except ConnectionClosed:
+        pass
+    finally:
+        upstream.close()
+        print(f"[WS] Chat connection closed", flush=True)
+
+
 @app.route('/api/user-info')
 def api_user_info():
     """API endpoint to get current user information"""
@@ -237,17 +664,23 @@ def api_user_info():
     if not auth_data['access_token']:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    # The response depends only on the token
+    etag = content_version('user-info', auth_data['access_token'])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     # Parse scopes
     scopes = []
     if auth_data['token_payload']:
         scope_str = auth_data['token_payload'].get('scope', '')
         scopes = [s for s in scope_str.split() if s.startswith('hr:')]
 
-    return jsonify({
+    return with_etag(jsonify({
         'user': auth_data['token_payload'],
         'scopes': scopes,
         'authenticated': True
-    })
+    }), etag)
 
 
 @app.route('/api/token-details')
@@ -261,6 +694,14 @@ def api_token_details():
     if not access_token:
         return jsonify({'error': 'Not authenticated'}), 401
 
+    # The response depends only on the token and the exchanged token
+    # references, so unchanged details cost a header-only 304
+    token_refs = exchanged_token_refs(access_token)
+    etag = content_version('token-details', access_token, sorted(token_refs))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
     # Decode token payload
     token_payload = decode_jwt_payload(access_token)
 
@@ -282,10 +723,13 @@ def api_token_details():
     hr_scopes = [s for s in all_scopes if s.startswith('hr:')]
     other_scopes = [s for s in all_scopes if not s.startswith('hr:')]
 
-    # Get exchanged tokens from session
-    exchanged_tokens = session.get('exchanged_tokens', [])
+    # Exchanged token references (fingerprint and hop metadata) from session
+    exchanged_tokens = sorted(
+        token_refs.values(),
+        key=lambda ref: ref['order']
+    )
 
-    return jsonify({
+    return with_etag(jsonify({
         'token': access_token,
         'claims': token_payload,
         'expiry': {
@@ -323,7 +767,40 @@ def api_token_details():
             ],
             'note': 'Exchanged tokens are captured from responses and displayed below.'
         }
-    })
+    }), etag)
+
+
+@app.route('/api/tokens/<fingerprint>')
+def api_exchanged_token(fingerprint):
+    """
+    Full exchanged token and claims for a fingerprint, fetched on demand from
+    the HR Agent's token store
+    """
+    access_token = session.get('access_token')
+
+    if not access_token:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    # Only tokens from this session's chats
+    if fingerprint not in exchanged_token_refs(access_token):
+        return jsonify({'error': 'Token not found'}), 404
+
+    try:
+        agent_started = time.perf_counter()
+        response = agent_http.get(
+            f'{config.AGENT_URL}/tokens/{fingerprint}',
+            headers={
+                'Authorization': f'Bearer {access_token}',
+                'Accept-Encoding': ACCEPT_ENCODING
+            },
+            timeout=10
+        )
+        note_hop('agent', agent_started)
+    except Exception as e:
+        print(f"[TOKEN_ERROR] {str(e)}", flush=True)
+        return jsonify({'error': str(e)}), 502
+
+    return Response(response.content, status=response.status_code, mimetype='application/json')
 
 
 @app.route('/health')
@@ -338,6 +815,9 @@ def health():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8501))
-    print(f"Starting HR Agent UI on port {port}", flush=True)
-    print(f"Agent URL: {config.AGENT_URL}", flush=True)
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # UNIX_SOCKET=/path/to.sock listens on a Unix socket instead of PORT
+    unix_socket = os.environ.get('UNIX_SOCKET')
+    host = f'unix://{unix_socket}' if unix_socket else '0.0.0.0'
+    print(f"Starting HR Agent UI on {unix_socket or f'port {port}'}", flush=True)
+    print(f"Agent URL: {config.AGENT_URL}" + (f" via {config.AGENT_SOCKET}" if config.AGENT_SOCKET else ""), flush=True)
+    app.run(host=host, port=port, debug=True)